@@ -1,44 +1,47 @@
 import sys
 import traceback
 
-# Set up error logging
+# Set up leveled logging (see utils/log_config.py for the environment variables)
 try:
     import logging
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format='[%(asctime)s] [%(levelname)s] %(message)s',
-        handlers=[logging.StreamHandler(sys.stdout)]
-    )
-    logger = logging.getLogger(__name__)
+    from utils.log_config import configure_logging, get_logger
+    configure_logging()
+    logger = get_logger('app')
+    asr_logger = get_logger('asr')
+    memory_logger = get_logger('memory')
+    ws_logger = get_logger('ws')
     logger.info("Starting application...")
 except Exception as e:
     print(f"Failed to set up logging: {str(e)}")
     traceback.print_exc()
 
-# Wrap imports in try-except to log specific import errors
+# Wrap imports in try-except to log specific import errors.
+# torch, transformers, psutil and numba are imported on first use, so a worker starts serving
+# (and answers /health/live) while the model loads in the background.
 try:
     from flask import Flask, render_template, request, jsonify, send_file
     import os
-    import whisper
     from pathlib import Path
-    from utils.tajweed_checker import analyze_ayah, get_formatted_feedback
+    from utils.tajweed_checker import analyze_transcript, ANALYSIS_CACHE
     from flask_sock import Sock
-    import tempfile
     import numpy as np
-    import torch
     from utils.text_matcher import match_ayah_and_word
-    import wave
+    from utils.inference_scheduler import InferenceScheduler
     import json
-    import shutil
-    from transformers import AutoProcessor, AutoModelForSpeechSeq2Seq
-    import librosa
     import gc
-    import psutil
+    import threading
+    import time
     from datetime import datetime
-    from utils.tajweed_checker import normalize_arabic_text, ARABIC_MADD_LETTERS, SURAH_FATIHA
-    from multiprocessing import shared_memory
-    import pickle
-    import atexit
+    from utils.tajweed_checker import normalize_arabic_text, SURAH_FATIHA
+    from utils.runtime_config import EXPORT_FORMAT, resolve_settings, settings_fingerprint
+    from utils.audio_io import AudioClip, TARGET_SAMPLE_RATE, decode_audio, log_mel_features, persist_upload, AudioDecodeError
+    from utils.long_form import split_windows, merge_transcripts
+    from utils.streaming import StreamingTranscriber
+    from utils.audio_stream import parse_frame, FrameSequencer, FrameError
+    from utils.transcription_cache import TranscriptionCache
+    from utils.encoder_buckets import bucket_frames, encode
+    from utils.model_snapshot import SNAPSHOT_FORMAT, read_snapshot
+    from io import BytesIO
     import flask
     import werkzeug
     logger.info("All imports successful")
@@ -47,12 +50,20 @@ except ImportError as e:
     traceback.print_exc()
     sys.exit(1)
 
+class InMemoryRequest(flask.Request):
+    """Request that keeps uploaded files in memory instead of spooling large ones to a temp file"""
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return BytesIO()
+
 app = Flask(__name__)
+app.request_class = InMemoryRequest
+# Uploads are held in memory, so bound their size (MAX_UPLOAD_MB)
+app.config['MAX_CONTENT_LENGTH'] = int(float(os.environ.get('MAX_UPLOAD_MB', 25)) * 1024 * 1024)
 sock = Sock(app)
 
-# Configure upload folder
+# Uploads are decoded in memory; they are only written here when PERSIST_UPLOADS is set
 UPLOAD_FOLDER = Path('recordings')
-UPLOAD_FOLDER.mkdir(exist_ok=True)
+PERSIST_UPLOADS = os.environ.get('PERSIST_UPLOADS', '').lower() in ('1', 'true', 'yes')
 
 # Create a temporary directory for audio processing in our project folder
 TEMP_DIR = Path('temp_audio')
@@ -61,192 +72,327 @@ TEMP_DIR.mkdir(exist_ok=True)
 # Store the latest recording path
 latest_recording = None
 
-# Fatiha verses with their word-by-word text
-FATIHA_VERSES = {
-    0: ["بِسْمِ", "ٱللَّهِ", "ٱلرَّحْمَٰنِ", "ٱلرَّحِيمِ"],
-    1: ["ٱلْحَمْدُ", "لِلَّهِ", "رَبِّ", "ٱلْعَٰلَمِينَ"],
-    2: ["ٱلرَّحْمَٰنِ", "ٱلرَّحِيمِ"],
-    3: ["مَٰلِكِ", "يَوْمِ", "ٱلدِّينِ"],
-    4: ["إِيَّاكَ", "نَعْبُدُ", "وَإِيَّاكَ", "نَسْتَعِينُ"],
-    5: ["ٱهْدِنَا", "ٱلصِّرَٰطَ", "ٱلْمُسْتَقِيمَ"],
-    6: ["صِرَٰطَ", "ٱلَّذِينَ", "أَنْعَمْتَ", "عَلَيْهِمْ", "غَيْرِ", "ٱلْمَغْضُوبِ", "عَلَيْهِمْ", "وَلَا", "ٱلضَّآلِّينَ"]
-}
-
 # Set up request logging to a file
 REQUEST_LOG_FILE = 'request_log.txt'
-request_logger = logging.getLogger('request_logger')
-request_logger.setLevel(logging.INFO)
+request_logger = get_logger('requests')
 file_handler = logging.FileHandler(REQUEST_LOG_FILE)
 file_handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
 if not request_logger.hasHandlers():
     request_logger.addHandler(file_handler)
 
 def log_request(req):
+    # Parsing the form, JSON body and headers is skipped entirely when request logging is off
+    if not request_logger.isEnabledFor(logging.INFO):
+        return
     try:
-        request_logger.info(f"REQUEST: {req.method} {req.path}\n  args: {dict(req.args)}\n  form: {dict(req.form)}\n  json: {req.get_json(silent=True)}\n  headers: {dict(req.headers)}")
+        request_logger.info("REQUEST: %s %s\n  args: %s\n  form: %s\n  json: %s\n  headers: %s",
+                            req.method, req.path, dict(req.args), dict(req.form),
+                            req.get_json(silent=True), dict(req.headers))
     except Exception as e:
-        request_logger.error(f"Failed to log request: {e}")
+        request_logger.error("Failed to log request: %s", e)
 
 # Global variables for model and processor
 global_processor = None
 global_model = None
+global_token_trie = None
+# Held while the model loads, so requests that arrive during warmup wait for it instead of loading a second copy
+model_lock = threading.Lock()
+
+MODEL_ID = "fawzanaramam/Whisper-Small-Finetuned-on-Surah-Fatiha"
+# Every setting that can change a transcript, resolved once (see utils/runtime_config.py)
+ASR_SETTINGS = resolve_settings()
+# fp32, bf16, int8 or fp16 (ASR_PRECISION); bf16 falls back to fp32 on CPUs without native support
+MODEL_PRECISION = ASR_SETTINGS.precision
+# free or constrained (ASR_DECODING); constrained steers decoding along the reference ayat
+ASR_DECODING = ASR_SETTINGS.decoding
+# Encoder lengths in mel frames (ASR_ENCODER_BUCKETS, in seconds); empty encodes full windows
+ENCODER_BUCKETS = ASR_SETTINGS.encoder_buckets
+# Longest transcript decoded, in tokens including the prompt
+MAX_DECODE_LENGTH = 225
+# Pre-converted model, configs and processor; workers boot from it without the Hub, and memory-map
+# its weights so all of them share one copy of the model
+MODEL_SNAPSHOT_PATH = Path(os.environ.get(
+    'MODEL_SNAPSHOT_PATH', 'model_cache/whisper-small-fatiha-{precision}-v{format}'
+).format(precision=MODEL_PRECISION, format=SNAPSHOT_FORMAT))
+# eager, torchscript or onnx (ASR_BACKEND); exported graphs are written here on first start
+ASR_BACKEND = ASR_SETTINGS.backend
+EXPORT_PATH = Path(os.environ.get(
+    'ASR_EXPORT_PATH', 'model_cache/whisper-small-fatiha-{backend}-{precision}-v{format}'
+).format(backend=ASR_BACKEND, precision=MODEL_PRECISION, format=EXPORT_FORMAT))
+# Transcripts of audio seen before, keyed by the decoded samples, the model and every run setting
+TRANSCRIPTION_CACHE = TranscriptionCache(
+    f"{MODEL_ID}:{settings_fingerprint(ASR_SETTINGS)}",
+    maxsize=int(os.environ.get('TRANSCRIPTION_CACHE_SIZE', 1024)),
+    disk_dir=os.environ.get('TRANSCRIPTION_CACHE_DIR') or None,
+    disk_max_bytes=int(float(os.environ.get('TRANSCRIPTION_CACHE_DISK_MB', 256)) * 1024 * 1024)
+)
+# Load and warm up the model in a background thread at start-up (ASR_WARMUP); off loads it on the first request
+ASR_WARMUP = os.environ.get('ASR_WARMUP', '1').lower() not in ('0', 'false', 'no')
+# Length of the synthetic clip the warmup transcribes, about one ayah
+WARMUP_AUDIO_SECONDS = 5.0
+# Reported by /health/ready: loading, ready or failed
+MODEL_STATE = {'status': 'loading' if ASR_WARMUP else 'ready', 'error': None,
+               'load_seconds': None, 'warmup_seconds': None}
 
 def load_models():
-    """Load models once and share between workers"""
-    global global_processor, global_model
-    if global_processor is None or global_model is None:
-        print("[MEM] Loading models...")
+    """Load models once; the weights are memory-mapped and shared between workers"""
+    global global_processor, global_model, global_token_trie
+    if global_processor is not None and global_model is not None:
+        return
+    with model_lock:
+        if global_processor is not None and global_model is not None:
+            return
+        from utils.model_snapshot import write_snapshot, load_snapshot_processor, load_snapshot_model
+        from utils.exported_backend import export_model, ExportedWhisper, PROCESSOR_CONFIG
+        from utils.constrained_decoding import SurahTokenTrie
+
+        asr_logger.info("Loading models...")
         try:
-            # Try to access existing shared memory
-            shm = shared_memory.SharedMemory(name='whisper_model')
-            print("[MEM] Using existing model from shared memory")
-            # Load model from shared memory
-            model_bytes = bytes(shm.buf)
-            global_processor, global_model = pickle.loads(model_bytes)
-            print("[MEM] Models loaded successfully from shared memory")
-        except (FileNotFoundError, pickle.UnpicklingError, EOFError, AttributeError) as e:
-            # First worker loads the model or handle shared memory errors
-            print(f"[MEM] Loading model directly: {str(e)}")
-            try:
-                processor = AutoProcessor.from_pretrained(
-                    "fawzanaramam/Whisper-Small-Finetuned-on-Surah-Fatiha",
-                    low_memory=True
-                )
-                model = AutoModelForSpeechSeq2Seq.from_pretrained(
-                    "fawzanaramam/Whisper-Small-Finetuned-on-Surah-Fatiha",
-                    low_cpu_mem_usage=True,
-                    torch_dtype=torch.float16  # Use half precision
+            exported = ASR_BACKEND != 'eager' and EXPORT_PATH.exists()
+            if exported and (EXPORT_PATH / PROCESSOR_CONFIG).exists():
+                # The export holds its processor, so workers boot from it without the snapshot
+                processor = load_snapshot_processor(EXPORT_PATH)
+            else:
+                if read_snapshot(MODEL_SNAPSHOT_PATH) is None:
+                    # First worker converts the model once (quantizing for int8) and writes it out with its processor
+                    asr_logger.info("Writing %s model snapshot to %s", MODEL_PRECISION, MODEL_SNAPSHOT_PATH)
+                    write_snapshot(MODEL_ID, MODEL_SNAPSHOT_PATH, MODEL_PRECISION)
+                    gc.collect()
+                processor = load_snapshot_processor(MODEL_SNAPSHOT_PATH)
+            
+            if not exported:
+                # Built without allocating weights, then pointed at the mapped file
+                model = load_snapshot_model(MODEL_SNAPSHOT_PATH, MODEL_PRECISION, model_id=MODEL_ID)
+            
+            if ASR_BACKEND != 'eager':
+                if not exported:
+                    # First worker exports the graphs once; the eager model is only needed for that
+                    asr_logger.info("Exporting %s graphs to %s", ASR_BACKEND, EXPORT_PATH)
+                    export_model(model, EXPORT_PATH, ASR_BACKEND,
+                                 metadata={'model_id': MODEL_ID, 'precision': MODEL_PRECISION}, processor=processor)
+                    del model
+                    gc.collect()
+                model = ExportedWhisper(EXPORT_PATH, model_id=MODEL_ID)
+            
+            if ASR_DECODING == 'constrained':
+                global_token_trie = SurahTokenTrie(
+                    lambda text: processor.tokenizer(text, add_special_tokens=False).input_ids,
+                    model.generation_config.eos_token_id
                 )
-                # Move model to CPU and optimize memory
-                model = model.to('cpu').eval()
-                
-                # Try to use shared memory if possible
-                try:
-                    # Create shared memory and store model
-                    model_bytes = pickle.dumps((processor, model))
-                    shm = shared_memory.SharedMemory(create=True, size=len(model_bytes), name='whisper_model')
-                    shm.buf[:len(model_bytes)] = model_bytes
-                    print("[MEM] Model saved to shared memory")
-                except Exception as shm_err:
-                    # If shared memory fails, just use the models directly
-                    print(f"[MEM] Shared memory failed, using models directly: {str(shm_err)}")
-                
-                global_processor = processor
-                global_model = model
-                print("[MEM] Models loaded successfully")
-            except Exception as model_err:
-                print(f"[MEM] Failed to load models: {str(model_err)}")
-                raise
-
-def cleanup_shared_memory():
-    """Cleanup shared memory on shutdown"""
-    try:
-        shm = shared_memory.SharedMemory(name='whisper_model')
-        shm.close()
-        try:
-            shm.unlink()
-            print("[MEM] Shared memory unlinked successfully")
-        except Exception as e:
-            print(f"[MEM] Could not unlink shared memory: {str(e)}")
-    except FileNotFoundError:
-        print("[MEM] No shared memory to clean up")
-    except Exception as e:
-        print(f"[MEM] Error during shared memory cleanup: {str(e)}")
+                asr_logger.info("Built a %d-node token trie for constrained decoding", len(global_token_trie))
+            
+            global_processor = processor
+            global_model = model
+            asr_logger.info("Models loaded successfully from %s (%s, %s backend)",
+                            EXPORT_PATH if ASR_BACKEND != 'eager' else MODEL_SNAPSHOT_PATH,
+                            MODEL_PRECISION, ASR_BACKEND)
+        except Exception as model_err:
+            asr_logger.error("Failed to load models: %s", model_err)
+            raise
+
+def decoding_options():
+    """generate() arguments for the decoding mode"""
+    if global_token_trie is None:
+        return {'max_length': MAX_DECODE_LENGTH}
+    from transformers import LogitsProcessorList
+    from utils.constrained_decoding import SurahConstraintLogitsProcessor
+    # The start token and the forced language/task tokens come before the text
+    forced = global_model.generation_config.forced_decoder_ids or []
+    prompt_length = 1 + max((rank for rank, _ in forced), default=0)
+    constraint = SurahConstraintLogitsProcessor(global_token_trie, prompt_length, ASR_SETTINGS.constraint_penalty,
+                                                ASR_SETTINGS.constraint_misses)
+    # A whole surah, plus the tokens it may spend off the reference, is as long as a transcript gets
+    longest = prompt_length + global_token_trie.max_tokens + constraint.max_misses
+    return {'max_length': min(MAX_DECODE_LENGTH, longest), 'logits_processor': LogitsProcessorList([constraint])}
+
+def free_memory():
+    """Collect garbage and release cached GPU memory; torch is not imported just for this"""
+    gc.collect()
+    torch = sys.modules.get('torch')
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+def transcribe_batch(clips):
+    """Transcribe a batch of AudioClips with a single generate call"""
+    import torch
+    # One batched log-mel pass for every clip that has not computed its features yet
+    input_features = torch.from_numpy(log_mel_features(clips)).to(global_model.dtype)
+    
+    with torch.no_grad():
+        if ENCODER_BUCKETS:
+            # Encode only the frames the longest clip needs, rounded up to a bucket (ASR_ENCODER_BUCKETS)
+            input_features = input_features[..., :bucket_frames(max(len(clip) for clip in clips), ENCODER_BUCKETS)]
+        if ENCODER_BUCKETS and ASR_BACKEND == 'eager':
+            inputs = {'encoder_outputs': encode(global_model, input_features)}
+        else:
+            # Exported encoders take any number of frames
+            inputs = {'inputs': input_features}
+        generated_ids = global_model.generate(
+            num_beams=1,
+            **inputs,
+            **decoding_options()
+        )
+        transcriptions = global_processor.batch_decode(generated_ids, skip_special_tokens=True)
+    
+    # Clear temporary tensors
+    del input_features, inputs, generated_ids
+    free_memory()
+    
+    return [transcription.strip() for transcription in transcriptions]
 
-# Register cleanup function
-atexit.register(cleanup_shared_memory)
+# Concurrent requests are gathered into batches (ASR_MAX_BATCH_SIZE, ASR_MAX_WAIT_MS)
+ASR_SCHEDULER = InferenceScheduler(transcribe_batch, name='asr-batcher')
 
-def transcribe_audio(audio_file):
-    """Transcribe audio using global model instance"""
+def warm_up():
+    """Load the model and run a synthetic clip through it, so the first request does not pay for warmup"""
+    start = time.perf_counter()
+    try:
+        load_models()
+        loaded = time.perf_counter()
+        # Silence goes through the same path as a request: mel front end, scheduler, encoder and decoder
+        ASR_SCHEDULER.infer(AudioClip(np.zeros(int(WARMUP_AUDIO_SECONDS * TARGET_SAMPLE_RATE))))
+        # Compiles (or loads the cached) similarity kernels used by the ayah matcher
+        match_ayah_and_word(SURAH_FATIHA[0]['text'])
+        MODEL_STATE.update(status='ready', load_seconds=round(loaded - start, 2),
+                           warmup_seconds=round(time.perf_counter() - loaded, 2))
+        asr_logger.info("Model ready: loaded in %.1fs, warmed up in %.1fs",
+                        MODEL_STATE['load_seconds'], MODEL_STATE['warmup_seconds'])
+    except Exception as e:
+        MODEL_STATE.update(status='failed', error=str(e))
+        asr_logger.exception("Model warmup failed: %s", e)
+
+def read_upload(audio_file):
+    """Decode an uploaded file into an AudioClip without touching the disk"""
+    data = audio_file.read()
+    if PERSIST_UPLOADS:
+        logger.debug('Persisted upload to %s', persist_upload(data, UPLOAD_FOLDER, audio_file.filename))
+    return AudioClip.from_bytes(data)
+
+def as_clip(audio):
+    """An AudioClip from a clip, a file path or the bytes of an audio file"""
+    if isinstance(audio, AudioClip):
+        return audio
+    if isinstance(audio, (str, os.PathLike)):
+        audio = Path(audio).read_bytes()
+    return AudioClip.from_bytes(audio)
+
+def transcribe_audio(clip):
+    """Transcribe an AudioClip (or an audio file's path or bytes) using global model instance"""
     global global_processor, global_model
     try:
+        clip = as_clip(clip)
+        # Audio seen before is answered without touching the model
+        cache_key = TRANSCRIPTION_CACHE.key(clip)
+        cached = TRANSCRIPTION_CACHE.get(clip, cache_key)
+        if cached is not None:
+            asr_logger.debug("Transcription cache hit for %s", clip)
+            return cached
+        
         if global_processor is None or global_model is None:
             load_models()
-            
-        # Load and preprocess the audio
-        speech, sr = librosa.load(audio_file, sr=16000)
-        speech = speech.astype(np.float32)
-        
-        # Clear any unused memory
-        gc.collect()
-        torch.cuda.empty_cache() if torch.cuda.is_available() else None
         
-        # Process with Whisper model
-        inputs = global_processor(
-            speech,
-            sampling_rate=16000,
-            return_tensors="pt"
-        )
-        
-        with torch.no_grad():
-            generated_ids = global_model.generate(
-                inputs["input_features"],
-                max_length=225,
-                num_beams=1
-            )
-            transcription = global_processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
-        
-        # Clear temporary tensors
-        del inputs, generated_ids
-        gc.collect()
-        torch.cuda.empty_cache() if torch.cuda.is_available() else None
-        
-        return transcription.strip()
+        # Long recordings are split into windows of at most 30 s
+        windows = split_windows(clip)
+        if len(windows) == 1:
+            # Process with Whisper model, batched with any other pending requests
+            text = ASR_SCHEDULER.infer(clip)
+        else:
+            # Submit every window at once so they are decoded in the same batches, then join their texts
+            asr_logger.debug("Transcribing %s in %d windows", clip, len(windows))
+            texts = transcribe_clips([clip.segment(window.start, window.end) for window in windows])
+            text = merge_transcripts(texts, windows)
+        TRANSCRIPTION_CACHE.put(clip, text, cache_key)
+        return text
     except Exception as e:
-        print(f"Detailed transcription error: {str(e)}")
-        import traceback
-        print(f"Stack trace: {traceback.format_exc()}")
+        asr_logger.exception("Detailed transcription error: %s", e)
         raise
 
 @app.route('/')
 def index():
     log_request(request)
-    print('DEBUG: Handling / route')
+    logger.debug('Handling / route')
     return render_template('landing.html')
 
 @app.route('/demo')
 def demo():
     log_request(request)
-    print('DEBUG: Handling /demo route')
+    logger.debug('Handling /demo route')
     return render_template('index.html')
 
 @app.route('/tajweed-rules')
 def tajweed_rules():
     log_request(request)
-    print('DEBUG: Handling /tajweed-rules route')
+    logger.debug('Handling /tajweed-rules route')
     return render_template('tajweed_rules.html')
 
 def get_memory_usage():
     """Get current memory usage in MB"""
+    import psutil
     process = psutil.Process(os.getpid())
     return process.memory_info().rss / 1024 / 1024
 
-def log_memory(action):
-    """Log memory usage with a specific action"""
+def log_memory(action, level=logging.INFO):
+    """Log memory usage with a specific action; returns None without measuring when the level is off"""
+    if not memory_logger.isEnabledFor(level):
+        return None
     memory = get_memory_usage()
-    print(f"[MEMORY] {action}: {memory:.2f} MB")
+    memory_logger.log(level, "%s: %.2f MB", action, memory)
     return memory
 
+def transcribe_clips(clips):
+    """Transcribe several AudioClips, submitted together so they share batches"""
+    if global_processor is None or global_model is None:
+        load_models()
+    futures = [ASR_SCHEDULER.submit(clip) for clip in clips]
+    return [future.result() for future in futures]
+
+def transcription_message(result, analysis=None):
+    """WebSocket message for a partial or final StreamingTranscriber result"""
+    message = {
+        'type': 'transcription',
+        'text': result['text'],
+        'ayah_number': result['ayah_number'],
+        'word_index': result['word_index'],
+        'final': result['final'],
+        'has_error': False,
+    }
+    if analysis is not None:
+        message['feedback'] = analysis['feedback']
+        message['has_error'] = bool(analysis['feedback'])
+        if message['ayah_number'] is None:
+            message['ayah_number'] = analysis['ayah_number']
+    return message
+
+def finish_recording(streamer, target_ayah):
+    """Final transcript of a streamed recording, with Tajweed feedback"""
+    result = streamer.finish()
+    ayah_number = int(target_ayah) if str(target_ayah).isdigit() else None
+    analysis = analyze_transcript(result['text'], ayah_number) if result['text'] else None
+    ws_logger.info("Recording finished: %.1fs of audio, %d decodes", result['audio_seconds'], streamer.decodes)
+    return transcription_message(result, analysis)
+
 @sock.route('/ws')
 def handle_websocket(ws):
-    print("WebSocket connection established")
+    ws_logger.info("WebSocket connection established")
     request_logger.info("WEBSOCKET: /ws connection established")
     
-    # Log initial memory
+    # Memory is only measured when the memory logger is enabled
     initial_memory = log_memory("Initial memory before recording")
     peak_memory = initial_memory
     
     chunk_counter = 0
-    temp_wav = None
     target_ayah = None
-    audio_chunks = []
+    # Partial transcripts are decoded every WS_PARTIAL_INTERVAL seconds of audio while the user recites;
+    # the audio lives in a fixed-size ring buffer (WS_BUFFER_SECONDS)
+    streamer = StreamingTranscriber(transcribe_clips)
+    sequencer = FrameSequencer()
     done = False
     
     try:
         while not done:
             message = ws.receive()
             if message is None:
-                print("WebSocket closed by client.")
+                ws_logger.info("WebSocket closed by client.")
                 request_logger.info("WEBSOCKET: closed by client")
                 break
                 
@@ -254,134 +400,138 @@ def handle_websocket(ws):
             if isinstance(message, str):
                 try:
                     data = json.loads(message)
-                    if data.get('done'):
+                    if data.get('done') or data.get('type') == 'done':
                         done = True
                         # Log memory before processing
                         pre_process_memory = log_memory("Memory before processing recording")
                         
-                        # Process the recording
-                        result = process_recording(temp_wav, target_ayah)
+                        # Only the audio since the last partial is left to decode
+                        result = finish_recording(streamer, target_ayah)
                         
                         # Log memory after processing
                         post_process_memory = log_memory("Memory after processing recording")
-                        peak_memory = max(peak_memory, post_process_memory)
-                        
-                        print(f"Memory used for processing: {post_process_memory - pre_process_memory:.2f} MB")
-                        print(f"Peak memory: {peak_memory:.2f} MB")
+                        if post_process_memory is not None:
+                            peak_memory = max(peak_memory, post_process_memory)
+                            memory_logger.info("Memory used for processing: %.2f MB", post_process_memory - pre_process_memory)
+                            memory_logger.info("Peak memory: %.2f MB", peak_memory)
                         
                         # Cleanup
-                        gc.collect()
-                        torch.cuda.empty_cache() if torch.cuda.is_available() else None
+                        free_memory()
                         after_cleanup = log_memory("After cleanup")
-                        
-                        print(f"Memory freed by cleanup: {post_process_memory - after_cleanup:.2f} MB")
+                        if after_cleanup is not None:
+                            memory_logger.info("Memory freed by cleanup: %.2f MB", post_process_memory - after_cleanup)
                         
                         ws.send(json.dumps(result))
                     else:
-                        target_ayah = data.get('target_ayah')
-                        temp_wav = data.get('temp_wav')
+                        target_ayah = data.get('target_ayah', target_ayah)
                 except json.JSONDecodeError:
-                    print("Error decoding JSON message")
+                    ws_logger.error("Error decoding JSON message")
                     request_logger.error("WEBSOCKET: Error decoding JSON message")
             else:
-                # Handle binary audio data
-                audio_chunks.append(message)
+                # Binary audio frame (see utils/audio_stream.py); a WAV file per chunk is still accepted
                 chunk_counter += 1
-                current_memory = log_memory(f"Memory after chunk {chunk_counter}")
-                peak_memory = max(peak_memory, current_memory)
+                update = None
+                try:
+                    if message[:4] == b'RIFF':
+                        update = streamer.add(decode_audio(message))
+                    else:
+                        frame = parse_frame(message)
+                        if sequencer.accept(frame):
+                            update = streamer.add(frame.samples)
+                        if frame.end:
+                            done = True
+                            ws.send(json.dumps(finish_recording(streamer, target_ayah)))
+                            continue
+                except (AudioDecodeError, FrameError) as e:
+                    ws_logger.warning("Skipping bad audio message %d: %s", chunk_counter, e)
+                if update is not None:
+                    ws.send(json.dumps(transcription_message(update)))
+                
+                # Per-chunk memory is a DEBUG-level measurement
+                current_memory = log_memory("Memory after chunk %d" % chunk_counter, logging.DEBUG) \
+                    if memory_logger.isEnabledFor(logging.DEBUG) else None
+                if current_memory is not None:
+                    peak_memory = max(peak_memory, current_memory)
                 
     except Exception as e:
-        print(f"WebSocket error: {e}")
-        request_logger.error(f"WEBSOCKET: Error - {e}")
+        ws_logger.error("WebSocket error: %s", e)
+        request_logger.error("WEBSOCKET: Error - %s", e)
     finally:
         # Final memory cleanup
-        gc.collect()
-        torch.cuda.empty_cache() if torch.cuda.is_available() else None
+        free_memory()
+        if sequencer.missing or sequencer.dropped:
+            ws_logger.warning("Audio frames lost: %d missing, %d out of order", sequencer.missing, sequencer.dropped)
         final_memory = log_memory("Final memory")
-        print(f"Total memory change: {final_memory - initial_memory:.2f} MB")
-        print(f"Peak memory reached: {peak_memory:.2f} MB")
+        if final_memory is not None:
+            memory_logger.info("Total memory change: %.2f MB", final_memory - initial_memory)
+            memory_logger.info("Peak memory reached: %.2f MB", peak_memory)
 
 @app.route('/analyze', methods=['POST'])
 def analyze_audio():
     log_request(request)
-    print('DEBUG: Handling /analyze route')
+    logger.debug('Handling /analyze route')
     if 'audio' not in request.files:
-        print('DEBUG: No audio file provided')
+        logger.debug('No audio file provided')
         return jsonify({'error': 'No audio file provided'}), 400
     
     audio_file = request.files['audio']
     if audio_file.filename == '':
-        print('DEBUG: No selected file')
+        logger.debug('No selected file')
         return jsonify({'error': 'No selected file'}), 400
 
-    # Save the audio file
-    filename = Path(audio_file.filename)
-    save_path = UPLOAD_FOLDER / filename
-    audio_file.save(save_path)
-    print(f'DEBUG: Saved audio file to {save_path}')
-
     try:
-        # Transcribe using our new function
-        transcription = transcribe_audio(str(save_path))
-        print(f'DEBUG: Transcription: {transcription}')
-        
-        # Match transcribed text with Fatiha verses
-        ayah_number, word_index = match_ayah_and_word(transcription)
-        print(f'DEBUG: Matched ayah_number: {ayah_number}, word_index: {word_index}')
+        # Decode the upload in memory and transcribe it
+        clip = read_upload(audio_file)
+        transcription = transcribe_audio(clip)
+        logger.debug('Transcription: %s', transcription)
         
-        # Analyze using our Tajweed checker
-        if ayah_number is not None:
-            feedback = analyze_ayah(ayah_number, transcription)
-        else:
-            feedback = [{
-                'type': 'error',
-                'message': "Could not match recitation to any ayah of Surah Al-Fatiha"
-            }]
-        print(f'DEBUG: Feedback: {feedback}')
+        # Match with Fatiha verses and analyze (cached per normalized transcript)
+        analysis = analyze_transcript(transcription)
+        ayah_number = analysis['ayah_number']
+        logger.debug('Matched ayah_number: %s, word_index: %s', ayah_number, analysis["word_index"])
+        logger.debug('Feedback: %s', analysis["feedback"])
         
         return jsonify({
             'success': True,
             'transcription': transcription,
             'ayah_number': ayah_number,
-            'feedback': get_formatted_feedback(feedback)
+            'feedback': analysis['feedback']
         })
 
+    except AudioDecodeError as e:
+        logger.debug('Could not decode upload: %s', e)
+        return jsonify({'error': str(e)}), 400
+
     except Exception as e:
-        print(f'DEBUG: Exception: {e}')
+        logger.error('Exception: %s', e)
         return jsonify({'error': str(e)}), 500
 
-    finally:
-        # Clean up the audio file
-        if save_path.exists():
-            save_path.unlink()
-            print(f'DEBUG: Deleted audio file {save_path}')
-
 @app.route('/latest-recording')
 def get_latest_recording():
     log_request(request)
-    print('DEBUG: Handling /latest-recording route')
+    logger.debug('Handling /latest-recording route')
     global latest_recording
     if latest_recording and latest_recording.exists():
-        print(f'DEBUG: Returning latest recording {latest_recording}')
+        logger.debug('Returning latest recording %s', latest_recording)
         return send_file(str(latest_recording), mimetype='audio/wav')
-    print('DEBUG: No recording available')
+    logger.debug('No recording available')
     return "No recording available", 404
 
 @app.route('/analyze-dataset', methods=['GET'])
 def analyze_dataset():
     log_request(request)
-    print('DEBUG: Handling /analyze-dataset route')
+    logger.debug('Handling /analyze-dataset route')
     # Fix the path to use the exact folder name with space
     current_dir = Path(__file__).parent
     dataset_path = current_dir / 'tajweed dataset' / 'audio'
-    print(f"Looking for dataset at: {dataset_path}")
+    logger.debug("Looking for dataset at: %s", dataset_path)
     results = []
     
     try:
         metadata_file = dataset_path / 'fatiha_metadata_final.csv'
-        print(f"Trying to open metadata file: {metadata_file}")
+        logger.debug("Trying to open metadata file: %s", metadata_file)
         if not metadata_file.exists():
-            print(f"DEBUG: Metadata file not found at {metadata_file}")
+            logger.debug("Metadata file not found at %s", metadata_file)
             return jsonify({'error': f'Metadata file not found at {metadata_file}'}), 404
             
         # Read the metadata file
@@ -389,106 +539,77 @@ def analyze_dataset():
             import csv
             reader = csv.DictReader(f)
             metadata = list(reader)
-        print(f"DEBUG: Loaded metadata with {len(metadata)} entries")
+        logger.debug("Loaded metadata with %s entries", len(metadata))
         
         for entry in metadata:
             audio_file = dataset_path / entry['file'].replace('.wav', '.mp3')
-            print(f"Processing audio file: {audio_file}")
+            logger.debug("Processing audio file: %s", audio_file)
             if not audio_file.exists():
-                print(f"Audio file not found: {audio_file}")
+                logger.debug("Audio file not found: %s", audio_file)
                 continue
                 
             try:
                 # Transcribe the audio
                 result = model.transcribe(str(audio_file), language="ar")
                 transcription = result['text'].strip()
-                print(f"DEBUG: Transcription for {audio_file}: {transcription}")
+                logger.debug("Transcription for %s: %s", audio_file, transcription)
                 
                 # Get the ayah number from metadata
                 ayah_number = int(entry['ayah']) - 1  # Convert to 0-based index
-                print(f"DEBUG: Ayah number for {audio_file}: {ayah_number}")
+                logger.debug("Ayah number for %s: %s", audio_file, ayah_number)
                 
                 # Analyze using our Tajweed checker
-                feedback = analyze_ayah(ayah_number, transcription)
-                print(f"DEBUG: Feedback for {audio_file}: {feedback}")
+                feedback = analyze_transcript(transcription, ayah_number)['feedback']
+                logger.debug("Feedback for %s: %s", audio_file, feedback)
                 
                 results.append({
                     'reciter': entry['reciter'],
                     'ayah': entry['ayah'],
                     'original_text': entry['text'],
                     'transcribed_text': transcription,
-                    'feedback': get_formatted_feedback(feedback)
+                    'feedback': feedback
                 })
                 
             except Exception as e:
-                print(f"Error processing {audio_file}: {str(e)}")
+                logger.error("Error processing %s: %s", audio_file, e)
                 results.append({
                     'reciter': entry['reciter'],
                     'ayah': entry['ayah'],
                     'error': str(e)
                 })
-        print(f"DEBUG: Finished processing dataset")
+        logger.debug("Finished processing dataset")
         return jsonify(results)
     except Exception as e:
-        print(f"Error in analyze_dataset: {str(e)}")
+        logger.error("Error in analyze_dataset: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/reference-audio/<reciter>/<ayah>')
 def get_reference_audio(reciter, ayah):
     log_request(request)
-    print(f'DEBUG: Handling /reference-audio/{reciter}/{ayah} route')
+    logger.debug('Handling /reference-audio/%s/%s route', reciter, ayah)
     # Construct the audio file path
     audio_file = Path(__file__).parent / 'tajweed dataset' / 'audio' / f'{reciter}_00100{ayah}.mp3'
     
     if not audio_file.exists():
-        print(f'DEBUG: Audio file not found: {audio_file}')
+        logger.debug('Audio file not found: %s', audio_file)
         return "Audio file not found", 404
         
-    print(f'DEBUG: Returning audio file: {audio_file}')
+    logger.debug('Returning audio file: %s', audio_file)
     return send_file(str(audio_file), mimetype='audio/mpeg')
 
 @app.route('/switch_model/<model_name>')
 def switch_model(model_name):
     log_request(request)
-    print(f'DEBUG: Handling /switch_model/{model_name} route')
+    logger.debug('Handling /switch_model/%s route', model_name)
     """Switch between ASR models"""
     global CURRENT_MODEL
     if model_name in ["whisper", "wav2vec2"]:
         CURRENT_MODEL = model_name
-        print(f'DEBUG: Switched to model {model_name}')
+        logger.debug('Switched to model %s', model_name)
         return jsonify({"status": "success", "message": f"Switched to {model_name} model"})
-    print(f'DEBUG: Invalid model name: {model_name}')
+    logger.debug('Invalid model name: %s', model_name)
     return jsonify({"status": "error", "message": "Invalid model name"})
 
-def get_audio_duration_librosa(audio_path):
-    """Get duration of audio file in seconds using librosa, with robust fallbacks."""
-    try:
-        import librosa
-        duration = librosa.get_duration(path=audio_path)
-        if duration > 0:
-            return duration
-    except Exception as e:
-        print(f"Librosa failed: {e}")
-    # Fallback to soundfile
-    try:
-        import soundfile as sf
-        f = sf.SoundFile(audio_path)
-        duration = len(f) / f.samplerate
-        return duration
-    except Exception as e:
-        print(f"SoundFile failed: {e}")
-    # Fallback to wave
-    try:
-        import wave
-        with wave.open(audio_path, 'rb') as wf:
-            frames = wf.getnframes()
-            rate = wf.getframerate()
-            duration = frames / float(rate)
-            return duration
-    except Exception as e:
-        print(f"Wave failed: {e}")
-    return 0.0
-
 @app.route('/madd-audio-analysis', methods=['POST'])
 def madd_audio_analysis():
     debug_log = []
@@ -503,19 +624,19 @@ def madd_audio_analysis():
             error = 'No selected file'
             debug_log.append(error)
             return jsonify({'status': 'error', 'error': error, 'debug': debug_log}), 400
-        filename = Path(audio_file.filename)
-        save_path = UPLOAD_FOLDER / filename
-        audio_file.save(save_path)
-        debug_log.append(f'Saved audio file to {save_path}')
+        try:
+            clip = read_upload(audio_file)
+        except AudioDecodeError as e:
+            debug_log.append(str(e))
+            return jsonify({'status': 'error', 'error': str(e), 'debug': debug_log}), 400
+        debug_log.append(f'Decoded {clip}')
 
         # 2. Transcribe
-        transcription = transcribe_audio(str(save_path))
+        transcription = transcribe_audio(clip)
         debug_log.append(f'Transcription: {transcription}')
         if not transcription:
             error = 'Transcription failed.'
             debug_log.append(error)
-            if save_path.exists():
-                save_path.unlink()
             return jsonify({'status': 'error', 'error': error, 'debug': debug_log}), 400
 
         # 3. Match ayah
@@ -524,8 +645,6 @@ def madd_audio_analysis():
         if ayah_number is None:
             error = 'Could not match recitation to any ayah of Surah Al-Fatiha.'
             debug_log.append(error)
-            if save_path.exists():
-                save_path.unlink()
             return jsonify({'status': 'error', 'error': error, 'debug': debug_log}), 400
 
         # 4. Get ayah text and words
@@ -533,8 +652,6 @@ def madd_audio_analysis():
         if not ayah_data:
             error = f'Ayah {ayah_number} not found in SURAH_FATIHA.'
             debug_log.append(error)
-            if save_path.exists():
-                save_path.unlink()
             return jsonify({'status': 'error', 'error': error, 'debug': debug_log}), 400
         ayah_text = ayah_data['text']
         words = ayah_text.split()
@@ -553,7 +670,7 @@ def madd_audio_analysis():
             if target_word:
                 word_idx = words.index(target_word)
                 # Get audio duration and word durations
-                audio_duration = get_audio_duration_librosa(str(save_path))
+                audio_duration = clip.duration
                 debug_log.append(f'Audio duration: {audio_duration:.2f}s')
                 word_lengths = [len(normalize_arabic_text(w)) for w in words]
                 total_length = sum(word_lengths)
@@ -586,11 +703,6 @@ def madd_audio_analysis():
         else:
             debug_log.append('Not last ayah, skipping Madd feedback.')
 
-        # Clean up audio file only after all processing
-        if save_path.exists():
-            save_path.unlink()
-            debug_log.append(f'Deleted audio file {save_path}')
-
         return jsonify({
             'status': 'done',
             'results': madd_results,
@@ -602,6 +714,16 @@ def madd_audio_analysis():
         debug_log.append(error)
         return jsonify({'status': 'error', 'error': error, 'debug': debug_log}), 500
 
+@app.route('/health/live')
+def liveness_check():
+    """Liveness probe: the worker answers requests; nothing is measured or loaded"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/health/ready')
+def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 while loading or after a failure"""
+    return jsonify(MODEL_STATE), 200 if MODEL_STATE['status'] == 'ready' else 503
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for monitoring"""
@@ -616,6 +738,10 @@ def health_check():
             'flask_version': flask.__version__,
             'werkzeug_version': werkzeug.__version__,
             'models_loaded': global_processor is not None and global_model is not None,
+            'model_status': MODEL_STATE['status'],
+            'analysis_cache': ANALYSIS_CACHE.stats(),
+            'asr_scheduler': ASR_SCHEDULER.stats(),
+            'transcription_cache': TRANSCRIPTION_CACHE.stats(),
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -625,11 +751,12 @@ def health_check():
             'timestamp': datetime.now().isoformat()
         }), 500
 
-# Load models when app starts
-load_models()
+# Load and warm up the model without blocking worker boot; /health/ready reports when it is done
+if ASR_WARMUP:
+    threading.Thread(target=warm_up, name='asr-warmup', daemon=True).start()
 
 if __name__ == '__main__':
     # Development server
     port = int(os.environ.get('PORT', 5001))
-    print(f"[INFO] Starting server on port {port}")
+    logger.info("Starting server on port %s", port)
     app.run(debug=True, host='0.0.0.0', port=port) 
\ No newline at end of file
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for bulk re-analysis of stored recitations.
+
+Builds distinct (ayah, transcript) pairs by dropping, repeating and
+corrupting words of the Fatiha reference texts, then runs them through
+analyze_ayah_batch in this process and through analyze_ayah_parallel on a
+process pool.
+
+Usage:
+    python benchmarks/bench_analysis.py [--items 20000] [--workers N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.reference_corpus import FATIHA  # noqa: E402
+from utils.tajweed_checker import analyze_ayah_batch, analyze_ayah_parallel  # noqa: E402
+
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+def recitation_pairs(count, seed=0):
+    rng = random.Random(seed)
+    pairs = set()
+    while len(pairs) < count:
+        ayah = rng.choice(list(FATIHA))
+        words = list(ayah.simple_words)
+        for _ in range(rng.randint(1, 3)):
+            i = rng.randrange(len(words))
+            op = rng.random()
+            if op < 0.3 and len(words) > 1:
+                del words[i]
+            elif op < 0.5:
+                words.insert(i, words[i])
+            else:
+                pos = rng.randrange(len(words[i]))
+                words[i] = words[i][:pos] + rng.choice(LETTERS) + words[i][pos + 1:]
+        pairs.add((ayah.id, ' '.join(words)))
+    return sorted(pairs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=20000, help='Distinct (ayah, transcript) pairs')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+    args = parser.parse_args()
+
+    items = recitation_pairs(args.items)
+    analyze_ayah_batch(items[:100])
+
+    start = time.perf_counter()
+    analyze_ayah_batch(items)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analyze_ayah_parallel(items, max_workers=args.workers)
+    parallel = time.perf_counter() - start
+
+    print(f"{len(items)} recitations")
+    print(f"sequential:           {len(items) / sequential:>10.0f} /s")
+    print(f"process pool ({args.workers:>2} w): {len(items) / parallel:>10.0f} /s ({sequential / parallel:.1f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the n-gram ayah index at whole-Quran scale.
+
+Builds an index over a Tanzil text export when one is given, otherwise
+over 6,236 synthetic ayat (random Arabic words, same ayah count and a
+similar length distribution). Saves it, reopens it with mmap, and times
+AyahIndex.search on partial, corrupted transcripts taken from random ayat.
+
+Usage:
+    python benchmarks/bench_ayah_index.py [--tanzil quran-simple-clean.txt] [--queries 2000]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.ayah_index import AyahIndex, read_tanzil  # noqa: E402
+
+QURAN_AYAH_COUNT = 6236
+LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+def synthetic_quran(seed=0):
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choice(LETTERS) for _ in range(rng.randint(2, 8))) for _ in range(15000)]
+    entries = []
+    surah, ayah = 1, 0
+    for _ in range(QURAN_AYAH_COUNT):
+        ayah += 1
+        if ayah > rng.randint(20, 120):
+            surah, ayah = surah + 1, 1
+        words = [rng.choice(vocabulary) for _ in range(max(3, int(rng.expovariate(1 / 14))))]
+        entries.append((surah, ayah, ' '.join(words)))
+    return entries
+
+def corrupt_query(text, rng):
+    """Take a window of 2-8 words and change one letter in a third of the words."""
+    words = text.split()
+    start = rng.randrange(len(words))
+    window = words[start:start + rng.randint(2, 8)]
+    for i, word in enumerate(window):
+        if rng.random() < 0.33 and len(word) > 2:
+            pos = rng.randrange(len(word))
+            window[i] = word[:pos] + rng.choice(LETTERS) + word[pos + 1:]
+    return ' '.join(window), start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tanzil', help='Tanzil "surah|ayah|text" export to index instead of synthetic ayat')
+    parser.add_argument('--queries', type=int, default=2000, help='Number of queries to time')
+    args = parser.parse_args()
+
+    entries = list(read_tanzil(args.tanzil)) if args.tanzil else synthetic_quran()
+    start = time.perf_counter()
+    built = AyahIndex.build(entries)
+    print(f"Built index over {len(built)} ayat in {time.perf_counter() - start:.2f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        built.save(tmp)
+        size = sum(f.stat().st_size for f in Path(tmp).iterdir())
+        start = time.perf_counter()
+        index = AyahIndex.load(tmp)
+        print(f"On-disk size {size / 1e6:.2f} MB, mmap load {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+        # Warm the word-encoding memo the way a long-running worker would
+        rng = random.Random(2)
+        for _ in range(500):
+            surah, ayah, _ = rng.choice(entries)
+            index.search(corrupt_query(index.text(index.row(surah, ayah)), rng)[0], top_k=5)
+
+        rng = random.Random(1)
+        latencies, hits, start_hits = [], 0, 0
+        for _ in range(args.queries):
+            surah, ayah, text = rng.choice(entries)
+            query, start_word = corrupt_query(index.text(index.row(surah, ayah)), rng)
+            t0 = time.perf_counter()
+            candidates = index.search(query, top_k=5)
+            latencies.append(time.perf_counter() - t0)
+            if candidates and (candidates[0].surah, candidates[0].ayah) == (surah, ayah):
+                hits += 1
+                start_hits += candidates[0].start_word == start_word
+
+    latencies = np.array(latencies) * 1e3
+    print(f"search latency: p50 {np.percentile(latencies, 50):.3f} ms, "
+          f"p99 {np.percentile(latencies, 99):.3f} ms, mean {latencies.mean():.3f} ms")
+    print(f"top-1 ayah accuracy {hits / args.queries:.1%}, start word accuracy {start_hits / max(hits, 1):.1%}")
+
+if __name__ == '__main__':
+    main()
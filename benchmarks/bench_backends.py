@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Latency and transcript agreement of the ASR inference backends.
+
+Exports the model to each backend (see utils/exported_backend.py) and
+transcribes the bundled `tajweed dataset/audio` clips one at a time, and
+in batches, with greedy decoding. Agreement is the share of clips whose
+tokens match the eager model's.
+
+--tiny runs a randomly initialised Whisper-tiny instead of the fine-tuned
+checkpoint, for measuring speed without downloading it. An untrained
+decoder rarely emits end-of-text, so every clip decodes --max-new-tokens
+tokens, which makes it a per-step overhead benchmark.
+
+Usage:
+    python benchmarks/bench_backends.py [--backends torchscript onnx] [--clips 10] [--tiny]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import torch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.audio_io import AudioClip, log_mel_features  # noqa: E402
+from utils.exported_backend import ExportedWhisper, export_model, decoder_prompt  # noqa: E402
+from tests.helpers import WHISPER_TINY, tiny_whisper  # noqa: E402
+
+MODEL_ID = "fawzanaramam/Whisper-Small-Finetuned-on-Surah-Fatiha"
+AUDIO_DIR = PROJECT_ROOT / 'tajweed dataset' / 'audio'
+
+def build_model(tiny, model_id):
+    from transformers import AutoModelForSpeechSeq2Seq, GenerationConfig
+    if tiny:
+        return tiny_whisper(4, 4, forced=True, **WHISPER_TINY)
+    model = AutoModelForSpeechSeq2Seq.from_pretrained(model_id, low_cpu_mem_usage=True)
+    model.generation_config = GenerationConfig.from_pretrained(model_id)
+    return model.eval()
+
+def timed(generate, features, batch_size, max_length):
+    """Per-clip latencies and the generated ids, batch_size clips per call."""
+    latencies, outputs = [], []
+    for start in range(0, len(features), batch_size):
+        begin = time.perf_counter()
+        with torch.no_grad():
+            ids = generate(features[start:start + batch_size], max_length)
+        elapsed = time.perf_counter() - begin
+        latencies.extend([elapsed / len(ids)] * len(ids))
+        outputs.extend(ids.tolist())
+    return latencies, outputs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=['torchscript', 'onnx'], help='Exported backends to compare')
+    parser.add_argument('--clips', type=int, default=None, help='Number of clips (default: all)')
+    parser.add_argument('--batch-size', type=int, default=8, help='Clips per call in the batched run')
+    parser.add_argument('--max-new-tokens', type=int, default=64, help='Decoding limit per clip')
+    parser.add_argument('--model', default=MODEL_ID, help='Checkpoint to benchmark')
+    parser.add_argument('--tiny', action='store_true', help='Use a random Whisper-tiny instead of the checkpoint')
+    parser.add_argument('--export-dir', default=None, help='Where exports are kept (default: a temp dir)')
+    args = parser.parse_args()
+
+    model = build_model(args.tiny, args.model)
+    clips = [AudioClip.from_bytes(path.read_bytes()) for path in sorted(AUDIO_DIR.glob('*.mp3'))[:args.clips]]
+    features = torch.from_numpy(log_mel_features(clips))
+    max_length = len(decoder_prompt(model.generation_config)) + args.max_new_tokens
+    export_dir = Path(args.export_dir or tempfile.mkdtemp(prefix='backends-'))
+    tag = 'tiny' if args.tiny else 'model'
+
+    generators = {'eager': lambda batch, length: model.generate(batch, max_length=length, num_beams=1)}
+    for backend in args.backends:
+        path = export_dir / f'{tag}-{backend}'
+        if not path.exists():
+            start = time.perf_counter()
+            export_model(model, path, backend)
+            print(f"Exported {backend} in {time.perf_counter() - start:.1f} s")
+        generators[backend] = ExportedWhisper(path).generate
+
+    print(f"{len(clips)} clips, greedy decoding, up to {args.max_new_tokens} tokens, "
+          f"{torch.get_num_threads()} thread(s), {os.cpu_count()} CPU(s)")
+    print(f"{'backend':>12}{'batch':>7}{'mean ms':>9}{'p90 ms':>8}{'speedup':>9}{'same':>7}")
+    for batch_size in (1, args.batch_size):
+        reference, baseline = None, None
+        for backend, generate in generators.items():
+            generate(features[:1], max_length)  # warm up
+            latencies, outputs = timed(generate, features, batch_size, max_length)
+            reference = reference or outputs
+            latencies = sorted(latencies)
+            mean_ms = 1000 * sum(latencies) / len(latencies)
+            p90_ms = 1000 * latencies[int(0.9 * (len(latencies) - 1))]
+            baseline = baseline or mean_ms
+            same = sum(a == b for a, b in zip(outputs, reference)) / len(reference)
+            print(f"{backend:>12}{batch_size:>7}{mean_ms:>9.0f}{p90_ms:>8.0f}{baseline / mean_ms:>8.2f}x{same:>7.0%}")
+
+if __name__ == '__main__':
+    main()
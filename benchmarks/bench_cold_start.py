@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Cold-start time of the ASR model, from the Hub against a local snapshot.
+
+Each way of loading the model runs in a fresh process, as a booting
+worker does, and is timed from the first import of torch until the model
+and processor are ready:
+
+- hub: processor and model from the Hub checkpoint, converted to the
+  precision mode on the spot
+- weights: processor and configs from the Hub, weights memory-mapped from
+  a pre-converted safetensors file (the app's path before snapshots)
+- snapshot: everything from a local snapshot (see utils/model_snapshot.py)
+
+The Hub paths use the local Hugging Face cache once it is warm, but still
+resolve the checkpoint. --offline sets HF_HUB_OFFLINE for them, which
+skips that but is not how the app runs.
+
+--tiny uses a randomly initialised Whisper-tiny with a three-token
+tokenizer, saved to a local directory that stands in for the Hub, for
+measuring without downloading the checkpoint; its "hub" path then pays
+for parsing and conversion but not for network round trips.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--precision int8] [--repeat 5] [--tiny]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from tests.helpers import WHISPER_TINY, tiny_processor, tiny_whisper  # noqa: E402
+
+MODEL_ID = "fawzanaramam/Whisper-Small-Finetuned-on-Surah-Fatiha"
+PATHS = ('hub', 'weights', 'snapshot')
+
+def save_tiny_checkpoint(directory):
+    """Write a random Whisper-tiny and a tiny processor where from_pretrained can find them."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tiny_processor(directory).save_pretrained(directory)
+    tiny_whisper(4, 4, **WHISPER_TINY).save_pretrained(directory)
+
+def prepare(model_id, precision, weights_path, snapshot_dir):
+    """Write the converted weights file and the snapshot, like the first app worker does."""
+    import torch
+    from transformers import AutoModelForSpeechSeq2Seq
+    from utils.precision import convert_model, save_model
+    from utils.model_snapshot import write_snapshot
+    model = AutoModelForSpeechSeq2Seq.from_pretrained(model_id, torch_dtype=torch.float32)
+    save_model(convert_model(model, precision), weights_path, precision)
+    write_snapshot(model_id, snapshot_dir, precision)
+
+def cold_start(path, model_id, precision, weights_path, snapshot_dir):
+    """Load the model one way in this (fresh) process; returns (import s, load s)."""
+    start = time.perf_counter()
+    import torch
+    from transformers import AutoConfig, AutoModelForSpeechSeq2Seq, AutoProcessor, GenerationConfig
+    from utils.precision import convert_model, load_model
+    from utils.model_snapshot import load_snapshot_processor, load_snapshot_model
+    imported = time.perf_counter()
+
+    if path == 'hub':
+        processor = AutoProcessor.from_pretrained(model_id)
+        model = AutoModelForSpeechSeq2Seq.from_pretrained(model_id, torch_dtype=torch.float32)
+        model = convert_model(model, precision)
+        model.generation_config = GenerationConfig.from_pretrained(model_id)
+    elif path == 'weights':
+        processor = AutoProcessor.from_pretrained(model_id)
+        config = AutoConfig.from_pretrained(model_id)
+        model = load_model(lambda dtype: AutoModelForSpeechSeq2Seq.from_config(config, torch_dtype=dtype),
+                           weights_path, precision)
+        model.generation_config = GenerationConfig.from_pretrained(model_id)
+    else:
+        processor = load_snapshot_processor(snapshot_dir)
+        model = load_snapshot_model(snapshot_dir, precision)
+    assert processor is not None and model is not None
+    return imported - start, time.perf_counter() - imported
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--precision', default='fp32', choices=['fp32', 'bf16', 'int8', 'fp16'],
+                        help='Precision mode to load')
+    parser.add_argument('--repeat', type=int, default=5, help='Cold starts per path; the median is reported')
+    parser.add_argument('--model', default=MODEL_ID, help='Checkpoint to benchmark')
+    parser.add_argument('--tiny', action='store_true', help='Use a random Whisper-tiny instead of the checkpoint')
+    parser.add_argument('--offline', action='store_true', help='Set HF_HUB_OFFLINE for the Hub paths')
+    parser.add_argument('--cache-dir', default=None, help='Where converted models are kept (default: a temp dir)')
+    args = parser.parse_args()
+
+    cache_dir = Path(args.cache_dir or tempfile.mkdtemp(prefix='cold-start-'))
+    tag = 'tiny' if args.tiny else 'model'
+    model_id = args.model
+    if args.tiny:
+        model_id = str(cache_dir / 'tiny-checkpoint')
+        if not Path(model_id).exists():
+            save_tiny_checkpoint(model_id)
+    if args.offline:
+        os.environ['HF_HUB_OFFLINE'] = '1'
+    weights_path = cache_dir / f'{tag}-{args.precision}.safetensors'
+    snapshot_dir = cache_dir / f'{tag}-{args.precision}-snapshot'
+
+    # A fresh process per step, so nothing is imported or cached from an earlier one
+    context = multiprocessing.get_context('spawn')
+    if not (weights_path.exists() and snapshot_dir.exists()):
+        with context.Pool(1) as pool:
+            pool.apply(prepare, (model_id, args.precision, weights_path, snapshot_dir))
+
+    results = {}
+    for path in PATHS:
+        runs = []
+        for _ in range(args.repeat):
+            with context.Pool(1) as pool:
+                runs.append(pool.apply(cold_start, (path, model_id, args.precision, weights_path, snapshot_dir)))
+        results[path] = runs
+
+    print(f"{args.repeat} cold starts per path, {args.precision}, {os.cpu_count()} CPU(s)")
+    print(f"{'path':>10}{'import s':>10}{'load s':>8}{'total s':>9}{'speedup':>9}")
+    baseline = None
+    for path, runs in results.items():
+        import_s = statistics.median(run[0] for run in runs)
+        load_s = statistics.median(run[1] for run in runs)
+        total_s = statistics.median(sum(run) for run in runs)
+        baseline = baseline or total_s
+        print(f"{path:>10}{import_s:>10.2f}{load_s:>8.2f}{total_s:>9.2f}{baseline / total_s:>8.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Encoder time and transcript agreement per encoder bucket length.
+
+Encodes the bundled `tajweed dataset/audio` clips over Whisper's full
+30 s window and over each bucket long enough to hold them (see
+utils/encoder_buckets.py), and decodes both greedily. For each bucket it
+reports the encoder time against the full window and how many transcripts
+are unchanged (with the mean similarity of the normalized text). The
+shortest bucket at which, with every longer bucket, all transcripts
+agree is a safe minimum for ASR_ENCODER_BUCKETS.
+
+--tiny runs a randomly initialised Whisper-tiny instead of the fine-tuned
+checkpoint, for measuring speed without downloading it; its "transcripts"
+are token ids, and agreement is not meaningful.
+
+Usage:
+    python benchmarks/bench_encoder_buckets.py [--buckets 5 10 15 20] [--clips 37] [--tiny]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import torch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.audio_io import AudioClip, log_mel_features  # noqa: E402
+from utils.encoder_buckets import parse_buckets, needed_frames, encode  # noqa: E402
+from utils.mel_frontend import N_FRAMES, HOP_LENGTH, SAMPLE_RATE  # noqa: E402
+from tests.helpers import WHISPER_TINY, tiny_whisper  # noqa: E402
+
+MODEL_ID = "fawzanaramam/Whisper-Small-Finetuned-on-Surah-Fatiha"
+AUDIO_DIR = PROJECT_ROOT / 'tajweed dataset' / 'audio'
+
+def build_model(tiny, model_id):
+    from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor
+    if tiny:
+        return tiny_whisper(4, 4, **WHISPER_TINY), None
+    model = AutoModelForSpeechSeq2Seq.from_pretrained(model_id, low_cpu_mem_usage=True).eval()
+    return model, AutoProcessor.from_pretrained(model_id)
+
+def best_of(repeat, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--buckets', nargs='+', default=['5', '7.5', '10', '15', '20'],
+                        help='Bucket lengths in seconds (the full 30 s window is always added)')
+    parser.add_argument('--clips', type=int, default=None, help='Number of clips (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='Encoder timing repetitions, best is reported')
+    parser.add_argument('--max-new-tokens', type=int, default=64, help='Decoding limit per clip')
+    parser.add_argument('--model', default=MODEL_ID, help='Checkpoint to benchmark')
+    parser.add_argument('--tiny', action='store_true', help='Use a random Whisper-tiny instead of the checkpoint')
+    args = parser.parse_args()
+
+    from utils.tajweed_checker import normalize_arabic_text
+    from utils.text_matcher import similar
+
+    torch.set_num_threads(os.cpu_count())
+    buckets = parse_buckets(','.join(args.buckets))
+    model, processor = build_model(args.tiny, args.model)
+    paths = sorted(AUDIO_DIR.glob('*.mp3'))[:args.clips]
+    clips = [AudioClip.from_bytes(path.read_bytes()) for path in paths]
+    features = torch.from_numpy(log_mel_features(clips))
+    normalize = str if args.tiny else normalize_arabic_text
+
+    def run(index, frames):
+        """Best encoder time and the transcript of one clip over `frames` frames."""
+        with torch.no_grad():
+            encoder_s, outputs = best_of(args.repeat, lambda: encode(model, features[index:index + 1, :, :frames]))
+            ids = model.generate(encoder_outputs=outputs, max_new_tokens=args.max_new_tokens, num_beams=1)
+        if processor is None:
+            return encoder_s, ' '.join(str(token) for token in ids[0].tolist())
+        return encoder_s, processor.batch_decode(ids, skip_special_tokens=True)[0].strip()
+
+    full = [run(index, N_FRAMES) for index in range(len(clips))]
+    seconds = [clip.duration for clip in clips]
+    print(f"{len(clips)} clips, {min(seconds):.1f}-{max(seconds):.1f} s, greedy decoding, "
+          f"{os.cpu_count()} CPU(s)")
+    print(f"{'bucket s':>9}{'frames':>8}{'clips':>7}{'encoder ms':>12}{'full ms':>9}{'speedup':>9}"
+          f"{'same':>7}{'sim':>7}")
+    agreeing = []
+    for frames in buckets[:-1]:
+        fitting = [index for index, clip in enumerate(clips) if needed_frames(len(clip)) <= frames]
+        if not fitting:
+            print(f"{frames * HOP_LENGTH / SAMPLE_RATE:>9.1f}{frames:>8}{0:>7}")
+            continue
+        results = {index: run(index, frames) for index in fitting}
+        encoder_ms = 1000 * sum(results[index][0] for index in fitting) / len(fitting)
+        full_ms = 1000 * sum(full[index][0] for index in fitting) / len(fitting)
+        same = sum(results[index][1] == full[index][1] for index in fitting) / len(fitting)
+        sim = sum(similar(normalize(results[index][1]), normalize(full[index][1]))
+                  for index in fitting) / len(fitting)
+        agreeing.append((frames, same == 1.0))
+        print(f"{frames * HOP_LENGTH / SAMPLE_RATE:>9.1f}{frames:>8}{len(fitting):>7}{encoder_ms:>12.1f}"
+              f"{full_ms:>9.1f}{full_ms / encoder_ms:>8.2f}x{same:>7.0%}{sim:>7.3f}")
+
+    # Shortest bucket from which every longer bucket also agrees on every clip
+    safe = N_FRAMES
+    for frames, agrees in reversed(agreeing):
+        if not agrees:
+            break
+        safe = frames
+    print(f"Shortest bucket with full agreement: {safe * HOP_LENGTH / SAMPLE_RATE:g} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency of micro-batched Whisper inference under concurrent load.
+
+Runs a randomly initialised Whisper model (Whisper-tiny sized by default,
+so no download is needed) behind an InferenceScheduler and fires
+--requests transcriptions from --clients threads, once with batch size 1
+(the old one-generate-per-request behaviour) and once per --batch-sizes
+entry. Decoding is fixed to --new-tokens tokens so every configuration
+does the same work per clip.
+
+Usage:
+    python benchmarks/bench_inference_scheduler.py [--clients 8] [--requests 32] [--batch-sizes 4 8]
+"""
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import torch
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.inference_scheduler import InferenceScheduler  # noqa: E402
+from tests.helpers import WHISPER_TINY, tiny_whisper  # noqa: E402
+
+def run(model, features, clients, requests, batch_size, max_wait_ms, new_tokens):
+    def run_batch(items):
+        with torch.no_grad():
+            ids = model.generate(torch.stack(items), max_new_tokens=new_tokens, min_new_tokens=new_tokens,
+                                 num_beams=1)
+        return list(ids)
+
+    scheduler = InferenceScheduler(run_batch, max_batch_size=batch_size, max_wait_ms=max_wait_ms)
+    per_client = requests // clients
+
+    def client():
+        for _ in range(per_client):
+            scheduler.infer(features)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stats = scheduler.stats()
+    scheduler.close()
+    return per_client * clients / elapsed, stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent request threads')
+    parser.add_argument('--requests', type=int, default=32, help='Total transcriptions per configuration')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[4, 8], help='max_batch_size values to compare')
+    parser.add_argument('--max-wait-ms', type=float, default=10, help='Batch window')
+    parser.add_argument('--layers', type=int, default=4, help='Encoder and decoder layers')
+    parser.add_argument('--new-tokens', type=int, default=16, help='Tokens decoded per clip')
+    args = parser.parse_args()
+
+    model = tiny_whisper(args.layers, args.layers, **WHISPER_TINY)
+    features = torch.randn(80, 3000)
+    run(model, features, 1, 2, 1, 0, args.new_tokens)
+
+    print(f"{'max batch':>10}{'clips/s':>10}{'mean batch':>12}{'p50 ms':>10}{'p99 ms':>10}")
+    baseline = None
+    for batch_size in [1] + args.batch_sizes:
+        throughput, stats = run(model, features, args.clients, args.requests, batch_size,
+                                args.max_wait_ms, args.new_tokens)
+        baseline = baseline or throughput
+        print(f"{batch_size:>10}{throughput:>10.2f}{stats['mean_batch_size']:>12.2f}"
+              f"{stats['latency_p50_ms']:>10.0f}{stats['latency_p99_ms']:>10.0f}"
+              f"  ({throughput / baseline:.2f}x)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Before/after benchmark of match_ayah_and_word debug output.
+
+"print" is match_ayah_and_word as it was before the logging layer, with
+its unconditional DEBUG prints (copied below, stdout sent to /dev/null).
+"logging off" is the current function with the matcher subsystem above
+DEBUG, and "logging on" is the same with DEBUG enabled and the records
+formatted into a discarded stream.
+
+Usage:
+    python benchmarks/bench_logging.py [--calls 20000]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.log_config import configure_logging  # noqa: E402
+from utils.reference_corpus import FATIHA  # noqa: E402
+from utils import text_matcher  # noqa: E402
+from utils.text_matcher import (  # noqa: E402
+    AYAH_INDEX, FATIHA_SURAH, MIN_MATCH_COVERAGE, match_ayah_and_word, normalize_arabic_text
+)
+
+def print_match_ayah_and_word(transcribed_text):
+    """match_ayah_and_word with the print-based debug output it had before."""
+    transcribed_text = normalize_arabic_text(transcribed_text.strip())
+    print(f"DEBUG: Normalized transcribed text: {transcribed_text}")
+    if not transcribed_text:
+        print("DEBUG: No words transcribed")
+        return (None, None)
+    exact_ayah = FATIHA.exact_match(transcribed_text)
+    if exact_ayah is not None:
+        print(f"DEBUG: Exact match for ayah {exact_ayah}")
+        return (exact_ayah, 0)
+    candidates = AYAH_INDEX.search(transcribed_text, top_k=1, surah=FATIHA_SURAH)
+    if not candidates or candidates[0].coverage < MIN_MATCH_COVERAGE:
+        print("DEBUG: No match found")
+        return (None, None)
+    best = candidates[0]
+    print(f"DEBUG: Matched ayah {best.ayah - 1} from word {best.start_word} "
+          f"(score {best.score:.2f}, coverage {best.coverage:.2f})")
+    return (best.ayah - 1, best.start_word)
+
+def transcripts(count, seed=0):
+    """Exact ayat and partial windows of them, the mix /analyze sees."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        words = list(rng.choice(list(FATIHA)).simple_words)
+        if rng.random() < 0.6:
+            start = rng.randrange(len(words))
+            words = words[start:start + rng.randint(1, 3)]
+        texts.append(' '.join(words))
+    return texts
+
+def calls_per_second(func, texts):
+    start = time.perf_counter()
+    for text in texts:
+        func(text)
+    return len(texts) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=20000, help='Transcripts to match per variant')
+    args = parser.parse_args()
+
+    texts = transcripts(args.calls)
+    for text in texts[:200]:
+        match_ayah_and_word(text)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        before = calls_per_second(print_match_ayah_and_word, texts)
+
+    configure_logging({'TAJWEED_LOG_MATCHER': 'WARNING'}, stream=io.StringIO())
+    off = calls_per_second(match_ayah_and_word, texts)
+
+    configure_logging({'TAJWEED_LOG_MATCHER': 'DEBUG'})
+    handler = logging.StreamHandler(open(os.devnull, 'w'))
+    text_matcher.logger.addHandler(handler)
+    text_matcher.logger.propagate = False
+    on = calls_per_second(match_ayah_and_word, texts)
+
+    print(f"{'variant':<16}{'calls/s':>12}")
+    print(f"{'print':<16}{before:>12.0f}")
+    print(f"{'logging off':<16}{off:>12.0f}  ({off / before:.2f}x)")
+    print(f"{'logging on':<16}{on:>12.0f}  ({on / before:.2f}x)")
+
+if __name__ == '__main__':
+    main()
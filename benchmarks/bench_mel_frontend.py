@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the log-mel front end.
+
+Times the Hugging Face WhisperFeatureExtractor (what transcribe_batch
+used to call) against utils.mel_frontend, one clip at a time and as a
+batch, on the bundled `tajweed dataset/audio` clips. Reports the largest
+difference between the two outputs.
+
+Usage:
+    python benchmarks/bench_mel_frontend.py [--clips 37] [--repeat 3] [--batch-size 8]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import librosa
+import numpy as np
+from transformers import WhisperFeatureExtractor
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.mel_frontend import log_mel_spectrogram, SAMPLE_RATE  # noqa: E402
+
+AUDIO_DIR = PROJECT_ROOT / 'tajweed dataset' / 'audio'
+
+def best_of(repeat, fn):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clips', type=int, default=None, help='Number of clips (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions, best is reported')
+    parser.add_argument('--batch-size', type=int, default=8, help='Clips per batched call')
+    args = parser.parse_args()
+
+    clips = [librosa.load(path, sr=SAMPLE_RATE)[0] for path in sorted(AUDIO_DIR.glob('*.mp3'))[:args.clips]]
+    seconds = [len(clip) / SAMPLE_RATE for clip in clips]
+    extractor = WhisperFeatureExtractor()
+
+    def processor_single():
+        return [extractor(clip, sampling_rate=SAMPLE_RATE, return_tensors='np')['input_features'] for clip in clips]
+
+    def processor_batched():
+        return [extractor(clips[i:i + args.batch_size], sampling_rate=SAMPLE_RATE, return_tensors='np')
+                for i in range(0, len(clips), args.batch_size)]
+
+    def frontend_single():
+        return [log_mel_spectrogram([clip]) for clip in clips]
+
+    def frontend_batched():
+        return [log_mel_spectrogram(clips[i:i + args.batch_size]) for i in range(0, len(clips), args.batch_size)]
+
+    reference = np.concatenate(processor_single())
+    ours = np.concatenate(frontend_batched())
+    frontend_single()
+
+    print(f"{len(clips)} clips, {min(seconds):.1f}-{max(seconds):.1f} s (mean {np.mean(seconds):.1f} s), "
+          f"max |difference| {np.abs(reference - ours).max():.2e}")
+    print(f"{'':<22}{'ms/clip':>10}{'speedup':>10}")
+    baseline = None
+    for name, fn in [('processor, per clip', processor_single), ('processor, batched', processor_batched),
+                     ('front end, per clip', frontend_single), ('front end, batched', frontend_batched)]:
+        per_clip = 1000 * best_of(args.repeat, fn) / len(clips)
+        baseline = baseline or per_clip
+        print(f"{name:<22}{per_clip:>10.2f}{baseline / per_clip:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
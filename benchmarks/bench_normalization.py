@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for Arabic text normalization.
+
+Compares the per-call cost of the previous regex chains (copied verbatim
+below as the reference) against the precompiled engine in
+utils/normalization.py, cold (memo cleared before every call) and warm
+(memo hit). Before timing, both implementations are checked for identical
+output on the Fatiha reference texts plus randomly generated strings.
+
+Usage:
+    python benchmarks/bench_normalization.py [--calls 20000]
+"""
+import argparse
+import csv
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.normalization import (  # noqa: E402
+    MADD_WORD_MAPPING,
+    normalize_arabic_text,
+    normalize_tajweed_text,
+)
+
+def legacy_text_matcher_normalize(text):
+    """utils/text_matcher.normalize_arabic_text before the precompiled engine."""
+    text = re.sub('[آٱأإا]', 'ا', text)
+    text = re.sub('ـٰ', 'ا', text)
+    text = re.sub('ٰ', 'ا', text)
+    normalized = text
+    for base_word, variations in MADD_WORD_MAPPING.items():
+        pattern = '|'.join(map(re.escape, variations))
+        normalized = re.sub(pattern, base_word, normalized)
+    normalized = re.sub('يْ', 'ي', normalized)
+    normalized = re.sub('يِّ', 'ي', normalized)
+    normalized = re.sub(r'[\u064B-\u065F\u0670]', '', normalized)
+    normalized = re.sub('ـ', '', normalized)
+    normalized = re.sub('ة', 'ه', normalized)
+    normalized = re.sub('[ىئ]', 'ي', normalized)
+    normalized = re.sub('ؤ', 'و', normalized)
+    normalized = re.sub(r'[^\u0600-\u06FF\s]', '', normalized)
+    return ' '.join(normalized.split())
+
+def legacy_tajweed_normalize(text):
+    """utils/tajweed_checker.normalize_arabic_text before the precompiled engine."""
+    text = legacy_text_matcher_normalize(text)
+    text = re.sub('مَٰلِكِ|مَالِكِ|ملك|مٰلك', 'مالك', text)
+    text = re.sub('[آٱأإاٰ]', 'ا', text)
+    text = re.sub('ـٰ', '', text)
+    text = re.sub('ٰ', '', text)
+    text = re.sub('[\u064B-\u0652]', '', text)
+    text = re.sub('ـ', '', text)
+    text = re.sub('ى', 'ي', text)
+    text = re.sub('ة', 'ه', text)
+    text = re.sub(r'[^\u0600-\u06FF\s]', '', text)
+    return ' '.join(text.split())
+
+def reference_samples():
+    """Ayah texts from the dataset metadata plus their individual words."""
+    metadata = PROJECT_ROOT / 'tajweed dataset' / 'audio' / 'fatiha_metadata_final.csv'
+    texts = []
+    with open(metadata, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            texts.append(row['text'])
+    texts = sorted(set(texts))
+    words = sorted({word for text in texts for word in text.split()})
+    variations = [v for values in MADD_WORD_MAPPING.values() for v in values]
+    return texts + words + variations + ['مٰلِكِ يَوْمِ', 'الرحمـٰن', 'ٱلْمُلْكِ']
+
+def random_samples(count, seed=0):
+    """Random strings mixing letters, diacritics, tatweel, madd words, Latin and spaces."""
+    rng = random.Random(seed)
+    alphabet = [chr(cp) for cp in range(0x0621, 0x064B)] + [chr(cp) for cp in range(0x064B, 0x0660)]
+    alphabet += ['ٰ', 'ـ', 'ٱ', 'ى', 'ئ', 'ؤ', 'ة', ' ', ' ', '\t', 'a', '1', '؟']
+    fragments = [v for values in MADD_WORD_MAPPING.values() for v in values] + ['ـٰ', 'يْ', 'يِّ', 'ملك']
+    samples = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 8)):
+            if rng.random() < 0.3:
+                parts.append(rng.choice(fragments))
+            else:
+                parts.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))))
+        samples.append(''.join(parts))
+    return samples
+
+def check_parity(samples):
+    """Return the samples on which the engine disagrees with the legacy functions."""
+    mismatches = []
+    for text in samples:
+        if normalize_arabic_text(text) != legacy_text_matcher_normalize(text):
+            mismatches.append(('text_matcher', text))
+        if normalize_tajweed_text(text) != legacy_tajweed_normalize(text):
+            mismatches.append(('tajweed_checker', text))
+    return mismatches
+
+def per_call_us(func, samples, calls, clear=None):
+    """Average microseconds per call over `calls` calls cycling through samples."""
+    n = len(samples)
+    state = {'i': 0}
+
+    def run():
+        if clear is not None:
+            clear()
+        func(samples[state['i'] % n])
+        state['i'] += 1
+
+    seconds = timeit.timeit(run, number=calls)
+    return seconds / calls * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=20000, help='Calls per measurement')
+    args = parser.parse_args()
+
+    samples = reference_samples()
+    mismatches = check_parity(samples + random_samples(20000))
+    if mismatches:
+        for which, text in mismatches[:10]:
+            print(f"MISMATCH ({which}): {text!r}")
+        sys.exit(f"{len(mismatches)} mismatches against the legacy normalizers")
+    print(f"Parity: identical output on {len(samples) + 20000} samples")
+
+    rows = [
+        ('text_matcher legacy', per_call_us(legacy_text_matcher_normalize, samples, args.calls)),
+        ('text_matcher engine (cold)', per_call_us(normalize_arabic_text, samples, args.calls,
+                                                   clear=normalize_arabic_text.cache_clear)),
+        ('text_matcher engine (memo hit)', per_call_us(normalize_arabic_text, samples, args.calls)),
+        ('tajweed_checker legacy', per_call_us(legacy_tajweed_normalize, samples, args.calls)),
+        ('tajweed_checker engine (cold)', per_call_us(
+            normalize_tajweed_text, samples, args.calls,
+            clear=lambda: (normalize_tajweed_text.cache_clear(), normalize_arabic_text.cache_clear()))),
+        ('tajweed_checker engine (memo hit)', per_call_us(normalize_tajweed_text, samples, args.calls)),
+    ]
+    print(f"{'implementation':<36}{'us/call':>10}")
+    for name, cost in rows:
+        print(f"{name:<36}{cost:>10.2f}")
+
+if __name__ == '__main__':
+    main()
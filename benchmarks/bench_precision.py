@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Latency, memory and transcript agreement of the ASR precision modes.
+
+Converts the model to each mode once (cached in --cache-dir, as the app
+does), then loads it in a fresh process and transcribes the bundled
+`tajweed dataset/audio` clips one at a time with greedy decoding.
+Agreement is measured against the fp32 transcripts: the share of clips
+transcribed identically and the mean similarity of the normalized text.
+
+--tiny runs a randomly initialised Whisper-tiny instead of the fine-tuned
+checkpoint, for measuring speed and memory without downloading it; its
+"transcripts" are token ids.
+
+Usage:
+    python benchmarks/bench_precision.py [--modes fp32 bf16 int8] [--clips 10] [--tiny]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+MODEL_ID = "fawzanaramam/Whisper-Small-Finetuned-on-Surah-Fatiha"
+AUDIO_DIR = PROJECT_ROOT / 'tajweed dataset' / 'audio'
+
+from tests.helpers import WHISPER_TINY, tiny_config, tiny_whisper  # noqa: E402
+
+def build_fp32(tiny, model_id):
+    from transformers import AutoModelForSpeechSeq2Seq
+    if tiny:
+        return tiny_whisper(4, 4, **WHISPER_TINY)
+    return AutoModelForSpeechSeq2Seq.from_pretrained(model_id, low_cpu_mem_usage=True)
+
+def prepare(precision, path, tiny, model_id):
+    """Convert the model to a precision mode and write it, like the first app worker does."""
+    from utils.precision import convert_model, save_model
+    start = time.perf_counter()
+    model = convert_model(build_fp32(tiny, model_id), precision)
+    save_model(model, path, precision)
+    return time.perf_counter() - start
+
+def measure(precision, path, tiny, model_id, clip_paths, max_new_tokens):
+    """Load a converted model in this (fresh) process and transcribe every clip."""
+    import librosa
+    import psutil
+    import torch
+    from transformers import AutoConfig, AutoModelForSpeechSeq2Seq, AutoProcessor, WhisperFeatureExtractor
+    from utils.precision import load_model
+
+    clips = [librosa.load(clip, sr=16000)[0] for clip in clip_paths]
+    if tiny:
+        config, processor = tiny_config(4, 4, **WHISPER_TINY), None
+        extractor = WhisperFeatureExtractor()
+    else:
+        config = AutoConfig.from_pretrained(model_id)
+        processor = AutoProcessor.from_pretrained(model_id)
+        extractor = processor.feature_extractor
+    features = [extractor(clip, sampling_rate=16000, return_tensors='pt')['input_features'] for clip in clips]
+
+    process = psutil.Process(os.getpid())
+    rss_before = process.memory_info().rss
+    start = time.perf_counter()
+    model = load_model(lambda dtype: AutoModelForSpeechSeq2Seq.from_config(config, torch_dtype=dtype), path, precision)
+    load_s = time.perf_counter() - start
+
+    latencies, transcripts = [], []
+    with torch.no_grad():
+        model.generate(features[0].to(model.dtype), max_new_tokens=4, num_beams=1)
+        for feature in features:
+            start = time.perf_counter()
+            ids = model.generate(feature.to(model.dtype), max_new_tokens=max_new_tokens, num_beams=1)
+            latencies.append(time.perf_counter() - start)
+            if processor is None:
+                transcripts.append(' '.join(str(i) for i in ids[0].tolist()))
+            else:
+                transcripts.append(processor.batch_decode(ids, skip_special_tokens=True)[0].strip())
+    rss_mb = (process.memory_info().rss - rss_before) / 1024 / 1024
+    return load_s, rss_mb, latencies, transcripts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=['fp32', 'bf16', 'int8'], help='Precision modes to compare')
+    parser.add_argument('--clips', type=int, default=None, help='Number of clips to transcribe (default: all)')
+    parser.add_argument('--max-new-tokens', type=int, default=64, help='Decoding limit per clip')
+    parser.add_argument('--model', default=MODEL_ID, help='Checkpoint to benchmark')
+    parser.add_argument('--tiny', action='store_true', help='Use a random Whisper-tiny instead of the checkpoint')
+    parser.add_argument('--cache-dir', default=None, help='Where converted weights are kept (default: a temp dir)')
+    args = parser.parse_args()
+
+    from utils.runtime_config import cpu_supports_bf16
+    from utils.tajweed_checker import normalize_arabic_text
+    from utils.text_matcher import similar
+
+    modes = ['fp32'] + [mode for mode in args.modes if mode != 'fp32']
+    if 'bf16' in modes and not cpu_supports_bf16():
+        print("Note: this CPU has no native bf16; the app would fall back to fp32")
+    clip_paths = sorted(AUDIO_DIR.glob('*.mp3'))[:args.clips]
+    cache_dir = Path(args.cache_dir or tempfile.mkdtemp(prefix='precision-'))
+    tag = 'tiny' if args.tiny else 'model'
+    # Token id "transcripts" of the tiny model are compared as they are
+    normalize = str if args.tiny else normalize_arabic_text
+
+    # A fresh process per step, so memory is not shared with earlier modes
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for mode in modes:
+        path = cache_dir / f'{tag}-{mode}.safetensors'
+        with context.Pool(1) as pool:
+            convert_s = 0.0 if path.exists() else pool.apply(prepare, (mode, path, args.tiny, args.model))
+        with context.Pool(1) as pool:
+            results[mode] = (convert_s, path.stat().st_size) + pool.apply(
+                measure, (mode, path, args.tiny, args.model, clip_paths, args.max_new_tokens)
+            )
+
+    reference = results['fp32'][5]
+    print(f"{len(clip_paths)} clips, greedy decoding, {os.cpu_count()} CPU(s)")
+    print(f"{'mode':>6}{'convert s':>11}{'file MB':>9}{'load s':>8}{'RSS MB':>8}"
+          f"{'mean ms':>9}{'p90 ms':>8}{'speedup':>9}{'same':>7}{'sim':>7}")
+    baseline = None
+    for mode, (convert_s, size, load_s, rss_mb, latencies, transcripts) in results.items():
+        latencies = sorted(latencies)
+        mean_ms = 1000 * sum(latencies) / len(latencies)
+        p90_ms = 1000 * latencies[int(0.9 * (len(latencies) - 1))]
+        baseline = baseline or mean_ms
+        same = sum(a == b for a, b in zip(transcripts, reference)) / len(reference)
+        sim = sum(similar(normalize(a), normalize(b))
+                  for a, b in zip(transcripts, reference)) / len(reference)
+        print(f"{mode:>6}{convert_s:>11.1f}{size / 1e6:>9.1f}{load_s:>8.2f}{rss_mb:>8.0f}"
+              f"{mean_ms:>9.0f}{p90_ms:>8.0f}{baseline / mean_ms:>8.2f}x{same:>7.0%}{sim:>7.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for word similarity.
+
+Compares the previous SequenceMatcher-over-all-phonetic-variations
+implementation of text_matcher.similar (copied below as the reference)
+against the bounded edit-distance kernel, on every pair of Fatiha words
+plus ASR-style corruptions of them (dropped letters, phonetic letter
+swaps). Reports per-pair cost and how often the two agree on the 0.7 and
+0.8 match decisions used by the Tajweed checker, and the per-pair cost of
+the batched similarity_matrix API.
+
+Usage:
+    python benchmarks/bench_similarity.py [--pairs 3000]
+"""
+import argparse
+import csv
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from utils.normalization import PHONETIC_MAPPING, normalize_arabic_text  # noqa: E402
+from utils.text_matcher import similar, similarity_matrix  # noqa: E402
+
+def legacy_get_phonetic_variations(word):
+    variations = {word}
+    normalized = normalize_arabic_text(word)
+    variations.add(normalized)
+    for char in normalized:
+        if char in PHONETIC_MAPPING:
+            for variant in PHONETIC_MAPPING[char]:
+                variations.add(normalized.replace(char, variant))
+    return variations
+
+def legacy_similar(a, b):
+    """text_matcher.similar before the edit-distance kernel."""
+    a_norm = normalize_arabic_text(a)
+    b_norm = normalize_arabic_text(b)
+    if a_norm == b_norm:
+        return 1.0
+    common_words = ['بسم', 'الله', 'الرحمن', 'الرحيم']
+    if a_norm in common_words or b_norm in common_words:
+        base_similarity = SequenceMatcher(None, a_norm, b_norm).ratio()
+        if base_similarity > 0.7:
+            return 1.0
+    base_similarity = SequenceMatcher(None, a_norm, b_norm).ratio()
+    a_variations = legacy_get_phonetic_variations(a)
+    b_variations = legacy_get_phonetic_variations(b)
+    max_similarity = base_similarity
+    for var_a in a_variations:
+        for var_b in b_variations:
+            if var_a == var_b:
+                return 1.0
+            similarity = SequenceMatcher(None, var_a, var_b).ratio()
+            max_similarity = max(max_similarity, similarity)
+    if max_similarity > 0.8:
+        return 1.0
+    return max_similarity
+
+def fatiha_words():
+    metadata = PROJECT_ROOT / 'tajweed dataset' / 'audio' / 'fatiha_metadata_final.csv'
+    with open(metadata, 'r', encoding='utf-8') as f:
+        texts = {row['text'] for row in csv.DictReader(f)}
+    return sorted({normalize_arabic_text(word) for text in texts for word in text.split()})
+
+def corrupt(word, rng):
+    """Drop, duplicate or phonetically swap one letter."""
+    letters = list(word)
+    i = rng.randrange(len(letters))
+    op = rng.random()
+    if op < 0.3 and len(letters) > 2:
+        del letters[i]
+    elif op < 0.5:
+        letters.insert(i, letters[i])
+    else:
+        swaps = [v for v in PHONETIC_MAPPING.get(letters[i], []) if len(v) == 1]
+        letters[i] = rng.choice(swaps) if swaps else rng.choice('بتثجحخدذرزسشصضطظعغفقكلمنهوي')
+    return ''.join(letters)
+
+def word_pairs(count, seed=0):
+    rng = random.Random(seed)
+    words = fatiha_words()
+    pairs = [(a, b) for a in words for b in words]
+    while len(pairs) < count:
+        word = rng.choice(words)
+        pairs.append((word, corrupt(word, rng)))
+        pairs.append((rng.choice(words), corrupt(word, rng)))
+    rng.shuffle(pairs)
+    return pairs[:count]
+
+def per_pair_us(func, pairs, **kwargs):
+    start = time.perf_counter()
+    for a, b in pairs:
+        func(a, b, **kwargs)
+    return (time.perf_counter() - start) / len(pairs) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pairs', type=int, default=3000, help='Number of word pairs')
+    args = parser.parse_args()
+
+    pairs = word_pairs(args.pairs)
+    # Compile the kernel and fill the normalization memo outside the timed region
+    for a, b in pairs:
+        similar(a, b)
+
+    legacy = [legacy_similar(a, b) for a, b in pairs]
+    kernel = [similar(a, b) for a, b in pairs]
+    for threshold in (0.7, 0.8):
+        agree = sum((x > threshold) == (y > threshold) for x, y in zip(legacy, kernel))
+        print(f"Decision agreement at > {threshold}: {agree}/{len(pairs)} ({agree / len(pairs):.1%})")
+
+    legacy_us = per_pair_us(legacy_similar, pairs)
+    kernel_us = per_pair_us(similar, pairs)
+    bounded_us = per_pair_us(similar, pairs, cutoff=0.7)
+    print(f"{'implementation':<30}{'us/pair':>10}")
+    print(f"{'legacy SequenceMatcher':<30}{legacy_us:>10.2f}")
+    print(f"{'kernel':<30}{kernel_us:>10.2f}")
+    print(f"{'kernel, cutoff=0.7':<30}{bounded_us:>10.2f}")
+    print(f"Speedup: {legacy_us / kernel_us:.1f}x (unbounded), {legacy_us / bounded_us:.1f}x (cutoff=0.7)")
+
+    # Every Fatiha word against a batch of transcript words in one call
+    words = fatiha_words()
+    batch = [b for _, b in pairs[:len(words)]]
+    similarity_matrix(words, batch)
+    start = time.perf_counter()
+    similarity_matrix(words, batch)
+    matrix_us = (time.perf_counter() - start) / (len(words) * len(batch)) * 1e6
+    loop_us = per_pair_us(similar, [(a, b) for a in words for b in batch])
+    print(f"{len(words)}x{len(batch)} matrix: {matrix_us:.2f} us/pair batched vs {loop_us:.2f} us/pair via similar()")
+
+if __name__ == '__main__':
+    main()
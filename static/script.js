@@ -3,6 +3,8 @@ let mediaRecorder = null;
 let audioChunks = [];
 let isRecording = false;
 let ws = null;
+let frameSequence = 0; // Sequence number of the next audio frame sent over the WebSocket
+let frameQueue = Promise.resolve(); // Frames are decoded and sent one after another, in sequence order
 let currentRecordingAyah = null;
 let tooltipTimeout = null;
 let currentReciter = 'mishary'; // Default reciter
@@ -850,37 +852,76 @@ async function startRecording(ayah) {
         }
         
         audioChunks = [];
+        frameSequence = 0;
+        frameQueue = Promise.resolve();
         
         // Add recording class immediately for visual feedback
         ayah.classList.add('recording');
         currentRecordingAyah = ayah;
         
+        // Send a frame once every earlier frame has been sent, so the server receives them in sequence order
+        function queueFrame(makeFrame) {
+            const sequence = frameSequence++;
+            frameQueue = frameQueue.then(async () => {
+                const frame = await makeFrame(sequence);
+                if (ws && ws.readyState === WebSocket.OPEN) {
+                    console.log('Sending audio frame', sequence, 'size:', frame.byteLength);
+                    ws.send(frame);
+                } else {
+                    console.warn('WebSocket not ready, chunk not sent');
+                }
+            }).catch(err => console.error('Error sending audio frame:', err));
+            return frameQueue;
+        }
+
         // Handle data available event
-        mediaRecorder.ondataavailable = async (event) => {
+        mediaRecorder.ondataavailable = (event) => {
             console.log('Data available from MediaRecorder, size:', event.data.size);
             if (event.data.size > 0) {
                 audioChunks.push(event.data);
                 
-                // Convert WebM chunk to WAV before sending
-                const audioContext = new AudioContext();
-                const arrayBuffer = await event.data.arrayBuffer();
-                const audioBuffer = await audioContext.decodeAudioData(arrayBuffer);
-                
-                // Create WAV file
-                const wavData = audioBufferToWav(audioBuffer);
-                const wavBlob = new Blob([wavData], { type: 'audio/wav' });
-                
-                // Send WAV data through WebSocket
-                if (ws && ws.readyState === WebSocket.OPEN) {
-                    const buffer = await wavBlob.arrayBuffer();
-                    console.log('Sending WAV audio chunk, size:', buffer.byteLength);
-                    ws.send(buffer);
-                } else {
-                    console.warn('WebSocket not ready, chunk not sent');
-                }
+                // Decode the WebM chunk and send it as a 16 kHz PCM16 frame
+                queueFrame(async (sequence) => {
+                    const audioContext = new AudioContext();
+                    const arrayBuffer = await event.data.arrayBuffer();
+                    const audioBuffer = await audioContext.decodeAudioData(arrayBuffer);
+                    return audioBufferToFrame(audioBuffer, sequence);
+                });
             }
         };
 
+        // Function to convert AudioBuffer to a binary audio frame (format in utils/audio_stream.py):
+        // 8-byte header (version, flags, reserved, sequence number) + PCM16 mono samples at 16 kHz
+        async function audioBufferToFrame(buffer, sequence) {
+            const targetRate = 16000;
+            const offline = new OfflineAudioContext(1, Math.max(1, Math.ceil(buffer.duration * targetRate)), targetRate);
+            const source = offline.createBufferSource();
+            source.buffer = buffer;
+            source.connect(offline.destination);
+            source.start();
+            const samples = (await offline.startRendering()).getChannelData(0);
+            
+            const data = new DataView(new ArrayBuffer(8 + samples.length * 2));
+            data.setUint8(0, 1);
+            data.setUint8(1, 0);
+            data.setUint16(2, 0, true);
+            data.setUint32(4, sequence, true);
+            for (let i = 0; i < samples.length; i++) {
+                const sample = Math.max(-1, Math.min(1, samples[i]));
+                data.setInt16(8 + i * 2, sample < 0 ? sample * 0x8000 : sample * 0x7FFF, true);
+            }
+            return data.buffer;
+        }
+
+        // The end of a recording: a frame with no samples and the last-frame flag set
+        function endFrame(sequence) {
+            const data = new DataView(new ArrayBuffer(8));
+            data.setUint8(0, 1);
+            data.setUint8(1, 1);
+            data.setUint32(4, sequence, true);
+            return data.buffer;
+        }
+
         // Function to convert AudioBuffer to WAV format
         function audioBufferToWav(buffer) {
             const numOfChan = buffer.numberOfChannels;
@@ -932,10 +973,8 @@ async function startRecording(ayah) {
         // Handle recording stop
         mediaRecorder.onstop = async () => {
             console.log('MediaRecorder stopped');
-            if (ws && ws.readyState === WebSocket.OPEN) {
-                // Send done message to server
-                ws.send(JSON.stringify({ type: 'done' }));
-            }
+            // Tell the server the recording is over, after every audio frame has been sent
+            await queueFrame(async (sequence) => endFrame(sequence));
             if (ws) {
                 ws.close();
             }
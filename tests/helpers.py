@@ -0,0 +1,44 @@
+"""
+Tiny randomly initialised Whisper models and processors.
+
+Shared by the tests and by the benchmarks' --tiny runs, which use
+Whisper-tiny's size (WHISPER_TINY) so they run without downloading the
+checkpoint. torch and transformers are imported on first use, so a
+benchmark that times its own imports can import this module first.
+"""
+import json
+from pathlib import Path
+
+EOS = 50257
+DECODER_START = 50258
+# Language, task and no-timestamps tokens, as the fine-tuned checkpoint forces them
+FORCED_DECODER_IDS = [[1, 50259], [2, 50359], [3, 50363]]
+
+# Layer width, attention heads and MLP width of openai/whisper-tiny
+WHISPER_TINY = {'d_model': 384, 'attention_heads': 6, 'ffn_dim': 1536}
+
+def tiny_config(encoder_layers=1, decoder_layers=1, d_model=64, attention_heads=2, ffn_dim=128):
+    """A Whisper config of the given size, with Whisper's special token ids"""
+    from transformers import WhisperConfig
+    return WhisperConfig(d_model=d_model, encoder_layers=encoder_layers, decoder_layers=decoder_layers,
+                         encoder_attention_heads=attention_heads, decoder_attention_heads=attention_heads,
+                         encoder_ffn_dim=ffn_dim, decoder_ffn_dim=ffn_dim, bos_token_id=EOS, eos_token_id=EOS,
+                         pad_token_id=EOS, decoder_start_token_id=DECODER_START)
+
+def tiny_whisper(encoder_layers=1, decoder_layers=1, forced=False, **size):
+    """A seeded random Whisper in eval mode (see tiny_config), optionally forcing the checkpoint's prompt"""
+    import torch
+    from transformers import WhisperForConditionalGeneration
+    torch.manual_seed(0)
+    model = WhisperForConditionalGeneration(tiny_config(encoder_layers, decoder_layers, **size)).eval()
+    if forced:
+        model.generation_config.forced_decoder_ids = FORCED_DECODER_IDS
+    return model
+
+def tiny_processor(directory):
+    """A Whisper processor with a three-token vocabulary, its files written to directory"""
+    from transformers import WhisperFeatureExtractor, WhisperProcessor, WhisperTokenizer
+    vocab, merges = Path(directory) / 'vocab.json', Path(directory) / 'merges.txt'
+    vocab.write_text(json.dumps({'<|endoftext|>': 0, 'a': 1, 'b': 2}))
+    merges.write_text('#version: 0.2\n')
+    return WhisperProcessor(WhisperFeatureExtractor(), WhisperTokenizer(str(vocab), str(merges)))
@@ -0,0 +1,44 @@
+import unittest
+from utils.alignment import align_words, align_transcript, MATCH, SUBSTITUTION, OMISSION, INSERTION
+from utils.reference_corpus import FATIHA
+from utils.tajweed_checker import check_word_presence, check_extra_content, analyze_mistakes, SURAH_FATIHA
+
+class TestAlignment(unittest.TestCase):
+    def test_operations(self):
+        """Skipped, extra and mispronounced words are labelled without shifting the rest"""
+        test_cases = [
+            ("الحمد لله رب العالمين", [MATCH, MATCH, MATCH, MATCH]),
+            ("الحمد رب العالمين", [MATCH, OMISSION, MATCH, MATCH]),
+            ("الحمد الحمد لله رب العالمين", [INSERTION, MATCH, MATCH, MATCH, MATCH]),
+            ("الحمد لله رب العالمين الرحمن", [MATCH, MATCH, MATCH, MATCH, INSERTION]),
+            ("الحمد لله حب العالمين", [MATCH, MATCH, SUBSTITUTION, MATCH]),
+        ]
+        for text, expected in test_cases:
+            alignment = align_transcript(FATIHA[1], text)
+            self.assertEqual([pair.op for pair in alignment.pairs], expected, f"align('{text}')")
+
+    def test_repeated_words(self):
+        """A skipped word before a repeated word is reported at its own position"""
+        alignment = align_transcript(FATIHA[6], "صراط الذين عليهم غير المغضوب عليهم ولا الضالين")
+        self.assertEqual([pair.ref_index for pair in alignment.omissions], [2])
+        self.assertFalse(alignment.insertions)
+
+    def test_empty_sides(self):
+        """Aligning against nothing yields only omissions or only insertions"""
+        self.assertEqual([p.op for p in align_words(["الحمد", "لله"], []).pairs], [OMISSION, OMISSION])
+        self.assertEqual([p.op for p in align_words([], ["الحمد"]).pairs], [INSERTION])
+
+    def test_shared_alignment(self):
+        """The checks give the same answer from a shared alignment as on their own"""
+        text = "الحمد رب العالمين الرحمن"
+        expected = SURAH_FATIHA[1]
+        alignment = align_transcript(FATIHA[1], text)
+        self.assertEqual(check_word_presence(expected['key_words'], text, alignment),
+                         check_word_presence(expected['key_words'], text))
+        self.assertEqual(check_extra_content(expected['text'], text, alignment),
+                         check_extra_content(expected['text'], text))
+        self.assertEqual(analyze_mistakes(text, expected['text'], alignment),
+                         analyze_mistakes(text, expected['text']))
+
+if __name__ == '__main__':
+    unittest.main()
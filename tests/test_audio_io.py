@@ -0,0 +1,90 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+import librosa
+import numpy as np
+import soundfile as sf
+from transformers import WhisperFeatureExtractor
+from utils.audio_io import AudioClip, decode_audio, persist_upload, AudioDecodeError, TARGET_SAMPLE_RATE, HOP_LENGTH
+
+AUDIO_DIR = Path(__file__).resolve().parent.parent / 'tajweed dataset' / 'audio'
+
+def encode(samples, rate, **kwargs):
+    buf = io.BytesIO()
+    sf.write(buf, samples, rate, **kwargs)
+    return buf.getvalue()
+
+class TestAudioIO(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.signal = (rng.standard_normal((TARGET_SAMPLE_RATE * 2, 2)) * 0.2).clip(-1, 1)
+
+    def assert_matches_librosa(self, data):
+        expected, _ = librosa.load(io.BytesIO(data), sr=TARGET_SAMPLE_RATE)
+        decoded = decode_audio(io.BytesIO(data))
+        self.assertEqual(decoded.dtype, np.float32)
+        self.assertEqual(decoded.shape, expected.shape)
+        np.testing.assert_allclose(decoded, expected, atol=1e-6)
+        return decoded
+
+    def test_matches_librosa_load(self):
+        """In-memory decoding gives the same samples as librosa.load at 16 kHz"""
+        cases = {
+            'pcm16 16k mono': encode(self.signal[:, 0], 16000, format='WAV', subtype='PCM_16'),
+            'pcm16 44.1k stereo': encode(self.signal, 44100, format='WAV', subtype='PCM_16'),
+            'float 48k stereo': encode(self.signal, 48000, format='WAV', subtype='FLOAT'),
+            'flac 22.05k': encode(self.signal, 22050, format='FLAC'),
+        }
+        for name, data in cases.items():
+            with self.subTest(name):
+                self.assert_matches_librosa(data)
+
+    def test_bundled_mp3(self):
+        """MP3 clips from the dataset decode without going through a file"""
+        clip = sorted(AUDIO_DIR.glob('*.mp3'))[0]
+        decoded = self.assert_matches_librosa(clip.read_bytes())
+        self.assertGreater(len(decoded), TARGET_SAMPLE_RATE)
+
+    def test_16k_mono_pcm_is_not_resampled(self):
+        """16 kHz mono PCM16 comes back as the exact samples"""
+        pcm = (self.signal[:, 0] * 32767).astype(np.int16)
+        decoded = decode_audio(encode(pcm, 16000, format='WAV', subtype='PCM_16'))
+        np.testing.assert_array_equal(decoded, pcm / np.float32(32768))
+
+    def test_bad_uploads(self):
+        """Empty or undecodable uploads raise AudioDecodeError"""
+        for data in (b'', b'RIFF\x00\x00\x00\x00WAVEnot really', b'plain text'):
+            with self.assertRaises(AudioDecodeError):
+                decode_audio(data)
+
+    def test_persisted_uploads_do_not_collide(self):
+        """Two uploads with the client filename get their own files"""
+        with tempfile.TemporaryDirectory() as tmp:
+            first = persist_upload(b'one', tmp, 'recording.wav')
+            second = persist_upload(b'two', tmp, 'recording.wav')
+            self.assertNotEqual(first, second)
+            self.assertEqual((first.read_bytes(), second.read_bytes()), (b'one', b'two'))
+            self.assertEqual(first.suffix, '.wav')
+            self.assertEqual(persist_upload(b'x', tmp, '../../etc/passwd').parent, Path(tmp))
+
+    def test_audio_clip(self):
+        """A clip decodes once and computes each derived feature once"""
+        clip = AudioClip.from_bytes(encode(self.signal, TARGET_SAMPLE_RATE, format='WAV', subtype='PCM_16'))
+        self.assertAlmostEqual(clip.duration, 2.0, places=3)
+        self.assertFalse(clip.samples.flags.writeable)
+
+        expected = WhisperFeatureExtractor()(clip.samples, sampling_rate=TARGET_SAMPLE_RATE,
+                                             return_tensors='np')['input_features'][0]
+        np.testing.assert_allclose(clip.log_mel, expected, atol=1e-4)
+        self.assertIs(clip.log_mel, clip.log_mel)
+
+        energy = clip.frame_energy
+        self.assertIs(energy, clip.frame_energy)
+        self.assertEqual(len(energy), len(clip) // HOP_LENGTH + 1)
+        # Downmixing two independent channels of RMS 0.2 halves the power
+        self.assertAlmostEqual(float(np.median(energy)), 0.2 / np.sqrt(2), delta=0.02)
+
+if __name__ == '__main__':
+    unittest.main()
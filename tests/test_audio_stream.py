@@ -0,0 +1,62 @@
+import struct
+import unittest
+
+import numpy as np
+from utils.audio_stream import (
+    encode_frame, parse_frame, FrameError, FrameSequencer, AudioRingBuffer, FRAME_HEADER, MAX_FRAME_SAMPLES
+)
+
+class TestFrames(unittest.TestCase):
+    def test_round_trip(self):
+        """Samples survive PCM16 framing to within quantization"""
+        samples = np.sin(np.linspace(0, 20, 1600)).astype(np.float32)
+        frame = parse_frame(encode_frame(7, samples, end=True))
+        self.assertEqual((frame.sequence, frame.end), (7, True))
+        self.assertEqual(frame.samples.dtype, np.float32)
+        np.testing.assert_allclose(frame.samples, samples, atol=1 / 16384)
+        self.assertEqual(len(encode_frame(0, samples)), FRAME_HEADER.size + 2 * len(samples))
+        self.assertEqual(len(parse_frame(encode_frame(1, [])).samples), 0)
+
+    def test_bad_frames(self):
+        good = encode_frame(0, np.zeros(10))
+        bad = [
+            b'\x01\x00',                                         # shorter than the header
+            b'\x02' + good[1:],                                  # unknown version
+            good + b'\x00',                                      # half a sample
+            struct.pack('<BBHI', 1, 0, 0, 0) + bytes(2 * MAX_FRAME_SAMPLES + 2),
+        ]
+        for message in bad:
+            with self.assertRaises(FrameError):
+                parse_frame(message)
+
+    def test_sequencer(self):
+        """Stale frames are dropped and gaps counted"""
+        sequencer = FrameSequencer()
+        frames = [parse_frame(encode_frame(n, [0.0])) for n in (0, 1, 1, 4, 3, 5)]
+        self.assertEqual([sequencer.accept(f) for f in frames], [True, True, False, True, False, True])
+        self.assertEqual((sequencer.missing, sequencer.dropped), (2, 2))
+
+class TestAudioRingBuffer(unittest.TestCase):
+    def test_wraps_and_reads_by_position(self):
+        ring = AudioRingBuffer(10)
+        stream = np.arange(37, dtype=np.float32)
+        for start in range(0, len(stream), 4):
+            ring.write(stream[start:start + 4])
+        self.assertEqual((ring.written, ring.oldest), (37, 27))
+        np.testing.assert_array_equal(ring.read(27), stream[27:])
+        np.testing.assert_array_equal(ring.read(29, 33), stream[29:33])
+        with self.assertRaises(ValueError):
+            ring.read(20)
+
+    def test_memory_is_fixed(self):
+        """Writing a long stream never grows the buffer"""
+        ring = AudioRingBuffer(16000)
+        size = ring.nbytes
+        for _ in range(100):
+            ring.write(np.ones(4000, dtype=np.float32))
+        ring.write(np.arange(40000, dtype=np.float32))
+        self.assertEqual(ring.nbytes, size)
+        np.testing.assert_array_equal(ring.read(ring.oldest), np.arange(24000, 40000, dtype=np.float32))
+
+if __name__ == '__main__':
+    unittest.main()
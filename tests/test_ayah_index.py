@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+from utils.ayah_index import AyahIndex
+from utils.reference_corpus import FATIHA
+
+IKHLAS = [
+    (112, 1, "قل هو الله احد"),
+    (112, 2, "الله الصمد"),
+    (112, 3, "لم يلد ولم يولد"),
+    (112, 4, "ولم يكن له كفوا احد"),
+]
+
+class TestAyahIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        fatiha = [(1, ayah.id + 1, ' '.join(ayah.simple_words)) for ayah in FATIHA]
+        cls.index = AyahIndex.build(fatiha + IKHLAS)
+
+    def test_ranked_candidates(self):
+        """Partial and misspelled transcripts rank the right ayah first"""
+        test_cases = [
+            ("رب العالمين", (1, 2, 2)),
+            ("الحمدلله رب العالمين", (1, 2, 0)),
+            ("غير المغضوب عليهم", (1, 7, 4)),
+            ("واياك نستعين", (1, 5, 2)),
+            ("لم يلد ولم يولد", (112, 3, 0)),
+            ("الله الصمت", (112, 2, 0)),
+        ]
+        for text, expected in test_cases:
+            best = self.index.search(text)[0]
+            self.assertEqual((best.surah, best.ayah, best.start_word), expected, f"search('{text}')")
+
+    def test_surah_filter(self):
+        """Restricting to a surah only returns its ayat"""
+        candidates = self.index.search("قل هو الله احد", top_k=10, surah=1)
+        self.assertTrue(all(c.surah == 1 for c in candidates))
+        self.assertLess(candidates[0].coverage, 0.4)
+        self.assertEqual(self.index.search("قل هو الله احد", surah=112)[0].coverage, 1.0)
+
+    def test_no_match(self):
+        """Transcripts without Arabic text return no candidates"""
+        self.assertEqual(self.index.search("hello"), [])
+
+    def test_round_trip(self):
+        """An index saved to disk and reopened with mmap ranks identically"""
+        with tempfile.TemporaryDirectory() as tmp:
+            self.index.save(tmp)
+            loaded = AyahIndex.load(tmp)
+            self.assertEqual(len(loaded), len(self.index))
+            for text in ["اهدنا الصراط", "ولم يكن له", "مالك يوم الدين"]:
+                self.assertEqual(loaded.search(text), self.index.search(text))
+            self.assertEqual(loaded.text(loaded.row(112, 1)), "قل هو الله احد")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import threading
+import unittest
+from utils.cache import ResultCache
+from utils.tajweed_checker import analyze_transcript, ANALYSIS_CACHE
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestResultCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first"""
+        cache = ResultCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['size']), (3, 1, 1, 2))
+
+    def test_ttl_expiry(self):
+        """Entries older than the TTL are misses"""
+        clock = FakeClock()
+        cache = ResultCache(maxsize=8, ttl=10, clock=clock)
+        cache.put('a', 1)
+        clock.now = 9.9
+        self.assertEqual(cache.get('a'), 1)
+        clock.now = 10.0
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_thread_safety(self):
+        """Concurrent writers never push the cache past its bound"""
+        cache = ResultCache(maxsize=50)
+
+        def writer(offset):
+            for i in range(2000):
+                cache.put(offset + i, i)
+                cache.get(offset + i // 2)
+
+        threads = [threading.Thread(target=writer, args=(n * 10000,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(cache), 50)
+        self.assertEqual(cache.stats()['evictions'], 4 * 2000 - 50)
+
+    def test_analysis_cache(self):
+        """A repeated transcript is answered from the cache; another spelling of it is not"""
+        ANALYSIS_CACHE.clear()
+        hits = ANALYSIS_CACHE.hits
+        first = analyze_transcript("الحمد رب")
+        self.assertIs(analyze_transcript("الحمد رب"), first)
+        self.assertEqual(ANALYSIS_CACHE.hits, hits + 1)
+        # Feedback quotes the transcript's own words, so spellings that normalize the same are kept apart
+        self.assertIsNot(analyze_transcript("ٱلْحَمْدُ رَبِّ"), first)
+        self.assertEqual(first['ayah_number'], 1)
+        self.assertIn('لله', first['feedback'][0])
+        self.assertIsNot(analyze_transcript("الحمد رب", ayah_number=1), first)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import math
+import unittest
+
+import torch
+from transformers import LogitsProcessorList
+from utils.constrained_decoding import SurahTokenTrie, SurahConstraintLogitsProcessor, resolve_decoding
+from utils.reference_corpus import FATIHA
+
+from tests.helpers import EOS, tiny_whisper
+
+VOCAB = 51865
+
+class FakeTokenizer:
+    """Two-letter pieces; a word's first piece carries its leading space, like GPT-2 BPE"""
+    def __init__(self):
+        self.vocab = {}
+
+    def __call__(self, text):
+        pieces = []
+        for i, word in enumerate(text.split(' ')):
+            if not word:
+                continue
+            prefix = ' ' if i > 0 else ''
+            pieces.append(prefix + word[:2])
+            pieces.extend(word[j:j + 2] for j in range(2, len(word), 2))
+        return [self.vocab.setdefault(piece, 100 + len(self.vocab)) for piece in pieces]
+
+class TestConstrainedDecoding(unittest.TestCase):
+    def setUp(self):
+        self.tokenize = FakeTokenizer()
+        self.trie = SurahTokenTrie(self.tokenize, EOS)
+
+    def step(self, processor, text_tokens, prompt=(50258,)):
+        """Scores the processor leaves for the next token after flat logits"""
+        input_ids = torch.tensor([list(prompt) + list(text_tokens)])
+        return processor(input_ids, torch.zeros(1, VOCAB))[0]
+
+    def assert_follows(self, processor, tokens, ends=True):
+        for i, token in enumerate(tokens):
+            scores = self.step(processor, tokens[:i])
+            self.assertEqual(scores[token].item(), 0.0, f"token {i} of the reference was penalized")
+        self.assertEqual(self.step(processor, tokens)[EOS].item() == 0.0, ends)
+
+    def test_reference_ayat_are_unpenalized(self):
+        """Every ayah, alone or running on into the next, follows the trie and may end after it"""
+        processor = SurahConstraintLogitsProcessor(self.trie, prompt_length=1, penalty=math.inf)
+        for ayah in FATIHA:
+            self.assert_follows(processor, self.tokenize(' '.join(ayah.simple_words)))
+            self.assert_follows(processor, self.tokenize(' ' + ayah.text))
+        self.assert_follows(processor, self.tokenize(FATIHA[0].simple_words[0]), ends=False)
+        self.assert_follows(processor, self.tokenize(f' {FATIHA[3].text} {FATIHA[4].text}'))
+
+    def test_end_of_surah_forces_end_of_text(self):
+        """After the last word of the surah the only token left is end-of-text"""
+        processor = SurahConstraintLogitsProcessor(self.trie, prompt_length=1, penalty=math.inf)
+        scores = self.step(processor, self.tokenize(FATIHA[6].text))
+        self.assertEqual(scores[EOS].item(), 0.0)
+        self.assertEqual(torch.isfinite(scores).sum().item(), 1)
+
+    def test_near_miss_is_penalized_not_forbidden(self):
+        """A confident off-reference token can still win, and the next reference word resyncs"""
+        processor = SurahConstraintLogitsProcessor(self.trie, prompt_length=1, penalty=5.0, max_misses=4)
+        tokens = self.tokenize('بسم')
+        scores = self.step(processor, tokens)
+        self.assertEqual(scores[self.tokenize(' الله')[0]].item(), 0.0)
+        self.assertEqual(scores[7].item(), -5.0)
+
+        wrong = tokens + self.tokenize(' زيد')
+        resynced = wrong + self.tokenize(' الرحمن')
+        self.assertTrue(processor.state(tuple(resynced)).nodes)
+        self.assertEqual(processor.state(tuple(resynced)).misses, 3)
+        scores = self.step(processor, resynced)
+        self.assertEqual(scores[self.tokenize(' الرحيم')[0]].item(), 0.0)
+
+    def test_miss_budget_forces_end_of_text(self):
+        """Runaway off-reference output is cut short"""
+        processor = SurahConstraintLogitsProcessor(self.trie, prompt_length=1, penalty=5.0, max_misses=3)
+        self.assertFalse(torch.isinf(self.step(processor, [7, 8, 9])).any())
+        scores = self.step(processor, [7, 8, 9, 10])
+        self.assertEqual(torch.isfinite(scores).sum().item(), 1)
+        self.assertEqual(scores[EOS].item(), 0.0)
+
+    def test_prompt_tokens_are_untouched(self):
+        """Forced start, language and task tokens are left to the other processors"""
+        processor = SurahConstraintLogitsProcessor(self.trie, prompt_length=4, penalty=math.inf)
+        scores = processor(torch.tensor([[50258, 50272]]), torch.zeros(1, VOCAB))
+        self.assertTrue(torch.equal(scores, torch.zeros(1, VOCAB)))
+
+    def test_generate_stays_on_reference(self):
+        """With a hard constraint, even an untrained decoder produces a reference sequence"""
+        model = tiny_whisper(forced=True)
+        processor = SurahConstraintLogitsProcessor(self.trie, prompt_length=4, penalty=math.inf)
+        with torch.no_grad():
+            generated = model.generate(torch.randn(2, 80, 3000), num_beams=1, max_length=4 + self.trie.max_tokens,
+                                       logits_processor=LogitsProcessorList([processor]))
+        for row in generated.tolist():
+            self.assertEqual(row[1:4], [50259, 50359, 50363])
+            text = tuple(token for token in row[4:] if token != EOS)
+            self.assertTrue(processor.state(text).nodes)
+            self.assertEqual(processor.state(text).misses, 0)
+
+    def test_resolve_decoding(self):
+        self.assertEqual(resolve_decoding(environ={}), 'free')
+        self.assertEqual(resolve_decoding(environ={'ASR_DECODING': 'Constrained'}), 'constrained')
+        with self.assertRaises(ValueError):
+            resolve_decoding('beam', environ={})
+
+if __name__ == '__main__':
+    unittest.main()
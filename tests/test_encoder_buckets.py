@@ -0,0 +1,40 @@
+import unittest
+
+import torch
+from utils.encoder_buckets import parse_buckets, bucket_frames, needed_frames, encode
+
+from tests.helpers import tiny_whisper
+
+class TestEncoderBuckets(unittest.TestCase):
+    def test_parse_buckets(self):
+        """Seconds become even frame counts, and the full window is always last"""
+        self.assertEqual(parse_buckets(''), ())
+        self.assertEqual(parse_buckets('10, 5,7.55'), (500, 756, 1000, 3000))
+        self.assertEqual(parse_buckets('45'), (3000,))
+        with self.assertRaises(ValueError):
+            parse_buckets('5,0')
+
+    def test_bucket_frames(self):
+        """A clip gets the shortest bucket that holds every frame it touches"""
+        buckets = (500, 1000, 3000)
+        self.assertEqual(needed_frames(16000 * 4), 401)
+        self.assertEqual(bucket_frames(16000 * 4, buckets), 500)
+        self.assertEqual(bucket_frames(499 * 160, buckets), 500)
+        self.assertEqual(bucket_frames(500 * 160, buckets), 1000)
+        self.assertEqual(bucket_frames(16000 * 40, buckets), 3000)
+        self.assertEqual(bucket_frames(16000, ()), 3000)
+
+    def test_encode_matches_encoder(self):
+        """Full windows encode exactly as the model does; short ones use the first positions"""
+        model = tiny_whisper(encoder_layers=2)
+        features = torch.randn(2, 80, 3000)
+        with torch.no_grad():
+            expected = model.get_encoder()(features).last_hidden_state
+            self.assertTrue(torch.allclose(encode(model, features).last_hidden_state, expected, atol=1e-6))
+            short = encode(model, features[..., :500])
+            self.assertEqual(tuple(short.last_hidden_state.shape), (2, 250, 64))
+            generated = model.generate(encoder_outputs=short, max_new_tokens=4)
+        self.assertEqual(generated.shape[0], 2)
+
+if __name__ == '__main__':
+    unittest.main()
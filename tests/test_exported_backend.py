@@ -0,0 +1,81 @@
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+
+import torch
+from utils.audio_io import AudioClip, log_mel_features
+from utils.encoder_buckets import encode
+from utils.exported_backend import ExportedWhisper, export_model, decoder_prompt, resolve_backend, PROCESSOR_CONFIG
+from utils.model_snapshot import load_snapshot_processor
+
+from tests.helpers import tiny_whisper, tiny_processor
+
+AUDIO_DIR = Path(__file__).resolve().parent.parent / 'tajweed dataset' / 'audio'
+HAS_ONNX = all(importlib.util.find_spec(name) for name in ('onnx', 'onnxruntime'))
+
+def tiny_model():
+    model = tiny_whisper(encoder_layers=2, decoder_layers=2, forced=True)
+    model.generation_config.suppress_tokens = [1, 2, 7]
+    return model
+
+class TestExportedBackend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        clips = [AudioClip.from_bytes(path.read_bytes()) for path in sorted(AUDIO_DIR.glob('*.mp3'))[:3]]
+        cls.features = torch.from_numpy(log_mel_features(clips))
+
+    def assert_parity(self, backend):
+        model = tiny_model()
+        with torch.no_grad():
+            expected = model.generate(self.features, max_length=24, num_beams=1)
+            # Encoder buckets: the eager path encodes short inputs with encode(), as the app does
+            expected_short = model.generate(encoder_outputs=encode(model, self.features[..., :1000]),
+                                            max_length=8, num_beams=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            export_model(model, Path(tmp) / 'export', backend, metadata={'model_id': 'tiny'},
+                         processor=tiny_processor(tmp))
+            exported = ExportedWhisper(Path(tmp) / 'export', model_id='tiny')
+            self.assertEqual(exported.metadata, {'model_id': 'tiny'})
+            with self.assertRaises(ValueError):
+                ExportedWhisper(Path(tmp) / 'export', model_id='other')
+            # The processor is saved with the graphs, so the export boots without the snapshot
+            self.assertTrue((Path(tmp) / 'export' / PROCESSOR_CONFIG).exists())
+            processor = load_snapshot_processor(Path(tmp) / 'export')
+            self.assertEqual(processor.tokenizer('ab', add_special_tokens=False).input_ids, [1, 2])
+            self.assertEqual(exported.generation_config.forced_decoder_ids, [[1, 50259], [2, 50359], [3, 50363]])
+            with torch.no_grad():
+                generated = exported.generate(self.features, max_length=24)
+                # Encoder buckets: shorter inputs run through the same graphs
+                short = exported.generate(self.features[..., :1000], max_length=8)
+        self.assertTrue(torch.equal(generated, expected))
+        self.assertTrue(torch.equal(short, expected_short))
+
+    def test_torchscript_matches_eager(self):
+        """Greedy decoding over TorchScript graphs gives the eager model's tokens"""
+        self.assert_parity('torchscript')
+
+    @unittest.skipUnless(HAS_ONNX, "onnx and onnxruntime are not installed")
+    def test_onnx_matches_eager(self):
+        """Greedy decoding under ONNX Runtime gives the eager model's tokens"""
+        self.assert_parity('onnx')
+
+    def test_decoder_prompt(self):
+        """The forced tokens must directly follow the start token"""
+        config = tiny_model().generation_config
+        self.assertEqual(decoder_prompt(config), [50258, 50259, 50359, 50363])
+        config.forced_decoder_ids = [[1, None], [2, 50359]]
+        with self.assertRaises(ValueError):
+            decoder_prompt(config)
+
+    def test_resolve_backend(self):
+        self.assertEqual(resolve_backend(environ={}), 'eager')
+        self.assertEqual(resolve_backend(environ={'ASR_BACKEND': 'TorchScript'}), 'torchscript')
+        with self.assertRaises(ValueError):
+            resolve_backend('tensorrt', environ={})
+        # ONNX exports are fp32 only, so other precisions run eager instead of failing at boot
+        self.assertEqual(resolve_backend('onnx', environ={}, precision='int8'), 'eager')
+        self.assertEqual(resolve_backend('onnx', environ={}, precision='fp32'), 'onnx' if HAS_ONNX else 'eager')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# Seconds a worker may spend importing app.py before it can serve /health/live; wall-clock time
+# depends on the machine, so the budget is only checked when IMPORT_BUDGET_SECONDS is set
+IMPORT_BUDGET_SECONDS = os.environ.get('IMPORT_BUDGET_SECONDS')
+# Imported on first use (model load, warmup or a request), never at import
+HEAVY_MODULES = ('torch', 'transformers', 'librosa', 'numba', 'psutil', 'whisper', 'onnxruntime')
+
+IMPORT_SCRIPT = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import app
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+def import_app():
+    """Import app.py in a fresh interpreter, with the background warmup off"""
+    script = IMPORT_SCRIPT.format(root=str(PROJECT_ROOT), heavy=HEAVY_MODULES)
+    env = dict(os.environ, ASR_WARMUP='0')
+    # app.py creates its scratch directory and request log in the working directory
+    with tempfile.TemporaryDirectory() as tmp:
+        output = subprocess.run([sys.executable, '-c', script], cwd=tmp, env=env, capture_output=True,
+                                text=True, timeout=120, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+class TestImportTime(unittest.TestCase):
+    def test_app_imports_without_heavy_modules(self):
+        """Importing app.py loads neither the model stack nor numba"""
+        self.assertEqual(import_app()['heavy'], [])
+
+    @unittest.skipUnless(IMPORT_BUDGET_SECONDS, "set IMPORT_BUDGET_SECONDS to check the import time")
+    def test_app_import_fits_budget(self):
+        """Importing app.py fits the budget"""
+        import_app()  # the first import also compiles bytecode; time the second
+        self.assertLess(import_app()['seconds'], float(IMPORT_BUDGET_SECONDS))
+
+if __name__ == '__main__':
+    unittest.main()
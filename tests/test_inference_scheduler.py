@@ -0,0 +1,67 @@
+import threading
+import time
+import unittest
+from utils.inference_scheduler import InferenceScheduler
+
+class TestInferenceScheduler(unittest.TestCase):
+    def test_concurrent_requests_are_batched(self):
+        """Inputs arriving within the wait window share one batch call"""
+        batches = []
+
+        def run_batch(items):
+            batches.append(list(items))
+            time.sleep(0.01)
+            return [item * 2 for item in items]
+
+        scheduler = InferenceScheduler(run_batch, max_batch_size=4, max_wait_ms=50)
+        futures = [scheduler.submit(i) for i in range(10)]
+        self.assertEqual([f.result(timeout=5) for f in futures], [i * 2 for i in range(10)])
+        scheduler.close()
+        self.assertEqual([len(b) for b in batches], [4, 4, 2])
+
+        stats = scheduler.stats()
+        self.assertEqual((stats['items'], stats['batches']), (10, 3))
+        self.assertGreater(stats['latency_p99_ms'], 0)
+        self.assertGreaterEqual(stats['latency_p99_ms'], stats['latency_p50_ms'])
+
+    def test_single_request_waits_at_most_max_wait(self):
+        """A lone request runs once the wait window expires"""
+        scheduler = InferenceScheduler(lambda items: items, max_batch_size=8, max_wait_ms=20)
+        start = time.monotonic()
+        self.assertEqual(scheduler.infer('x', timeout=5), 'x')
+        self.assertLess(time.monotonic() - start, 1.0)
+        scheduler.close()
+
+    def test_threads_get_their_own_results(self):
+        """Results are routed back to the thread that submitted each input"""
+        scheduler = InferenceScheduler(lambda items: [f"r{item}" for item in items], max_batch_size=3, max_wait_ms=5)
+        results = {}
+
+        def client(n):
+            results[n] = scheduler.infer(n, timeout=5)
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        scheduler.close()
+        self.assertEqual(results, {n: f"r{n}" for n in range(12)})
+
+    def test_failures_reach_every_caller(self):
+        """An exception in the batch function is raised for each input of the batch"""
+        def run_batch(items):
+            raise ValueError("model failed")
+
+        scheduler = InferenceScheduler(run_batch, max_batch_size=2, max_wait_ms=20)
+        futures = [scheduler.submit(i) for i in range(2)]
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(timeout=5)
+        self.assertEqual(scheduler.stats()['failures'], 2)
+        scheduler.close()
+        with self.assertRaises(RuntimeError):
+            scheduler.submit(3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import io
+import logging
+import unittest
+from utils.log_config import configure_logging, get_logger
+from utils.text_matcher import match_ayah_and_word
+
+class CountingArg:
+    """Counts how often a log argument is formatted."""
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return 'arg'
+
+class TestLogConfig(unittest.TestCase):
+    def tearDown(self):
+        configure_logging({})
+
+    def test_subsystem_levels(self):
+        """The environment sets a global level with per-subsystem overrides"""
+        levels = configure_logging({'TAJWEED_LOG_LEVEL': 'warning', 'TAJWEED_LOG_MATCHER': 'DEBUG'})
+        self.assertEqual(levels['matcher'], 'DEBUG')
+        self.assertEqual(levels['checker'], 'WARNING')
+        self.assertTrue(get_logger('matcher').isEnabledFor(logging.DEBUG))
+        self.assertFalse(get_logger('ws').isEnabledFor(logging.INFO))
+        with self.assertRaises(ValueError):
+            configure_logging({'TAJWEED_LOG_LEVEL': 'LOUD'})
+
+    def test_disabled_messages_are_not_formatted(self):
+        """A message below the level never formats its arguments"""
+        configure_logging({'TAJWEED_LOG_MATCHER': 'INFO'})
+        arg = CountingArg()
+        get_logger('matcher').debug("value %s", arg)
+        self.assertEqual(arg.formatted, 0)
+
+    def test_matcher_debug_output(self):
+        """Matcher debug messages appear only when its subsystem is at DEBUG"""
+        stream = io.StringIO()
+        handler = logging.StreamHandler(stream)
+        matcher = get_logger('matcher')
+        matcher.addHandler(handler)
+        try:
+            configure_logging({'TAJWEED_LOG_MATCHER': 'INFO'})
+            match_ayah_and_word("رب العالمين")
+            self.assertEqual(stream.getvalue(), '')
+            configure_logging({'TAJWEED_LOG_MATCHER': 'DEBUG'})
+            match_ayah_and_word("رب العالمين")
+            self.assertIn("Matched ayah 1 from word 2", stream.getvalue())
+        finally:
+            matcher.removeHandler(handler)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+from utils.audio_io import AudioClip, TARGET_SAMPLE_RATE
+from utils.long_form import split_windows, merge_transcripts, Window, WINDOW_SECONDS, OVERLAP_SECONDS
+
+RATE = TARGET_SAMPLE_RATE
+
+def recitation(segments, seed=0):
+    """A clip of noise bursts ('speech', seconds) and silences ('pause', seconds)."""
+    rng = np.random.default_rng(seed)
+    parts = [(rng.standard_normal(int(seconds * RATE)) * (0.3 if kind == 'speech' else 0.001))
+             for kind, seconds in segments]
+    return AudioClip(np.concatenate(parts).astype(np.float32))
+
+class TestLongForm(unittest.TestCase):
+    def assert_valid_windows(self, clip, windows):
+        self.assertEqual(windows[0].start, 0)
+        self.assertEqual(windows[-1].end, len(clip))
+        for previous, window in zip(windows, windows[1:]):
+            self.assertLessEqual(window.start, previous.end)
+            self.assertEqual(window.overlap, window.start < previous.end)
+        for window in windows:
+            self.assertLessEqual(window.end - window.start, WINDOW_SECONDS * RATE)
+
+    def test_short_clip_is_one_window(self):
+        clip = recitation([('speech', 12)])
+        self.assertEqual(split_windows(clip), [Window(0, len(clip), False)])
+
+    def test_cuts_at_pauses(self):
+        """Windows end inside the pauses between ayat, without overlap"""
+        layout = [('speech', 20), ('pause', 1), ('speech', 15), ('pause', 1), ('speech', 18), ('pause', 1),
+                  ('speech', 10)]
+        clip = recitation(layout)
+        windows = split_windows(clip)
+        self.assert_valid_windows(clip, windows)
+        self.assertEqual(len(windows), 3)
+        for window, (begin, end) in zip(windows, [(20, 21), (36, 37)]):
+            self.assertTrue(begin * RATE <= window.end <= end * RATE, (window, begin, end))
+        self.assertFalse(any(window.overlap for window in windows))
+
+    def test_no_cut_in_first_half(self):
+        """A pause at the start of a window is not cut at, even when the search reaches back that far"""
+        clip = recitation([('pause', 0.5), ('speech', 16.5)])
+        windows = split_windows(clip, 15.0)
+        self.assert_valid_windows(clip, windows)
+        for window in windows[:-1]:
+            self.assertGreaterEqual(window.end - window.start, 7.5 * RATE, window)
+
+    def test_hard_cuts_overlap(self):
+        """Without pauses, windows are full length and overlap by OVERLAP_SECONDS"""
+        clip = recitation([('speech', 75)])
+        windows = split_windows(clip)
+        self.assert_valid_windows(clip, windows)
+        self.assertEqual(len(windows), 3)
+        self.assertTrue(all(window.overlap for window in windows[1:]))
+        self.assertEqual(windows[0].end - windows[1].start, OVERLAP_SECONDS * RATE)
+
+    def test_merge_drops_repeated_words(self):
+        windows = [Window(0, 10, False), Window(8, 20, True), Window(20, 30, False)]
+        texts = ['بسم الله الرحمن', 'الرحمن الرحيم الحمد لله', 'لله رب العالمين']
+        # The overlap repeats الرحمن; the pause cut does not, so لله is kept twice
+        self.assertEqual(merge_transcripts(texts, windows),
+                         'بسم الله الرحمن الرحيم الحمد لله لله رب العالمين')
+        # Words on the cut may be spelled differently by the two windows
+        self.assertEqual(merge_transcripts(['مالك يوم', 'ملك يوم الدين'], windows[:2]), 'مالك يوم الدين')
+        self.assertEqual(merge_transcripts(['', 'اياك نعبد'], windows[:2]), 'اياك نعبد')
+
+if __name__ == '__main__':
+    unittest.main()
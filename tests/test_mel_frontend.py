@@ -0,0 +1,47 @@
+import unittest
+from pathlib import Path
+
+import librosa
+import numpy as np
+from transformers import WhisperFeatureExtractor
+from utils.mel_frontend import log_mel_spectrogram, mel_filters, N_MELS, N_FRAMES, SAMPLE_RATE
+
+AUDIO_DIR = Path(__file__).resolve().parent.parent / 'tajweed dataset' / 'audio'
+TOLERANCE = 1e-4
+
+class TestMelFrontend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.extractor = WhisperFeatureExtractor()
+        rng = np.random.default_rng(0)
+        cls.clips = [(rng.standard_normal(int(SAMPLE_RATE * seconds)) * 0.1).astype(np.float32)
+                     for seconds in (3, 7.3, 12, 0.01, 31)]
+        cls.clips.append(librosa.load(sorted(AUDIO_DIR.glob('*.mp3'))[0], sr=SAMPLE_RATE)[0])
+
+    def reference(self, clip):
+        return self.extractor(clip, sampling_rate=SAMPLE_RATE, return_tensors='np')['input_features'][0]
+
+    def test_filterbank_matches_processor(self):
+        """The cached filterbank is the processor's Slaney filterbank"""
+        np.testing.assert_allclose(mel_filters().numpy(), self.extractor.mel_filters.T, atol=1e-7)
+
+    def test_matches_processor(self):
+        """Each clip's features match the Hugging Face feature extractor"""
+        for clip in self.clips:
+            with self.subTest(seconds=len(clip) / SAMPLE_RATE):
+                features = log_mel_spectrogram([clip])
+                self.assertEqual(features.shape, (1, N_MELS, N_FRAMES))
+                self.assertEqual(features.dtype, np.float32)
+                np.testing.assert_allclose(features[0], self.reference(clip), atol=TOLERANCE)
+
+    def test_batch_equals_single(self):
+        """A clip's features do not depend on the other clips of its batch"""
+        batch = log_mel_spectrogram(self.clips)
+        for clip, features in zip(self.clips, batch):
+            np.testing.assert_allclose(features, log_mel_spectrogram([clip])[0], atol=1e-6)
+        # Reusing the padding buffer for a shorter batch leaves no stale samples behind
+        np.testing.assert_allclose(log_mel_spectrogram(self.clips[:1])[0], self.reference(self.clips[0]),
+                                   atol=TOLERANCE)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import copy
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import torch
+from torch.ao.nn.quantized import dynamic as quantized_dynamic
+from utils.precision import convert_model
+from utils.model_snapshot import (save_snapshot, read_snapshot, load_snapshot_model, load_snapshot_processor,
+                                  SNAPSHOT_FORMAT, SNAPSHOT_INFO)
+
+from tests.helpers import tiny_whisper, tiny_processor
+
+class TestModelSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.directory = Path(self.tmp.name) / 'snapshot'
+        self.processor = tiny_processor(self.tmp.name)
+
+    def test_round_trip(self):
+        """A snapshot loads back converted, with the same outputs, configs and processor"""
+        model = tiny_whisper()
+        save_snapshot(copy.deepcopy(model), self.processor, self.directory, 'int8',
+                      metadata={'model_id': 'tiny'})
+        info = read_snapshot(self.directory)
+        self.assertEqual(info['format'], SNAPSHOT_FORMAT)
+        self.assertEqual(info['precision'], 'int8')
+        self.assertEqual(info['metadata'], {'model_id': 'tiny'})
+
+        loaded = load_snapshot_model(self.directory, 'int8', model_id='tiny')
+        self.assertIsInstance(loaded.model.decoder.layers[0].fc1, quantized_dynamic.Linear)
+        self.assertEqual(loaded.generation_config.decoder_start_token_id, 50258)
+        processor = load_snapshot_processor(self.directory)
+        self.assertEqual(processor.tokenizer('ab', add_special_tokens=False).input_ids, [1, 2])
+
+        features = torch.randn(1, 80, 3000)
+        with torch.no_grad():
+            reference = convert_model(model, 'int8').generate(features, max_new_tokens=4)
+            self.assertTrue(torch.equal(loaded.generate(features, max_new_tokens=4), reference))
+
+    def test_mismatches(self):
+        """Missing snapshots, other precisions and other formats are refused"""
+        self.assertIsNone(read_snapshot(self.directory))
+        with self.assertRaises(FileNotFoundError):
+            load_snapshot_model(self.directory, 'fp32')
+        save_snapshot(tiny_whisper(), self.processor, self.directory, 'fp32')
+        with self.assertRaises(ValueError):
+            load_snapshot_model(self.directory, 'int8')
+        # A snapshot path reused after changing the checkpoint is not booted silently
+        with self.assertRaises(ValueError):
+            load_snapshot_model(self.directory, 'fp32', model_id='other')
+        info = json.loads((self.directory / SNAPSHOT_INFO).read_text())
+        (self.directory / SNAPSHOT_INFO).write_text(json.dumps({**info, 'format': SNAPSHOT_FORMAT + 1}))
+        with self.assertRaises(ValueError):
+            read_snapshot(self.directory)
+
+    def test_concurrent_writers(self):
+        """A second writer of the same snapshot leaves the first one in place"""
+        save_snapshot(tiny_whisper(), self.processor, self.directory, 'fp32', metadata={'writer': '1'})
+        save_snapshot(tiny_whisper(), self.processor, self.directory, 'fp32', metadata={'writer': '2'})
+        self.assertEqual(read_snapshot(self.directory)['metadata'], {'writer': '1'})
+        self.assertFalse([path for path in self.directory.parent.iterdir() if path.name.startswith('.snapshot.')])
+
+if __name__ == '__main__':
+    unittest.main()
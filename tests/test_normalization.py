@@ -0,0 +1,46 @@
+import unittest
+from utils.normalization import (
+    normalize_arabic_text,
+    normalize_tajweed_text,
+    clear_normalization_cache,
+)
+
+class TestNormalization(unittest.TestCase):
+    def test_matcher_normalization(self):
+        """Outputs must stay identical to the original regex chain"""
+        test_cases = [
+            # Madd words are rewritten before diacritics are stripped
+            ("الرحمان الرحيم", "الرحمن الرحيم"),
+            ("الرحمـٰن", "الرحمن"),
+            ("ٱلرَّحْمَٰنِ ٱلرَّحِيمِ", "الرحمان الرحيم"),
+            # Superscript alif becomes a plain alif
+            ("مَٰلِكِ يَوْمِ ٱلدِّينِ", "مالك يوم الدين"),
+            ("ٱلصِّرَٰطَ", "الصراط"),
+            # Letter folding and non-Arabic removal
+            ("وَلَا ٱلضَّآلِّينَ", "ولا الضالين"),
+            ("رحمة", "رحمه"),
+            ("hello  الحمد 123", "الحمد"),
+            ("", ""),
+        ]
+
+        for text, expected in test_cases:
+            self.assertEqual(normalize_arabic_text(text), expected,
+                             f"Normalization failed for '{text}'")
+
+    def test_tajweed_normalization(self):
+        """The checker variant additionally expands the short spelling of Maaliki"""
+        self.assertEqual(normalize_tajweed_text("ملك يوم الدين"), "مالك يوم الدين")
+        self.assertEqual(normalize_tajweed_text("مَالِكِ"), "مالك")
+        self.assertEqual(normalize_tajweed_text("ٱلْحَمْدُ لِلَّهِ"), "الحمد لله")
+
+    def test_memoization(self):
+        """Repeated inputs are served from the memo"""
+        clear_normalization_cache()
+        normalize_arabic_text("ٱلْحَمْدُ")
+        normalize_arabic_text("ٱلْحَمْدُ")
+        info = normalize_arabic_text.cache_info()
+        self.assertEqual(info.misses, 1)
+        self.assertEqual(info.hits, 1)
+
+if __name__ == '__main__':
+    unittest.main()
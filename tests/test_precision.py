@@ -0,0 +1,64 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import torch
+from torch.ao.nn.quantized import dynamic as quantized_dynamic
+from utils import runtime_config
+from utils.precision import convert_model, save_model, load_model, resolve_precision, TORCH_DTYPES
+
+class TinyModel(torch.nn.Module):
+    def __init__(self, dtype=torch.float32):
+        super().__init__()
+        self.embed = torch.nn.Embedding(50, 32, dtype=dtype)
+        self.hidden = torch.nn.Linear(32, 64, dtype=dtype)
+        self.out = torch.nn.Linear(32, 50, bias=False, dtype=dtype)
+        self.out.weight = self.embed.weight
+
+    def forward(self, ids):
+        x = self.embed(ids)
+        return self.out(self.hidden(x)[..., :32])
+
+class TestPrecision(unittest.TestCase):
+    def round_trip(self, mode):
+        torch.manual_seed(0)
+        model = convert_model(TinyModel(), mode)
+        ids = torch.arange(10)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / f'tiny-{mode}.safetensors'
+            save_model(model, path, mode)
+            loaded = load_model(lambda dtype: TinyModel(dtype), path, mode)
+            with torch.no_grad():
+                self.assertTrue(torch.equal(model(ids), loaded(ids)))
+            with self.assertRaises(ValueError):
+                load_model(lambda dtype: TinyModel(dtype), path, 'fp16')
+        return loaded
+
+    def test_int8_round_trip(self):
+        """A quantized model loads back with the same int8 weights and outputs"""
+        loaded = self.round_trip('int8')
+        self.assertIsInstance(loaded.hidden, quantized_dynamic.Linear)
+        self.assertIsInstance(loaded.out, quantized_dynamic.Linear)
+        self.assertEqual(loaded.embed.weight.dtype, torch.float32)
+
+    def test_float_round_trips(self):
+        """fp32 and bf16 models load back unchanged, in their own dtype"""
+        for mode in ('fp32', 'bf16'):
+            loaded = self.round_trip(mode)
+            self.assertEqual(loaded.hidden.weight.dtype, TORCH_DTYPES[mode])
+
+    def test_resolve_precision(self):
+        """Modes come from the environment, bf16 needs CPU support"""
+        self.assertEqual(resolve_precision(environ={}), 'fp32')
+        self.assertEqual(resolve_precision(environ={'ASR_PRECISION': 'INT8'}), 'int8')
+        self.assertEqual(resolve_precision('fp16', environ={'ASR_PRECISION': 'int8'}), 'fp16')
+        with self.assertRaises(ValueError):
+            resolve_precision('int4', environ={})
+        with mock.patch.object(runtime_config, 'cpu_supports_bf16', return_value=False):
+            self.assertEqual(resolve_precision('bf16', environ={}), 'fp32')
+        with mock.patch.object(runtime_config, 'cpu_supports_bf16', return_value=True):
+            self.assertEqual(resolve_precision('bf16', environ={}), 'bf16')
+
+if __name__ == '__main__':
+    unittest.main()
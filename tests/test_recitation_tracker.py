@@ -0,0 +1,39 @@
+import unittest
+from utils.text_matcher import RecitationTracker
+
+FULL_SURAH = ("بسم الله الرحمن الرحيم الحمد لله رب العالمين الرحمن الرحيم ملك يوم الدين "
+              "اياك نعبد واياك نستعين اهدنا الصراط المستقيم صراط الذين انعمت عليهم "
+              "غير المغضوب عليهم ولا الضالين")
+
+class TestRecitationTracker(unittest.TestCase):
+    def test_follows_full_recitation(self):
+        """Word-by-word updates land on every word of the surah in order"""
+        tracker = RecitationTracker()
+        positions = [tracker.update(word) for word in FULL_SURAH.split()]
+        self.assertEqual(positions[4:8], [(1, 0), (1, 1), (1, 2), (1, 3)])
+        self.assertEqual(positions[23:27], [(6, 3), (6, 4), (6, 5), (6, 6)])
+        self.assertEqual(positions[-1], (6, 8))
+
+    def test_starting_points(self):
+        """Recitations can start mid-ayah, run words together or skip a word"""
+        test_cases = [
+            ("رب العالمين", (1, 3)),
+            ("الحمدلله رب", (1, 2)),
+            ("الحمد لله العالمين", (1, 3)),
+            ("اهدنا الصرات", (5, 1)),
+        ]
+        for text, expected in test_cases:
+            tracker = RecitationTracker()
+            self.assertEqual(tracker.update(text), expected, f"update('{text}')")
+
+    def test_sync_partial_transcripts(self):
+        """Growing and revised partial transcripts only replay what changed"""
+        tracker = RecitationTracker()
+        self.assertEqual(tracker.position, (None, None))
+        self.assertEqual(tracker.sync("الحمد لله رب"), (1, 2))
+        self.assertEqual(tracker.sync("الحمد لله رب العالمين"), (1, 3))
+        self.assertEqual(tracker.sync("الحمد لله"), (1, 1))
+        self.assertEqual(tracker.words, ["الحمد", "لله"])
+
+if __name__ == '__main__':
+    unittest.main()
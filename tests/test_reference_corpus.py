@@ -0,0 +1,49 @@
+import unittest
+from utils.reference_corpus import FATIHA, ReferenceCorpus
+from utils.tajweed_checker import analyze_ayah, analyze_mistakes, SURAH_FATIHA
+
+class TestReferenceCorpus(unittest.TestCase):
+    def test_exact_match(self):
+        """Accepted spellings of a whole ayah hash straight to its id"""
+        test_cases = [
+            ("الحمد لله رب العالمين", 1),
+            ("ٱلْحَمْدُ لِلَّهِ رَبِّ ٱلْعَٰلَمِينَ", 1),
+            ("الحمد لله رب العلمين", 1),
+            ("الرحمن الرحيم", 2),
+            ("ٱلرَّحْمَٰنِ ٱلرَّحِيمِ", 2),
+            ("بسم الله الرحمن الرحيم", 0),
+            ("ملك يوم الدين", 3),
+            ("صراط الذين انعمت عليهم غير المغضوب عليهم ولا الضالين", 6),
+            # Partial or fuzzy transcripts are left to the matcher
+            ("الحمد لله", None),
+            ("الحمد لله رب العالم", None),
+        ]
+        for text, expected in test_cases:
+            self.assertEqual(FATIHA.exact_match(text), expected, f"exact_match('{text}')")
+
+    def test_single_source(self):
+        """The checker's table is derived from the corpus"""
+        self.assertEqual(len(FATIHA), 7)
+        for ayah in FATIHA:
+            self.assertEqual(SURAH_FATIHA[ayah.id]['text'], ayah.text)
+            self.assertEqual(len(ayah.variants), len(ayah.words))
+
+    def test_reference_for_unknown_text(self):
+        """Texts outside the corpus are compiled on the fly"""
+        corpus = ReferenceCorpus({'a': "قل هو الله احد"})
+        self.assertIs(corpus.reference_for("قل هو الله احد"), corpus['a'])
+        self.assertEqual(FATIHA.reference_for("قل هو الله احد").normalized_words, ["قل", "هو", "الله", "احد"])
+
+    def test_fast_path(self):
+        """An exact recitation succeeds without any fuzzy matching"""
+        feedback = analyze_ayah(1, "الحمد لله رب العالمين")
+        self.assertEqual([item['type'] for item in feedback], ['success'])
+
+    def test_repeated_word_positions(self):
+        """Omissions of repeated words report their own position"""
+        mistakes = analyze_mistakes("صراط الذين انعمت", SURAH_FATIHA[6]['text'])
+        positions = [m['position'] for m in mistakes if m['type'] == 'omission']
+        self.assertEqual(positions, [3, 4, 5, 6, 7, 8])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from utils.runtime_config import RuntimeSettings, resolve_settings, settings_fingerprint
+
+class TestRuntimeSettings(unittest.TestCase):
+    def test_resolve_settings(self):
+        """Every setting is read from the environment, with defaults"""
+        settings = resolve_settings(environ={})
+        self.assertEqual(settings, RuntimeSettings(precision='fp32', decoding='free', constraint_penalty=5.0,
+                                                   constraint_misses=8, backend='eager', encoder_buckets=()))
+        settings = resolve_settings(environ={'ASR_DECODING': 'constrained', 'ASR_CONSTRAINT_PENALTY': 'inf',
+                                             'ASR_CONSTRAINT_MISSES': '3', 'ASR_BACKEND': 'torchscript',
+                                             'ASR_ENCODER_BUCKETS': '10'})
+        self.assertEqual(settings.constraint_penalty, float('inf'))
+        self.assertEqual(settings.constraint_misses, 3)
+        self.assertEqual(settings.backend, 'torchscript')
+        self.assertEqual(settings.encoder_buckets, (1000, 3000))
+        settings = resolve_settings(environ={'ASR_BACKEND': 'onnx', 'ASR_PRECISION': 'int8'})
+        self.assertEqual(settings.backend, 'eager')
+
+    def test_fingerprint_covers_every_setting(self):
+        """Changing any one setting changes the fingerprint"""
+        base = resolve_settings(environ={})
+        fingerprints = {settings_fingerprint(base)}
+        for changed in (base._replace(precision='int8'), base._replace(decoding='constrained'),
+                        base._replace(constraint_penalty=2.0), base._replace(constraint_misses=1),
+                        base._replace(backend='onnx'), base._replace(encoder_buckets=(1000,))):
+            fingerprints.add(settings_fingerprint(changed))
+        self.assertEqual(len(fingerprints), len(RuntimeSettings._fields) + 1)
+        self.assertEqual(settings_fingerprint(base), settings_fingerprint(resolve_settings(environ={})))
+
+if __name__ == '__main__':
+    unittest.main()
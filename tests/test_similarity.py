@@ -0,0 +1,64 @@
+import unittest
+from utils.similarity import encode_word, encoded_ratio, phonetic_ratio
+from utils.text_matcher import similar, similarity_matrix
+
+class TestSimilarityKernel(unittest.TestCase):
+    def test_ratio_scale(self):
+        """Plain edits follow the indel ratio 1 - distance / (len(a) + len(b))"""
+        self.assertEqual(phonetic_ratio("الحمد", "الحمد"), 1.0)
+        # One deleted letter out of 6 + 5
+        self.assertAlmostEqual(phonetic_ratio("الرحمن", "الرحم"), 1 - 1 / 11)
+        # No letters in common
+        self.assertEqual(phonetic_ratio("رب", "لله"), 0.0)
+
+    def test_phonetic_confusions(self):
+        """Confusable letters cost a quarter of a full substitution"""
+        full = phonetic_ratio("المستقيم", "المستفيم")
+        confused = phonetic_ratio("المستقيم", "المستكيم")
+        self.assertGreater(confused, full)
+        self.assertAlmostEqual(confused, 1 - 0.5 / 16)
+        self.assertAlmostEqual(phonetic_ratio("الصراط", "السراط"), phonetic_ratio("السراط", "الصراط"))
+
+    def test_cutoff(self):
+        """Scores below the cutoff are reported as 0.0"""
+        a, b = encode_word("نعبد"), encode_word("نستعين")
+        score = encoded_ratio(a, b)
+        self.assertGreater(score, 0.0)
+        self.assertEqual(encoded_ratio(a, b, cutoff=score + 0.01), 0.0)
+        self.assertEqual(encoded_ratio(a, b, cutoff=score), score)
+
+    def test_similar_thresholds(self):
+        """similar() keeps its 0.8 match / 0.7 common-word semantics"""
+        test_cases = [
+            # Same word after normalization
+            ("ٱلْحَمْدُ", "الحمد", 1.0),
+            # Phonetic substitution counts as a match
+            ("الصراط", "السراط", 1.0),
+            ("المستقيم", "المستكيم", 1.0),
+        ]
+        for a, b, expected in test_cases:
+            self.assertEqual(similar(a, b), expected, f"similar('{a}', '{b}')")
+
+        self.assertLess(similar("نعبد", "نستعين"), 0.7)
+        # 0.8 is not above the regular threshold...
+        self.assertAlmostEqual(similar("يوم", "يو"), 0.8)
+        # ...but 'بسم' is a common word, matched above 0.7
+        self.assertAlmostEqual(phonetic_ratio("بسم", "بس"), 0.8)
+        self.assertEqual(similar("بسم", "بس"), 1.0)
+        self.assertEqual(similar("نعبد", "نستعين", cutoff=0.7), 0.0)
+
+    def test_similarity_matrix(self):
+        """The batched matrix agrees with similar() on every pair"""
+        words_a = ["ٱلْحَمْدُ", "يوم", "بسم", "الصراط", "نعبد", ""]
+        words_b = ["الحمد", "يو", "بس", "السراط", "نستعين", "المستكيم", ""]
+        for cutoff in (0.0, 0.7, 0.8):
+            matrix = similarity_matrix(words_a, words_b, cutoff=cutoff)
+            self.assertEqual(matrix.shape, (len(words_a), len(words_b)))
+            for i, a in enumerate(words_a):
+                for j, b in enumerate(words_b):
+                    self.assertAlmostEqual(matrix[i, j], similar(a, b, cutoff=cutoff), places=6,
+                                           msg=f"similar('{a}', '{b}', cutoff={cutoff})")
+        self.assertEqual(similarity_matrix([], words_b).shape, (0, len(words_b)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import itertools
+import unittest
+
+import numpy as np
+from utils.audio_io import TARGET_SAMPLE_RATE
+from utils.reference_corpus import FATIHA
+from utils.streaming import StreamingTranscriber
+
+RATE = TARGET_SAMPLE_RATE
+WORD_SECONDS = 0.6
+GAP_SECONDS = 0.15
+PAUSE_SECONDS = 1.0
+FRAME = RATE // 20
+
+def tone(index):
+    return 400 + 80 * index
+
+def recitation(ayat, gap_seconds=GAP_SECONDS, pause_seconds=PAUSE_SECONDS):
+    """Audio where every word is a burst of its own tone, and the words it contains."""
+    words, parts = [], []
+    t = np.arange(int(WORD_SECONDS * RATE)) / RATE
+    for ayah in ayat:
+        for word in ayah.simple_words:
+            parts.append(0.3 * np.sin(2 * np.pi * tone(len(words)) * t))
+            parts.append(np.zeros(int(gap_seconds * RATE)))
+            words.append(word)
+        parts.append(np.zeros(int(pause_seconds * RATE)))
+    return np.concatenate(parts).astype(np.float32), words
+
+class ToneRecognizer:
+    """Stands in for Whisper: a word for every burst of a known tone in the clip."""
+
+    def __init__(self, words):
+        self.words = words
+        self.calls = []
+
+    def __call__(self, clips):
+        self.calls.append([clip.duration for clip in clips])
+        return [self.transcribe(clip.samples) for clip in clips]
+
+    def transcribe(self, samples):
+        found = []
+        for start in range(0, len(samples) - FRAME + 1, FRAME):
+            frame = samples[start:start + FRAME]
+            if np.sqrt(np.mean(frame ** 2)) < 0.05:
+                found.append(None)
+                continue
+            frequency = np.argmax(np.abs(np.fft.rfft(frame))) * RATE / FRAME
+            found.append(int(round((frequency - 400) / 80)))
+        # A burst is recognized when at least half a word of it is in the clip
+        runs = [(index, sum(1 for _ in group)) for index, group in itertools.groupby(found)]
+        minimum = WORD_SECONDS * 20 / 2
+        return ' '.join(self.words[index] for index, length in runs
+                        if index is not None and 0 <= index < len(self.words) and length >= minimum)
+
+class TestStreamingTranscriber(unittest.TestCase):
+    def stream(self, audio, recognizer, chunk_seconds=0.25, **kwargs):
+        streamer = StreamingTranscriber(recognizer, **kwargs)
+        chunk = int(chunk_seconds * RATE)
+        partials = []
+        for start in range(0, len(audio), chunk):
+            update = streamer.add(audio[start:start + chunk])
+            if update is not None:
+                partials.append(update)
+        return streamer, partials
+
+    def test_partials_and_final(self):
+        """Partials arrive every interval, each decode is bounded, and the final text is complete"""
+        audio, words = recitation([FATIHA[0], FATIHA[1], FATIHA[2], FATIHA[3]])
+        recognizer = ToneRecognizer(words)
+        streamer, partials = self.stream(audio, recognizer, update_seconds=1.0, segment_seconds=6.0)
+
+        duration = len(audio) / RATE
+        self.assertEqual(len(partials), int(duration / 1.0))
+        self.assertFalse(any(partial['final'] for partial in partials))
+        for calls in recognizer.calls:
+            self.assertLessEqual(len(calls), 2)
+            self.assertTrue(all(seconds <= 6.0 for seconds in calls))
+        # Transcripts grow monotonically and the tracker follows along
+        self.assertEqual(partials[-1]['text'].split(), words[:len(partials[-1]['text'].split())])
+        self.assertIn(partials[len(partials) // 2]['ayah_number'], (1, 2))
+
+        calls_before = len(recognizer.calls)
+        final = streamer.finish()
+        self.assertTrue(final['final'])
+        self.assertEqual(final['text'].split(), words)
+        self.assertEqual((final['ayah_number'], final['word_index']), (3, len(FATIHA[3].simple_words) - 1))
+        # Only the open segment is decoded after the last chunk
+        self.assertEqual(len(recognizer.calls), calls_before + 1)
+        self.assertLessEqual(recognizer.calls[-1][0], 6.0 + 1.0)
+
+    def test_hard_cuts_without_pauses(self):
+        """A segment with no pause is cut with overlap and the repeated word kept once"""
+        audio, words = recitation([FATIHA[0], FATIHA[1], FATIHA[2]], gap_seconds=0, pause_seconds=0)
+        recognizer = ToneRecognizer(words)
+        streamer, _ = self.stream(audio, recognizer, update_seconds=1.0, segment_seconds=4.0)
+        self.assertEqual(streamer.finish()['text'].split(), words)
+
+    def test_leading_silence_is_not_committed_alone(self):
+        """Silence before the first word does not become a committed window of its own"""
+        # Continuous speech, so the only pause in the first segment is the one at its start
+        audio, words = recitation(list(FATIHA), gap_seconds=0, pause_seconds=0)
+        audio = np.concatenate([np.zeros(int(0.5 * RATE), dtype=np.float32), audio])
+        recognizer = ToneRecognizer(words)
+        streamer, _ = self.stream(audio, recognizer, update_seconds=2.0, segment_seconds=15.0)
+        self.assertEqual(streamer.finish()['text'].split(), words)
+        for calls in recognizer.calls:
+            self.assertTrue(all(seconds >= 7.5 for seconds in calls[:-1]), calls)
+
+    def test_finish_without_audio(self):
+        streamer = StreamingTranscriber(ToneRecognizer([]))
+        self.assertEqual(streamer.finish()['text'], '')
+        self.assertEqual(streamer.finish()['ayah_number'], None)
+
+if __name__ == '__main__':
+    unittest.main()
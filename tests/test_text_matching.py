@@ -1,6 +1,6 @@
 import unittest
-from utils.text_matcher import match_ayah_and_word, normalize_arabic_text
-from utils.tajweed_checker import analyze_ayah
+from utils.text_matcher import match_ayah_and_word, match_ayah_and_word_batch, normalize_arabic_text
+from utils.tajweed_checker import analyze_ayah, analyze_ayah_batch, analyze_ayah_parallel
 
 class TestTajweedMatching(unittest.TestCase):
     def test_ayah_1_matching(self):
@@ -74,6 +74,22 @@ class TestTajweedMatching(unittest.TestCase):
                                   for msg in feedback),
                               f"Expected wrong ayah feedback for '{case['text']}'")
     
+    def test_batch_entry_points(self):
+        """Batch matching and analysis agree with the one-at-a-time results"""
+        texts = ["الحمد لله", "رب العالمين", "hello", "الحمد لله", "اهدنا الصراط المستقيم"]
+        self.assertEqual(match_ayah_and_word_batch(texts), [match_ayah_and_word(text) for text in texts])
+        
+        feedback = analyze_ayah_batch([(1, "الحمد لله رب العالمين"), (1, "الحمد رب"), (1, "الحمد رب")])
+        self.assertEqual(feedback[0][0]['type'], 'success')
+        self.assertEqual(feedback[1][0]['type'], 'missing_words')
+        self.assertEqual(feedback[1], feedback[2])
+    
+    def test_parallel_analysis(self):
+        """The process pool gives the same feedback, in input order"""
+        items = [(1, "الحمد رب"), (1, "الحمد لله رب العالمين الرحمن"), (5, "اهدنا الصراط"),
+                 (2, "الرحمن"), (6, "صراط الذين انعمت"), (1, "الحمد رب")]
+        self.assertEqual(analyze_ayah_parallel(items, max_workers=2, chunksize=2), analyze_ayah_batch(items))
+    
     def test_normalize_arabic_text(self):
         """Test Arabic text normalization"""
         test_cases = [
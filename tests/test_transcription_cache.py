@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from utils.audio_io import AudioClip
+from utils.transcription_cache import TranscriptionCache, audio_key
+
+def tone(frequency, seconds=1.0, rate=16000):
+    t = np.arange(int(seconds * rate)) / rate
+    return AudioClip(0.3 * np.sin(2 * np.pi * frequency * t).astype(np.float32), rate)
+
+class TestTranscriptionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_key_depends_on_audio_and_model(self):
+        """Equal samples share a key; other audio, models or precisions do not"""
+        a, b = tone(440), tone(440)
+        self.assertEqual(audio_key(a, 'whisper:fp32'), audio_key(b, 'whisper:fp32'))
+        self.assertNotEqual(audio_key(a, 'whisper:fp32'), audio_key(tone(441), 'whisper:fp32'))
+        self.assertNotEqual(audio_key(a, 'whisper:fp32'), audio_key(a, 'whisper:int8'))
+        self.assertNotEqual(audio_key(a, 'whisper:fp32'), audio_key(AudioClip(a.samples, 8000), 'whisper:fp32'))
+
+    def test_memory_hit(self):
+        """A transcript is returned for the same audio decoded again"""
+        cache = TranscriptionCache('whisper:fp32', maxsize=4)
+        self.assertIsNone(cache.get(tone(440)))
+        cache.put(tone(440), 'بسم الله')
+        self.assertEqual(cache.get(tone(440)), 'بسم الله')
+        self.assertIsNone(cache.get(tone(880)))
+        self.assertNotIn('disk', cache.stats())
+        self.assertEqual(cache.stats()['memory']['hits'], 1)
+
+    def test_disk_tier_survives_restart(self):
+        """A new cache on the same directory finds the transcripts and promotes them to memory"""
+        TranscriptionCache('whisper:fp32', disk_dir=self.tmp.name).put(tone(440), 'الحمد لله')
+        cache = TranscriptionCache('whisper:fp32', disk_dir=self.tmp.name)
+        self.assertEqual(cache.get(tone(440)), 'الحمد لله')
+        self.assertEqual(cache.get(tone(440)), 'الحمد لله')
+        stats = cache.stats()
+        self.assertEqual((stats['disk']['hits'], stats['memory']['hits']), (1, 1))
+        # Another precision mode does not see it
+        self.assertIsNone(TranscriptionCache('whisper:int8', disk_dir=self.tmp.name).get(tone(440)))
+
+    def test_disk_eviction_by_size(self):
+        """The least recently used files go once the directory exceeds its budget"""
+        cache = TranscriptionCache('whisper:fp32', maxsize=0, disk_dir=self.tmp.name, disk_max_bytes=350)
+        clips = [tone(200 + 10 * i) for i in range(3)]
+        for i, clip in enumerate(clips):
+            cache.put(clip, 'x' * 100)
+            os.utime(cache._path(cache.key(clip)), (i, i))
+        # Reading the first clip makes it the most recently used
+        self.assertEqual(cache.get(clips[0]), 'x' * 100)
+        cache.put(tone(500), 'y' * 100)
+        self.assertEqual(cache.stats()['disk']['evictions'], 1)
+        self.assertEqual(cache.stats()['disk']['bytes'], 300)
+        self.assertEqual(cache.get(clips[0]), 'x' * 100)
+        self.assertIsNone(cache.get(clips[1]))
+        self.assertEqual(cache.get(clips[2]), 'x' * 100)
+        self.assertEqual(cache.get(tone(500)), 'y' * 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import torch
+from utils.weight_store import save_weights, load_model, read_header
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+WORKERS = 3
+
+class TinyModel(torch.nn.Module):
+    def __init__(self, width=64):
+        super().__init__()
+        self.embed = torch.nn.Embedding(100, width)
+        self.hidden = torch.nn.Linear(width, width).to(torch.bfloat16)
+        self.out = torch.nn.Linear(width, 100, bias=False)
+        self.out.weight = self.embed.weight
+        self.register_buffer('scale', torch.arange(width, dtype=torch.float16))
+
+# Worker: load the mapped model, read every weight, report, and stay alive until told to exit
+WORKER_SCRIPT = """
+import sys, torch
+sys.path.insert(0, {root!r})
+from utils.weight_store import load_model
+model = load_model(lambda: torch.nn.Linear({cols}, {rows}, bias=False), {path!r})
+print(float(model.weight.sum()), flush=True)
+sys.stdin.readline()
+"""
+
+def weights_mapping_kb(pid, path):
+    """Rss, Pss and private kB of a process's mappings of the weights file, from /proc/<pid>/smaps."""
+    totals = {'Rss': 0, 'Pss': 0, 'Private_Clean': 0, 'Private_Dirty': 0}
+    in_file = False
+    with open(f'/proc/{pid}/smaps') as f:
+        for line in f:
+            fields = line.split()
+            if '-' in fields[0] and len(fields) >= 5:
+                in_file = len(fields) >= 6 and fields[5] == str(path)
+            elif in_file and fields[0].rstrip(':') in totals:
+                totals[fields[0].rstrip(':')] += int(fields[1])
+    return totals
+
+class TestWeightStore(unittest.TestCase):
+    def test_round_trip(self):
+        """Mapped weights equal the originals, with tied weights re-tied and dtypes kept"""
+        torch.manual_seed(0)
+        model = TinyModel()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'tiny.safetensors'
+            save_weights(model, path, metadata={'model_id': 'tiny'})
+            header, metadata, _ = read_header(path)
+            self.assertEqual(metadata['model_id'], 'tiny')
+            self.assertEqual(json.loads(metadata['aliases']), {'out.weight': 'embed.weight'})
+            self.assertEqual(header['hidden.weight']['dtype'], 'BF16')
+
+            loaded = load_model(TinyModel, path)
+            for name, tensor in model.state_dict().items():
+                self.assertTrue(torch.equal(loaded.state_dict()[name], tensor), name)
+            self.assertEqual(loaded.out.weight.data_ptr(), loaded.embed.weight.data_ptr())
+            self.assertFalse(loaded.training)
+
+            with self.assertRaises(ValueError):
+                load_model(lambda: torch.nn.Linear(3, 3), path)
+
+    @unittest.skipUnless(os.path.exists('/proc/self/smaps'), "needs /proc/<pid>/smaps")
+    def test_workers_share_pages(self):
+        """N workers mapping the weights hold one physical copy between them"""
+        rows, cols = 2048, 2048
+        model_kb = rows * cols * 4 // 1024
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'linear.safetensors'
+            save_weights(torch.nn.Linear(cols, rows, bias=False), path)
+            script = WORKER_SCRIPT.format(root=str(PROJECT_ROOT), rows=rows, cols=cols, path=str(path))
+            workers = [
+                subprocess.Popen([sys.executable, '-c', script], stdin=subprocess.PIPE,
+                                 stdout=subprocess.PIPE, text=True)
+                for _ in range(WORKERS)
+            ]
+            try:
+                checksums = {worker.stdout.readline().strip() for worker in workers}
+                usage = [weights_mapping_kb(worker.pid, path) for worker in workers]
+            finally:
+                for worker in workers:
+                    worker.communicate('\n', timeout=60)
+
+        self.assertEqual(len(checksums), 1)
+        for kb in usage:
+            # Every worker sees the whole model, but owns none of it
+            self.assertGreater(kb['Rss'], 0.95 * model_kb)
+            self.assertLess(kb['Private_Clean'] + kb['Private_Dirty'], 0.05 * model_kb)
+        # Together the workers account for about one copy of the model
+        total_pss = sum(kb['Pss'] for kb in usage)
+        self.assertLess(total_pss, 1.1 * model_kb)
+        self.assertLess(sum(kb['Rss'] for kb in usage) / total_pss, WORKERS + 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# alignment.py
+"""
+Needleman-Wunsch alignment of transcript words against reference words.
+
+One O(n*m) pass labels every word as a match, substitution, omission
+(reference word with no transcript counterpart) or insertion (transcript
+word with no reference counterpart), so a skipped or extra word no longer
+shifts every later comparison. The substitution score comes from the
+similarity kernel through text_matcher.similarity_matrix; the DP matrices are NumPy
+arrays filled one row at a time, with the left-to-right insertion chain
+resolved by a running maximum instead of a Python inner loop.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .normalization import normalize_tajweed_text
+from .text_matcher import similarity_matrix as batch_similarity, MATCH_THRESHOLD
+
+# Score of aligning two words is 2 * similarity - 1 (1 for a match, -1 for unrelated words)
+GAP_PENALTY = -0.6
+
+# Similarity above which a word counts as present (if not necessarily well pronounced)
+PRESENCE_THRESHOLD = 0.7
+
+MATCH = 'match'
+SUBSTITUTION = 'substitution'
+OMISSION = 'omission'
+INSERTION = 'insertion'
+
+_DIAGONAL, _UP, _LEFT = 0, 1, 2
+
+AlignedPair = namedtuple('AlignedPair', ['op', 'ref_index', 'trans_index', 'similarity'])
+
+class Alignment:
+    """
+    Result of aligning a transcript to a reference.
+
+    Attributes:
+        ref_words (list): Normalized reference words
+        trans_words (list): Normalized transcript words
+        trans_tokens (list): Transcript words as recited, for feedback messages
+        pairs (list): AlignedPair entries in reading order; ref_index is None
+            for insertions and trans_index is None for omissions
+    """
+
+    def __init__(self, ref_words, trans_words, pairs, trans_tokens=None):
+        self.ref_words = ref_words
+        self.trans_words = trans_words
+        self.trans_tokens = trans_tokens if trans_tokens is not None else trans_words
+        self.pairs = pairs
+
+    def of_type(self, op):
+        return [pair for pair in self.pairs if pair.op == op]
+
+    @property
+    def substitutions(self):
+        return self.of_type(SUBSTITUTION)
+
+    @property
+    def omissions(self):
+        return self.of_type(OMISSION)
+
+    @property
+    def insertions(self):
+        return self.of_type(INSERTION)
+
+    def missing_ref_indices(self, threshold=PRESENCE_THRESHOLD):
+        """Reference positions that were skipped or aligned to a dissimilar word."""
+        return [
+            pair.ref_index for pair in self.pairs
+            if pair.ref_index is not None and (pair.trans_index is None or pair.similarity <= threshold)
+        ]
+
+    def is_perfect(self):
+        return all(pair.op == MATCH for pair in self.pairs)
+
+    def __repr__(self):
+        return f"Alignment({self.pairs!r})"
+
+def similarity_matrix(ref_words, trans_words, accepted=None):
+    """
+    Word similarity matrix used as the substitution score.
+
+    Args:
+        ref_words (list): Normalized reference words
+        trans_words (list): Normalized transcript words
+        accepted (list): Optional per reference word set of spellings that count as exact
+
+    Returns:
+        np.ndarray: float32 matrix of shape (len(ref_words), len(trans_words))
+    """
+    sim = batch_similarity(ref_words, trans_words)
+    if accepted is not None:
+        for i, exact in enumerate(accepted):
+            for j, trans in enumerate(trans_words):
+                if trans in exact:
+                    sim[i, j] = 1.0
+    return sim
+
+def align_words(ref_words, trans_words, accepted=None, sim=None):
+    """
+    Globally align normalized transcript words to normalized reference words.
+
+    Args:
+        ref_words (list): Normalized reference words
+        trans_words (list): Normalized transcript words
+        accepted (list): Optional per reference word set of spellings that count as exact
+        sim (np.ndarray): Precomputed similarity matrix, computed here if omitted
+
+    Returns:
+        Alignment
+    """
+    n, m = len(ref_words), len(trans_words)
+    if sim is None:
+        sim = similarity_matrix(ref_words, trans_words, accepted)
+    pair_score = 2.0 * sim - 1.0
+
+    score = np.empty((n + 1, m + 1), dtype=np.float32)
+    trace = np.empty((n + 1, m + 1), dtype=np.int8)
+    gaps = GAP_PENALTY * np.arange(m + 1, dtype=np.float32)
+    score[0] = gaps
+    trace[0] = _LEFT
+    for i in range(1, n + 1):
+        diagonal = score[i - 1, :-1] + pair_score[i - 1]
+        up = score[i - 1] + GAP_PENALTY
+        best = up.copy()
+        best[1:] = np.maximum(up[1:], diagonal)
+        step = np.where(up[1:] > diagonal, _UP, _DIAGONAL)
+        # Insertions chain left to right: row[j] = max_k(best[k] + (j - k) * gap),
+        # compared in the shifted space so rounding cannot flip the traceback
+        shifted = best - gaps
+        chained = np.maximum.accumulate(shifted)
+        score[i] = chained + gaps
+        trace[i, 0] = _UP
+        trace[i, 1:] = np.where(chained[1:] > shifted[1:], _LEFT, step)
+
+    pairs = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        move = trace[i, j] if i > 0 and j > 0 else (_UP if i > 0 else _LEFT)
+        if move == _DIAGONAL:
+            similarity = float(sim[i - 1, j - 1])
+            op = MATCH if similarity > MATCH_THRESHOLD else SUBSTITUTION
+            pairs.append(AlignedPair(op, i - 1, j - 1, similarity))
+            i, j = i - 1, j - 1
+        elif move == _UP:
+            pairs.append(AlignedPair(OMISSION, i - 1, None, 0.0))
+            i -= 1
+        else:
+            pairs.append(AlignedPair(INSERTION, None, j - 1, 0.0))
+            j -= 1
+    pairs.reverse()
+    return Alignment(list(ref_words), list(trans_words), pairs)
+
+def align_transcript(reference, transcript):
+    """Align a raw transcript to a ReferenceAyah."""
+    tokens = [(word, normalize_tajweed_text(word)) for word in transcript.split()]
+    tokens = [(word, norm) for word, norm in tokens if norm]
+    alignment = align_words(reference.normalized_words, [norm for _, norm in tokens], reference.variants)
+    alignment.trans_tokens = [word for word, _ in tokens]
+    return alignment
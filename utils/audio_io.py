@@ -0,0 +1,215 @@
+# audio_io.py
+"""
+In-memory audio ingest.
+
+Uploads are decoded straight from their bytes into a float32 mono NumPy
+buffer at the model's 16 kHz rate, without writing them to disk:
+
+- PCM16 WAV (what the browser client uploads) is parsed with `wave` and
+  converted with one vectorized operation
+- other formats libsndfile knows (WAV variants, FLAC, OGG, MP3) are
+  decoded by soundfile from a BytesIO
+- anything else (e.g. WebM/Opus) is piped through ffmpeg over
+  stdin/stdout when ffmpeg is installed
+
+Audio that is already 16 kHz mono is returned without resampling. The
+result matches librosa.load(path, sr=16000) on the same file.
+
+AudioClip wraps the decoded samples of one request, so every stage
+(transcription, Madd timing, acoustic checks) shares one decode and one
+computation of each derived feature.
+"""
+import io
+import re
+import shutil
+import subprocess
+import uuid
+import wave
+from datetime import datetime
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+
+from .mel_frontend import log_mel_spectrogram
+
+TARGET_SAMPLE_RATE = 16000
+
+# Whisper's analysis frames: 25 ms windows every 10 ms
+FRAME_LENGTH = 400
+HOP_LENGTH = 160
+
+# librosa.load's default resampler, so results match the old file-based path
+RESAMPLE_TYPE = 'soxr_hq'
+
+class AudioDecodeError(ValueError):
+    """The upload could not be decoded as audio."""
+
+def _as_bytes(data):
+    if hasattr(data, 'read'):
+        data = data.read()
+    if not data:
+        raise AudioDecodeError("Empty audio upload")
+    return bytes(data) if not isinstance(data, bytes) else data
+
+def _decode_pcm16_wav(data):
+    """Decode a PCM16 WAV with the standard library; None if it is anything else."""
+    if data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        return None
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                return None
+            channels, rate = wav.getnchannels(), wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    samples = np.frombuffer(frames, dtype='<i2')
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return (samples * (1.0 / 32768.0)).astype(np.float32), rate
+
+def _decode_soundfile(data):
+    import soundfile as sf
+    try:
+        samples, rate = sf.read(io.BytesIO(data), dtype='float32', always_2d=True)
+    except (sf.LibsndfileError, RuntimeError, TypeError):
+        return None
+    return samples.mean(axis=1, dtype=np.float32) if samples.shape[1] > 1 else samples[:, 0], rate
+
+def _decode_ffmpeg(data, target_sr):
+    """Decode and resample any container ffmpeg understands, through pipes only."""
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        return None
+    result = subprocess.run(
+        [ffmpeg, '-nostdin', '-loglevel', 'error', '-i', 'pipe:0',
+         '-f', 'f32le', '-ac', '1', '-ar', str(target_sr), 'pipe:1'],
+        input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    if result.returncode != 0:
+        return None
+    return np.frombuffer(result.stdout, dtype='<f4').copy(), target_sr
+
+def resample(samples, orig_sr, target_sr=TARGET_SAMPLE_RATE):
+    """Resample a mono float32 signal; returns it unchanged when the rates match."""
+    if orig_sr == target_sr:
+        return samples
+    import librosa
+    return librosa.resample(samples, orig_sr=orig_sr, target_sr=target_sr, res_type=RESAMPLE_TYPE)
+
+def decode_audio(data, target_sr=TARGET_SAMPLE_RATE):
+    """
+    Decode an uploaded audio file held in memory.
+
+    Args:
+        data (bytes or file-like): Encoded audio, e.g. request.files['audio']
+        target_sr (int): Sample rate of the result
+
+    Returns:
+        np.ndarray: Mono float32 samples at target_sr
+
+    Raises:
+        AudioDecodeError: If the data is empty or in no format we can decode
+    """
+    data = _as_bytes(data)
+    decoded = _decode_pcm16_wav(data) or _decode_soundfile(data) or _decode_ffmpeg(data, target_sr)
+    if decoded is None:
+        raise AudioDecodeError("Unsupported or corrupt audio upload")
+    samples, rate = decoded
+    return np.ascontiguousarray(resample(samples, rate, target_sr), dtype=np.float32)
+
+def persist_upload(data, folder, filename=None):
+    """
+    Keep a copy of an upload on disk, under a name no other upload can collide with.
+
+    Args:
+        data (bytes): The upload as received
+        folder (str or Path): Directory to write to
+        filename (str): Client-side name; only its extension is kept
+
+    Returns:
+        Path: The file written
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    suffix = Path(filename or '').suffix.lower()
+    if not re.fullmatch(r'\.[a-z0-9]{1,5}', suffix):
+        suffix = '.bin'
+    path = folder / f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}{suffix}"
+    path.write_bytes(data)
+    return path
+
+class AudioClip:
+    """
+    Decoded audio of one request, with derived features computed on first use.
+
+    The samples are read-only, so a clip can be handed to any number of
+    stages (and threads) without copying.
+
+    Args:
+        samples (np.ndarray): Mono samples
+        sample_rate (int): Their sample rate
+    """
+
+    def __init__(self, samples, sample_rate=TARGET_SAMPLE_RATE):
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        if samples.ndim != 1:
+            raise ValueError("AudioClip samples must be mono")
+        samples.flags.writeable = False
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_bytes(cls, data, sample_rate=TARGET_SAMPLE_RATE):
+        """Decode an upload (see decode_audio) into a clip."""
+        return cls(decode_audio(data, sample_rate), sample_rate)
+
+    def segment(self, start, end):
+        """A clip of samples[start:end], sharing this clip's samples."""
+        return AudioClip(self.samples[start:end], self.sample_rate)
+
+    @property
+    def duration(self):
+        """Length in seconds."""
+        return len(self.samples) / self.sample_rate
+
+    @cached_property
+    def log_mel(self):
+        """Whisper's 80-bin log-mel input features, padded to 30 s: (80, 3000) float32."""
+        return log_mel_features([self])[0]
+
+    @cached_property
+    def frame_energy(self):
+        """RMS energy of each analysis frame, aligned with the log-mel frames."""
+        # Centered frames, like the mel front end; reflect padding needs more samples than the pad
+        mode = 'reflect' if len(self.samples) > FRAME_LENGTH // 2 else 'constant'
+        padded = np.pad(self.samples, FRAME_LENGTH // 2, mode=mode)
+        frames = np.lib.stride_tricks.sliding_window_view(padded, FRAME_LENGTH)[::HOP_LENGTH]
+        energy = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        energy.flags.writeable = False
+        return energy
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __repr__(self):
+        return f"AudioClip({self.duration:.2f}s @ {self.sample_rate} Hz)"
+
+def log_mel_features(clips):
+    """
+    Log-mel features of several clips, stacked: (len(clips), 80, 3000) float32.
+
+    Clips that have not computed their features yet go through the front
+    end together in one batched call, and keep the result.
+    """
+    pending = [clip for clip in clips if 'log_mel' not in clip.__dict__]
+    for clip in pending:
+        if clip.sample_rate != TARGET_SAMPLE_RATE:
+            raise ValueError(f"Whisper features need {TARGET_SAMPLE_RATE} Hz audio, not {clip.sample_rate}")
+    if pending:
+        features = log_mel_spectrogram([clip.samples for clip in pending])
+        features.flags.writeable = False
+        for clip, clip_features in zip(pending, features):
+            clip.__dict__['log_mel'] = clip_features
+    return np.stack([clip.log_mel for clip in clips])
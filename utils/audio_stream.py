@@ -0,0 +1,150 @@
+# audio_stream.py
+"""
+Binary audio frames for the /ws stream, and the ring buffer they go into.
+
+Frame format (all little-endian):
+
+    offset  size  field
+    0       1     version, currently 1
+    1       1     flags; bit 0 set on the last frame of a recording
+    2       2     reserved, 0
+    4       4     sequence number (uint32), 0 for the first frame, +1 per frame
+    8       2*n   n samples of PCM16 mono audio at 16 kHz
+
+A frame is one WebSocket binary message. Frames that arrive out of order
+or twice are dropped; a gap in the sequence numbers is counted as lost
+audio and the stream carries on.
+
+Each connection writes its samples into an AudioRingBuffer: a float32
+array allocated once at a fixed capacity, so a session never holds more
+than WS_BUFFER_SECONDS of audio however long it runs.
+"""
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from .audio_io import TARGET_SAMPLE_RATE
+
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct('<BBHI')
+FLAG_END = 0x01
+# Largest payload accepted in one frame (10 s of audio)
+MAX_FRAME_SAMPLES = 10 * TARGET_SAMPLE_RATE
+
+STREAM_BUFFER_SECONDS = float(os.environ.get('WS_BUFFER_SECONDS', 32.0))
+
+Frame = namedtuple('Frame', ['sequence', 'samples', 'end'])
+
+class FrameError(ValueError):
+    """A binary message is not a valid audio frame."""
+
+def encode_frame(sequence, samples, end=False):
+    """
+    Build a frame from float samples in [-1, 1] (or int16 samples).
+
+    Returns:
+        bytes: Header and PCM16 payload
+    """
+    samples = np.asarray(samples)
+    if samples.dtype != np.int16:
+        samples = np.round(np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    header = FRAME_HEADER.pack(FRAME_VERSION, FLAG_END if end else 0, 0, sequence & 0xFFFFFFFF)
+    return header + samples.astype('<i2').tobytes()
+
+def parse_frame(message):
+    """
+    Parse one binary WebSocket message.
+
+    Returns:
+        Frame: Sequence number, float32 samples and the end flag
+
+    Raises:
+        FrameError: If the header or payload is malformed
+    """
+    if len(message) < FRAME_HEADER.size:
+        raise FrameError(f"Frame of {len(message)} bytes is shorter than its header")
+    version, flags, _, sequence = FRAME_HEADER.unpack_from(message)
+    if version != FRAME_VERSION:
+        raise FrameError(f"Unsupported frame version {version}")
+    payload = len(message) - FRAME_HEADER.size
+    if payload % 2:
+        raise FrameError("PCM16 payload has an odd number of bytes")
+    if payload // 2 > MAX_FRAME_SAMPLES:
+        raise FrameError(f"Frame of {payload // 2} samples exceeds {MAX_FRAME_SAMPLES}")
+    pcm = np.frombuffer(message, dtype='<i2', offset=FRAME_HEADER.size)
+    return Frame(sequence, pcm * np.float32(1.0 / 32768.0), bool(flags & FLAG_END))
+
+class FrameSequencer:
+    """Accept frames in sequence order, dropping stale ones and counting gaps."""
+
+    def __init__(self):
+        self.expected = 0
+        self.dropped = 0
+        self.missing = 0
+
+    def accept(self, frame):
+        """Whether the frame should be used; updates the loss counters."""
+        if frame.sequence < self.expected:
+            self.dropped += 1
+            return False
+        self.missing += frame.sequence - self.expected
+        self.expected = frame.sequence + 1
+        return True
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity float32 sample buffer.
+
+    Samples are addressed by their absolute position in the stream
+    (0 = first sample ever written). Writing past the capacity overwrites
+    the oldest samples.
+
+    Args:
+        capacity (int): Samples kept
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("Ring buffer capacity must be at least 1 sample")
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.written = 0
+
+    @property
+    def oldest(self):
+        """Position of the oldest sample still held."""
+        return max(0, self.written - self.capacity)
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def write(self, samples):
+        """Append samples, overwriting the oldest ones when full."""
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(samples) > self.capacity:
+            self.written += len(samples) - self.capacity
+            samples = samples[-self.capacity:]
+        start = self.written % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        self._data[:len(samples) - first] = samples[first:]
+        self.written += len(samples)
+
+    def read(self, start, end=None):
+        """
+        Copy out the samples at positions [start, end).
+
+        Raises:
+            ValueError: If part of the range has already been overwritten
+        """
+        end = self.written if end is None else end
+        if start < self.oldest or end > self.written or start > end:
+            raise ValueError(f"Samples [{start}, {end}) are not in the buffer "
+                             f"(holding [{self.oldest}, {self.written}))")
+        begin, length = start % self.capacity, end - start
+        if begin + length <= self.capacity:
+            return self._data[begin:begin + length].copy()
+        return np.concatenate([self._data[begin:], self._data[:begin + length - self.capacity]])
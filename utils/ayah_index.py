@@ -0,0 +1,322 @@
+# ayah_index.py
+"""
+Character n-gram inverted index for identifying which ayah a transcript
+belongs to, scaling from Al-Fatiha to the whole Quran.
+
+Each ayah is indexed by the character trigrams of its normalized words
+(padded with a boundary marker so word starts and ends count). N-grams are
+hashed into a fixed number of buckets, so the index needs no vocabulary
+and every table is a flat NumPy array:
+
+    offsets   int64[n_buckets + 1]  CSR row pointers into the postings
+    postings  int32[n_postings]     ayah row of each posting
+    weights   float32[n_postings]   precomputed BM25 weight of the posting
+    idf       float32[n_buckets]    BM25 idf of each bucket
+    surah     int16[n_ayat]         surah number of each row
+    ayah      int16[n_ayat]         ayah number of each row
+    text_offsets int64[n_ayat + 1]  byte ranges into text.bin
+    text.bin                        normalized ayah texts, UTF-8
+
+On disk an index is a directory with one .npy file per table, the UTF-8
+text blob and a small meta.json. AyahIndex.load maps the tables read-only
+with mmap, so opening an index over all 6,236 ayat costs a few syscalls
+and every worker shares the same page cache.
+
+Build an index from a Tanzil-style text file ("surah|ayah|text" per line):
+
+    python -m utils.ayah_index build quran-simple-clean.txt index_dir
+"""
+from collections import namedtuple
+from pathlib import Path
+import argparse
+import json
+import zlib
+
+import numpy as np
+
+from .normalization import normalize_tajweed_text
+from .similarity import phonetic_ratio
+
+INDEX_FORMAT_VERSION = 1
+NGRAM_SIZE = 3
+DEFAULT_BUCKETS = 1 << 17
+BM25_K1 = 1.2
+BM25_B = 0.75
+WORD_BOUNDARY = '#'
+
+# Word similarities below this don't help locate the start word
+START_WORD_CUTOFF = 0.5
+
+AyahCandidate = namedtuple('AyahCandidate', ['surah', 'ayah', 'start_word', 'score', 'coverage'])
+
+_TABLES = ('offsets', 'postings', 'weights', 'idf', 'surah', 'ayah', 'text_offsets')
+
+def text_ngrams(normalized_text, n=NGRAM_SIZE):
+    """Character n-grams of each word, padded with a boundary marker."""
+    grams = []
+    for word in normalized_text.split():
+        padded = f"{WORD_BOUNDARY}{word}{WORD_BOUNDARY}"
+        if len(padded) <= n:
+            grams.append(padded)
+        else:
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+def _bucket(gram, n_buckets):
+    return zlib.crc32(gram.encode('utf-8')) % n_buckets
+
+class AyahIndex:
+    """BM25-scored n-gram index over (surah, ayah) rows."""
+
+    def __init__(self, tables, texts, meta):
+        self.offsets = tables['offsets']
+        self.postings = tables['postings']
+        self.weights = tables['weights']
+        self.idf = tables['idf']
+        self.surah = tables['surah']
+        self.ayah = tables['ayah']
+        self.text_offsets = tables['text_offsets']
+        self._texts = texts
+        self.meta = meta
+        self.n_buckets = meta['n_buckets']
+        self._rows = {
+            (int(s), int(a)): row for row, (s, a) in enumerate(zip(self.surah, self.ayah))
+        }
+        # Rows are sorted by surah, so each surah is a contiguous slice
+        surahs = np.asarray(self.surah)
+        self._surah_bounds = {
+            int(s): (int(np.searchsorted(surahs, s, 'left')), int(np.searchsorted(surahs, s, 'right')))
+            for s in np.unique(surahs)
+        }
+
+    def __len__(self):
+        return len(self.surah)
+
+    @classmethod
+    def build(cls, entries, n_buckets=DEFAULT_BUCKETS):
+        """
+        Build an index in memory.
+
+        Args:
+            entries (iterable): (surah, ayah, text) tuples; text is normalized here
+            n_buckets (int): Number of hash buckets for the n-grams
+
+        Returns:
+            AyahIndex
+        """
+        rows = sorted((int(s), int(a), normalize_tajweed_text(text)) for s, a, text in entries)
+        n_rows = len(rows)
+        term_freqs = []
+        lengths = np.zeros(n_rows, dtype=np.float32)
+        doc_freq = np.zeros(n_buckets, dtype=np.int64)
+        for row, (_, _, text) in enumerate(rows):
+            counts = {}
+            for gram in text_ngrams(text):
+                bucket = _bucket(gram, n_buckets)
+                counts[bucket] = counts.get(bucket, 0) + 1
+            term_freqs.append(counts)
+            lengths[row] = sum(counts.values())
+            for bucket in counts:
+                doc_freq[bucket] += 1
+
+        avg_length = float(lengths.mean()) if n_rows else 0.0
+        # Buckets no ayah uses keep the highest idf so unknown words lower a transcript's coverage
+        idf = np.log1p((n_rows - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+
+        offsets = np.zeros(n_buckets + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(doc_freq)
+        postings = np.empty(offsets[-1], dtype=np.int32)
+        weights = np.empty(offsets[-1], dtype=np.float32)
+        cursor = offsets[:-1].copy()
+        for row, counts in enumerate(term_freqs):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[row] / avg_length)
+            for bucket, tf in counts.items():
+                slot = cursor[bucket]
+                postings[slot] = row
+                weights[slot] = idf[bucket] * tf * (BM25_K1 + 1) / (tf + norm)
+                cursor[bucket] += 1
+
+        encoded = [text.encode('utf-8') for _, _, text in rows]
+        text_offsets = np.zeros(n_rows + 1, dtype=np.int64)
+        text_offsets[1:] = np.cumsum([len(t) for t in encoded])
+        tables = {
+            'offsets': offsets,
+            'postings': postings,
+            'weights': weights,
+            'idf': idf,
+            'surah': np.array([s for s, _, _ in rows], dtype=np.int16),
+            'ayah': np.array([a for _, a, _ in rows], dtype=np.int16),
+            'text_offsets': text_offsets,
+        }
+        meta = {
+            'version': INDEX_FORMAT_VERSION,
+            'n_buckets': n_buckets,
+            'ngram': NGRAM_SIZE,
+            'k1': BM25_K1,
+            'b': BM25_B,
+            'avg_length': avg_length,
+            'n_ayat': n_rows,
+        }
+        return cls(tables, b''.join(encoded), meta)
+
+    @classmethod
+    def from_corpus(cls, corpus, surah=1, n_buckets=DEFAULT_BUCKETS):
+        """Index a ReferenceCorpus whose ids are 0-based ayah indices of one surah."""
+        entries = [(surah, ayah.id + 1, ' '.join(ayah.simple_words)) for ayah in corpus]
+        return cls.build(entries, n_buckets)
+
+    def save(self, path):
+        """Write the index to a directory in the mmap-able on-disk format."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in _TABLES:
+            np.save(path / f'{name}.npy', np.ascontiguousarray(getattr(self, name)))
+        with open(path / 'text.bin', 'wb') as f:
+            f.write(bytes(self._texts))
+        with open(path / 'meta.json', 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """Open an index directory, mapping every table read-only."""
+        path = Path(path)
+        with open(path / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != INDEX_FORMAT_VERSION or meta.get('ngram') != NGRAM_SIZE:
+            raise ValueError(f"Unsupported ayah index format in {path}: {meta}")
+        # Plain ndarray views over the maps: slicing np.memmap subclasses is much slower
+        tables = {name: np.asarray(np.load(path / f'{name}.npy', mmap_mode='r')) for name in _TABLES}
+        text_path = path / 'text.bin'
+        texts = np.asarray(np.memmap(text_path, dtype=np.uint8, mode='r')) if text_path.stat().st_size else b''
+        return cls(tables, texts, meta)
+
+    def text(self, row):
+        """Normalized text of an index row."""
+        start, end = self.text_offsets[row], self.text_offsets[row + 1]
+        return bytes(self._texts[start:end]).decode('utf-8')
+
+    def row(self, surah, ayah):
+        """Index row of (surah, ayah), or None."""
+        return self._rows.get((surah, ayah))
+
+    def search(self, transcript, top_k=5, surah=None, normalized=False):
+        """
+        Rank ayat for a transcript.
+
+        Args:
+            transcript (str): Transcribed text
+            top_k (int): Number of candidates to return
+            surah (int): Restrict the search to one surah
+            normalized (bool): Whether the transcript is already normalized
+
+        Returns:
+            list: AyahCandidate tuples, best first. coverage is the share of
+            the transcript's idf mass found in the ayah (0-1).
+        """
+        text = transcript if normalized else normalize_tajweed_text(transcript)
+        grams = text_ngrams(text)
+        if not grams or len(self) == 0:
+            return []
+
+        query = {}
+        for gram in grams:
+            bucket = _bucket(gram, self.n_buckets)
+            query[bucket] = query.get(bucket, 0) + 1
+
+        rows_parts, weight_parts, idf_parts = [], [], []
+        query_idf = 0.0
+        for bucket, qtf in query.items():
+            idf = float(self.idf[bucket])
+            query_idf += idf * qtf
+            start, end = self.offsets[bucket], self.offsets[bucket + 1]
+            if start == end:
+                continue
+            rows_parts.append(self.postings[start:end])
+            weight_parts.append(self.weights[start:end] * qtf)
+            idf_parts.append(np.full(end - start, idf * qtf, dtype=np.float32))
+        if not rows_parts:
+            return []
+
+        rows = np.concatenate(rows_parts)
+        scores = np.bincount(rows, weights=np.concatenate(weight_parts), minlength=len(self))
+        matched_idf = np.bincount(rows, weights=np.concatenate(idf_parts), minlength=len(self))
+
+        if surah is not None:
+            lo, hi = self._surah_bounds.get(surah, (0, 0))
+            masked = np.full_like(scores, -1.0)
+            masked[lo:hi] = scores[lo:hi]
+            scores = masked
+
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+
+        query_words = text.split()
+        candidates = []
+        for row in best:
+            if scores[row] <= 0:
+                break
+            coverage = float(matched_idf[row] / query_idf) if query_idf > 0 else 0.0
+            candidates.append(AyahCandidate(
+                int(self.surah[row]),
+                int(self.ayah[row]),
+                self._start_word(query_words, self.text(row).split()),
+                float(scores[row]),
+                min(coverage, 1.0),
+            ))
+        return candidates
+
+    @staticmethod
+    def _start_word(query_words, ayah_words):
+        """Position in the ayah where the transcript most likely starts.
+
+        The first transcript word is compared against each ayah word and,
+        when it is longer, against the pair starting there (ASR often merges
+        words, e.g. 'الحمدلله'); the second transcript word must follow.
+        """
+        first = query_words[0]
+        following = query_words[1] if len(query_words) > 1 else None
+
+        # Exact hits need no fuzzy scoring
+        for pos, word in enumerate(ayah_words):
+            if word == first and (following is None or ayah_words[pos + 1:pos + 2] == [following]):
+                return pos
+
+        best_pos, best_score = 0, -1.0
+        for pos in range(len(ayah_words)):
+            spans = (1, 2) if len(first) > len(ayah_words[pos]) else (1,)
+            for span in spans:
+                if pos + span > len(ayah_words):
+                    break
+                score = phonetic_ratio(first, ''.join(ayah_words[pos:pos + span]), START_WORD_CUTOFF)
+                if following is not None and pos + span < len(ayah_words):
+                    score += phonetic_ratio(following, ayah_words[pos + span], START_WORD_CUTOFF)
+                if score > best_score:
+                    best_pos, best_score = pos, score
+        return best_pos
+
+def read_tanzil(path):
+    """Yield (surah, ayah, text) from a Tanzil text export ("surah|ayah|text" lines)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            surah, ayah, text = line.split('|', 2)
+            yield int(surah), int(ayah), text
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an on-disk ayah index")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='Build an index from a Tanzil text export')
+    build.add_argument('source', help='Text file with one "surah|ayah|text" line per ayah')
+    build.add_argument('output', help='Index directory to write')
+    build.add_argument('--buckets', type=int, default=DEFAULT_BUCKETS, help='Number of n-gram hash buckets')
+    args = parser.parse_args()
+
+    index = AyahIndex.build(read_tanzil(args.source), n_buckets=args.buckets)
+    index.save(args.output)
+    print(f"Indexed {len(index)} ayat into {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# cache.py
+"""
+Bounded, thread-safe result cache with LRU and TTL eviction.
+
+The cache lives in the process's memory only. What cached analysis
+results depend on (the rules and the reference corpus) is fixed at
+import, so a deploy that changes either starts with an empty cache and
+no per-lookup version check is needed.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class ResultCache:
+    """
+    LRU cache with a time-to-live and hit/miss/eviction counters.
+
+    Args:
+        maxsize (int): Maximum number of entries, 0 disables caching
+        ttl (float): Seconds an entry stays valid, None for no expiry
+        clock (callable): Monotonic time source, for tests
+    """
+
+    def __init__(self, maxsize=4096, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Cached value for key, or default on a miss."""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires = entry
+                if expires is None or expires > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries if full."""
+        if self.maxsize <= 0:
+            return
+        expires = self._clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Cached value for key, computing and storing it on a miss.
+
+        compute runs outside the lock, so two threads missing on the same
+        key may both compute it; the results are equal and the later one wins.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters and sizes, e.g. for a health endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,183 @@
+# constrained_decoding.py
+"""
+Decoding constrained to the reference ayat.
+
+Free decoding picks every token from Whisper's ~51k-token vocabulary, and
+a confused decoder can repeat itself until max_length. In constrained
+mode a logits processor steers generation along the token sequences of
+the surah:
+
+- each word's accepted spellings (Uthmani, simple and the spellings the
+  corpus accepts) are tokenized into a prefix trie, and the word tries are
+  linked in surah order, so a transcript may start at any ayah and run on
+  into the next ones
+- tokens that do not continue a reference sequence are penalized by
+  ASR_CONSTRAINT_PENALTY rather than forbidden, so a clear mistake in the
+  recitation still comes through (the near-miss band); a word-initial
+  token after a mistake resyncs to every word it can start
+- once ASR_CONSTRAINT_MISSES tokens have left the reference, or the end of the surah
+  is reached, the only token allowed is end-of-text
+"""
+import math
+from collections import namedtuple
+
+import torch
+from transformers import LogitsProcessor
+
+from .reference_corpus import FATIHA
+from .runtime_config import DECODING_MODES, resolve_decoding  # noqa: F401 (re-exported)
+from .runtime_config import DEFAULT_CONSTRAINT_PENALTY, DEFAULT_CONSTRAINT_MISSES
+
+# nodes: frozenset of trie nodes (empty when off the reference); misses: tokens spent off it
+DecodeState = namedtuple('DecodeState', ['nodes', 'misses'])
+# tokens: LongTensor of allowed tokens (with end-of-text when it may end there); final: only end-of-text left
+Expansion = namedtuple('Expansion', ['transitions', 'tokens', 'final'])
+
+def word_spellings(ayah, index):
+    """Spellings of a reference word the decoder may produce."""
+    spellings = [ayah.words[index], ayah.simple_words[index]] if len(ayah.simple_words) == len(ayah.words) \
+        else [ayah.words[index]]
+    spellings.extend(sorted(ayah.variants[index]))
+    return list(dict.fromkeys(spellings))
+
+class SurahTokenTrie:
+    """
+    Token sequences of a surah as linked per-word prefix tries.
+
+    Args:
+        tokenize (callable): Text to a list of token ids, without special tokens
+        eos_token_id (int): End-of-text token
+        ayat (list of ReferenceAyah): The surah, in order
+    """
+
+    def __init__(self, tokenize, eos_token_id, ayat=FATIHA):
+        self.eos_token_id = eos_token_id
+        self.children = []
+        self.word_of = []
+        self.word_end = []
+        # Node entered by a word's first token, with and without its leading space
+        # (a transcript may begin without the space, and only at the start of an ayah)
+        spaced_roots, bare_roots, ayah_ends = [], [], set()
+        for ayah in ayat:
+            for index in range(len(ayah.words)):
+                word = len(spaced_roots)
+                spaced_roots.append(self._node(word))
+                if index == 0:
+                    bare_roots.append(self._node(word))
+                for spelling in word_spellings(ayah, index):
+                    self._insert(spaced_roots[word], tokenize(' ' + spelling))
+                    if index == 0:
+                        self._insert(bare_roots[-1], tokenize(spelling))
+            ayah_ends.add(len(spaced_roots) - 1)
+
+        self.max_tokens = sum(self._depth(root) for root in spaced_roots) + 1
+        # Per node: the tokens that continue the sequence and whether text may end after it
+        self.transitions = []
+        self.can_end = []
+        for node, children in enumerate(self.children):
+            transitions = {token: {child} for token, child in children.items()}
+            word = self.word_of[node]
+            if self.word_end[node] and word + 1 < len(spaced_roots):
+                for token, child in self.children[spaced_roots[word + 1]].items():
+                    transitions.setdefault(token, set()).add(child)
+            self.transitions.append({token: frozenset(nodes) for token, nodes in transitions.items()})
+            self.can_end.append(self.word_end[node] and word in ayah_ends)
+
+        ayah_starts = [self.word_of[root] for root in bare_roots]
+        self.start = DecodeState(frozenset(bare_roots) | frozenset(spaced_roots[i] for i in ayah_starts), 0)
+        # A word-initial token seen off the reference resyncs to every word it starts
+        resync = {}
+        for root in spaced_roots:
+            for token, child in self.children[root].items():
+                resync.setdefault(token, set()).add(child)
+        self.resync = {token: frozenset(nodes) for token, nodes in resync.items()}
+        self._expansions = {}
+
+    def _node(self, word):
+        self.children.append({})
+        self.word_of.append(word)
+        self.word_end.append(False)
+        return len(self.children) - 1
+
+    def _insert(self, node, tokens):
+        for token in tokens:
+            child = self.children[node].get(token)
+            if child is None:
+                child = self.children[node][token] = self._node(self.word_of[node])
+            node = child
+        self.word_end[node] = True
+
+    def _depth(self, node):
+        return max((1 + self._depth(child) for child in self.children[node].values()), default=0)
+
+    def __len__(self):
+        return len(self.children)
+
+    def expand(self, nodes):
+        """Allowed continuations of a set of nodes (memoized)."""
+        expansion = self._expansions.get(nodes)
+        if expansion is None:
+            transitions = {}
+            for node in nodes:
+                for token, children in self.transitions[node].items():
+                    transitions[token] = transitions.get(token, frozenset()) | children
+            can_end = any(self.can_end[node] for node in nodes)
+            tokens = list(transitions) + ([self.eos_token_id] if can_end else [])
+            expansion = Expansion(transitions, torch.tensor(tokens, dtype=torch.long),
+                                  can_end and not transitions)
+            self._expansions[nodes] = expansion
+        return expansion
+
+    def advance(self, state, token):
+        """State after one more token."""
+        if state.nodes:
+            nodes = self.expand(state.nodes).transitions.get(token)
+            if nodes is not None:
+                return DecodeState(nodes, state.misses)
+        return DecodeState(self.resync.get(token, frozenset()), state.misses + 1)
+
+class SurahConstraintLogitsProcessor(LogitsProcessor):
+    """
+    Steer generation along a SurahTokenTrie.
+
+    Create one per generate call: it remembers the state reached by every
+    prefix it has seen, so each step only advances by the newest token.
+
+    Args:
+        trie (SurahTokenTrie): The reference token sequences
+        prompt_length (int): Decoder tokens before the text (start and forced tokens)
+        penalty (float): Subtracted from tokens that leave the reference
+        max_misses (int): Off-reference tokens before end-of-text is forced
+    """
+
+    def __init__(self, trie, prompt_length, penalty=DEFAULT_CONSTRAINT_PENALTY,
+                 max_misses=DEFAULT_CONSTRAINT_MISSES):
+        self.trie = trie
+        self.prompt_length = prompt_length
+        self.penalty = penalty
+        self.max_misses = max_misses
+        self._states = {(): trie.start}
+
+    def state(self, tokens):
+        """DecodeState after the given text tokens."""
+        state = self._states.get(tokens)
+        if state is None:
+            state = self.trie.advance(self.state(tokens[:-1]), tokens[-1])
+            self._states[tokens] = state
+        return state
+
+    def __call__(self, input_ids, scores):
+        if input_ids.shape[1] < self.prompt_length:
+            return scores
+        eos = self.trie.eos_token_id
+        for row, ids in enumerate(input_ids[:, self.prompt_length:].tolist()):
+            state = self.state(tuple(ids))
+            expansion = self.trie.expand(state.nodes) if state.nodes else None
+            if state.misses > self.max_misses or (expansion is not None and expansion.final):
+                scores[row] = -math.inf
+                scores[row, eos] = 0.0
+            elif expansion is not None:
+                kept = scores[row, expansion.tokens]
+                scores[row] -= self.penalty
+                scores[row, expansion.tokens] = kept
+        return scores
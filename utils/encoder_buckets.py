@@ -0,0 +1,83 @@
+# encoder_buckets.py
+"""
+Adaptive encoder input length for short clips.
+
+Whisper's encoder always sees a 30 s (3000-frame) window. For a 4 s ayah
+most of that window is padding, and encoder cost grows with its length
+(linearly in the convolutions and MLPs, quadratically in self-attention).
+
+With ASR_ENCODER_BUCKETS set, a batch is encoded over only the frames its
+longest clip needs, rounded up to the next bucket, and the positional
+embeddings are sliced to match. The decoder cross-attends to the shorter
+encoder output as it is. A fixed set of buckets keeps the number of
+distinct input shapes small. The model was trained on full windows, so
+short buckets can change transcripts; benchmarks/bench_encoder_buckets.py
+measures encoder time and transcript agreement per bucket, to pick the
+shortest safe one.
+"""
+import math
+
+from .mel_frontend import SAMPLE_RATE, HOP_LENGTH, N_FRAMES
+
+def parse_buckets(value):
+    """
+    Bucket lengths from a comma-separated list of seconds.
+
+    Args:
+        value (str): e.g. "10,15,20"; empty turns the mode off
+
+    Returns:
+        tuple of int: Bucket lengths in mel frames, ascending, each even (the
+        encoder halves the frame rate) and ending with the full window;
+        empty when the mode is off
+
+    Raises:
+        ValueError: If a length is not a positive number
+    """
+    buckets = set()
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        seconds = float(item)
+        if not seconds > 0:
+            raise ValueError(f"Encoder bucket lengths must be positive, got {item.strip()!r}")
+        frames = 2 * math.ceil(seconds * SAMPLE_RATE / HOP_LENGTH / 2)
+        buckets.add(min(frames, N_FRAMES))
+    if buckets:
+        buckets.add(N_FRAMES)
+    return tuple(sorted(buckets))
+
+def needed_frames(samples):
+    """Mel frames that see any of a clip's samples (centered STFT)."""
+    return samples // HOP_LENGTH + 1
+
+def bucket_frames(samples, buckets=()):
+    """Shortest bucket holding a clip of the given length, or the full window."""
+    needed = needed_frames(samples)
+    return next((frames for frames in buckets if frames >= needed), N_FRAMES)
+
+def encode(model, input_features):
+    """
+    Run a Whisper encoder on features shorter than the 30 s window.
+
+    Same computation as WhisperEncoder.forward in eval mode, with the
+    positional embeddings cut to the input length.
+
+    Args:
+        model (WhisperForConditionalGeneration): The model
+        input_features (torch.Tensor): (batch, n_mels, frames) with an even
+            number of frames, at most 3000
+
+    Returns:
+        BaseModelOutput: To pass to generate() as encoder_outputs
+    """
+    from torch import nn
+    from transformers.modeling_outputs import BaseModelOutput
+
+    encoder = model.get_encoder()
+    hidden = nn.functional.gelu(encoder.conv1(input_features))
+    hidden = nn.functional.gelu(encoder.conv2(hidden)).permute(0, 2, 1)
+    hidden = hidden + encoder.embed_positions.weight[:hidden.shape[1]]
+    for layer in encoder.layers:
+        hidden = layer(hidden, None, layer_head_mask=None)[0]
+    return BaseModelOutput(last_hidden_state=encoder.layer_norm(hidden))
@@ -0,0 +1,308 @@
+# exported_backend.py
+"""
+Exported inference backends for the ASR model.
+
+Eager `generate` runs every decoding step through Python-level
+transformers code. Instead, the model can be exported once to three graphs
+that run under TorchScript or ONNX Runtime:
+
+- encoder: log-mel features (any even number of frames, so encoder
+  buckets work) to encoder states
+- decoder_init: the decoder prompt (start, language and task tokens, fed
+  in one pass) and the encoder states to the next-token logits, plus the
+  self- and cross-attention key/value cache of every layer
+- decoder_step: one token and the cache to the next-token logits and the
+  grown self-attention cache
+
+ExportedWhisper runs greedy decoding over the graphs with the model's
+suppress-token rules and any extra logits processors, and is used in
+place of the eager model (ASR_BACKEND). The export also holds the
+processor, so a worker boots from it alone. Graphs are written next to
+the weights on first start, or ahead of time with:
+
+    python -m utils.exported_backend --backend onnx --output model_cache/whisper-onnx-fp32
+"""
+import json
+import os
+import shutil
+import tempfile
+import warnings
+from pathlib import Path
+
+import torch
+from torch import nn
+from transformers import GenerationConfig
+
+from .encoder_buckets import encode
+from .log_config import get_logger
+from .mel_frontend import N_MELS, N_FRAMES
+from .runtime_config import BACKENDS, EXPORT_FORMAT, resolve_backend  # noqa: F401 (re-exported)
+
+logger = get_logger('asr')
+
+GRAPH_SUFFIXES = {'torchscript': '.pt', 'onnx': '.onnx'}
+ONNX_OPSET = 14
+# Written by the processor's save_pretrained; exports made without a processor lack it
+PROCESSOR_CONFIG = 'preprocessor_config.json'
+
+def decoder_prompt(generation_config):
+    """Decoder start token followed by the forced language/task tokens."""
+    forced = sorted(generation_config.forced_decoder_ids or [])
+    if [rank for rank, _ in forced] != list(range(1, len(forced) + 1)) or None in [token for _, token in forced]:
+        raise ValueError("Exported backends need forced decoder tokens right after the start token")
+    return [generation_config.decoder_start_token_id] + [token for _, token in forced]
+
+def cache_names(layers):
+    """Input names of the key/value cache, four per decoder layer."""
+    return [f'{kind}.{layer}' for layer in range(layers) for kind in ('self_k', 'self_v', 'cross_k', 'cross_v')]
+
+class _Encoder(nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_features):
+        return encode(self.model, input_features).last_hidden_state
+
+class _DecoderInit(nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, encoder_hidden_states):
+        outputs = self.model.model.decoder(input_ids=input_ids, encoder_hidden_states=encoder_hidden_states,
+                                           use_cache=True, return_dict=True)
+        logits = self.model.proj_out(outputs.last_hidden_state[:, -1])
+        return (logits,) + tuple(tensor for layer in outputs.past_key_values for tensor in layer)
+
+class _DecoderStep(nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, *cache):
+        past = tuple(tuple(cache[i:i + 4]) for i in range(0, len(cache), 4))
+        # Cross-attention reuses its cached keys/values; the decoder only checks the encoder length
+        encoder_hidden_states = past[0][2][:, 0]
+        outputs = self.model.model.decoder(input_ids=input_ids, encoder_hidden_states=encoder_hidden_states,
+                                           past_key_values=past, use_cache=True, return_dict=True)
+        logits = self.model.proj_out(outputs.last_hidden_state[:, -1])
+        return (logits,) + tuple(tensor for layer in outputs.past_key_values for tensor in layer[:2])
+
+def export_model(model, directory, backend, metadata=None, processor=None):
+    """
+    Export a Whisper model's encoder and decoder graphs.
+
+    The graphs, the generation config, the processor and export.json are written to a
+    temporary directory that is renamed into place, so workers never see a
+    partial export.
+
+    Args:
+        model (WhisperForConditionalGeneration): Model with its generation config set
+        directory (str or Path): Where to write the export
+        backend (str): torchscript or onnx
+        metadata (dict): Extra string fields for export.json (e.g. model_id)
+        processor (ProcessorMixin): The model's processor, saved with the graphs
+
+    Raises:
+        ValueError: For an unknown backend, or an ONNX export of a non-fp32 model
+    """
+    if backend not in GRAPH_SUFFIXES:
+        raise ValueError(f"Cannot export to {backend!r}; expected one of {', '.join(GRAPH_SUFFIXES)}")
+    dtype = next(model.parameters()).dtype
+    if backend == 'onnx' and (dtype != torch.float32 or any(
+            type(module).__module__.startswith('torch.ao') for module in model.modules())):
+        raise ValueError("ONNX exports need an fp32 model (ASR_PRECISION=fp32)")
+
+    model = model.eval()
+    layers = model.config.decoder_layers
+    prompt = decoder_prompt(model.generation_config)
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f'.{directory.name}.', dir=directory.parent))
+    try:
+        with torch.no_grad(), warnings.catch_warnings():
+            # The tracer flags the decoder's shape checks; they hold for every input the graphs get
+            warnings.simplefilter('ignore', torch.jit.TracerWarning)
+            features = torch.zeros(1, N_MELS, N_FRAMES, dtype=dtype)
+            encoder_states = _Encoder(model)(features)
+            input_ids = torch.tensor([prompt])
+            init_outputs = _DecoderInit(model)(input_ids, encoder_states)
+            step_inputs = (input_ids[:, -1:],) + init_outputs[1:]
+            graphs = {
+                'encoder': (_Encoder(model), (features,), ['input_features'], ['encoder_hidden_states'],
+                            {'input_features': {0: 'batch', 2: 'frames'},
+                             'encoder_hidden_states': {0: 'batch', 1: 'positions'}}),
+                'decoder_init': (_DecoderInit(model), (input_ids, encoder_states),
+                                 ['input_ids', 'encoder_hidden_states'],
+                                 ['logits'] + [f'present.{name}' for name in cache_names(layers)],
+                                 {'input_ids': {0: 'batch', 1: 'tokens'},
+                                  'encoder_hidden_states': {0: 'batch', 1: 'positions'},
+                                  **{f'present.{name}': {0: 'batch', 2: 'length'} for name in cache_names(layers)}}),
+                'decoder_step': (_DecoderStep(model), step_inputs, ['input_ids'] + cache_names(layers),
+                                 ['logits'] + [f'present.{name}' for name in cache_names(layers) if 'self' in name],
+                                 {'input_ids': {0: 'batch'},
+                                  **{name: {0: 'batch', 2: 'length'} for name in cache_names(layers)},
+                                  **{f'present.{name}': {0: 'batch', 2: 'length'}
+                                     for name in cache_names(layers) if 'self' in name}}),
+            }
+            for name, (module, inputs, input_names, output_names, dynamic_axes) in graphs.items():
+                path = tmp_dir / f'{name}{GRAPH_SUFFIXES[backend]}'
+                if backend == 'torchscript':
+                    torch.jit.save(torch.jit.trace(module, inputs, check_trace=False), str(path))
+                else:
+                    torch.onnx.export(module, inputs, str(path), input_names=input_names,
+                                      output_names=output_names, dynamic_axes=dynamic_axes,
+                                      opset_version=ONNX_OPSET)
+        model.generation_config.save_pretrained(tmp_dir)
+        if processor is not None:
+            processor.save_pretrained(tmp_dir)
+        info = {
+            'format': EXPORT_FORMAT,
+            'backend': backend,
+            'dtype': str(dtype).replace('torch.', ''),
+            'decoder_layers': layers,
+            'prompt': prompt,
+            'metadata': dict(metadata or {}),
+        }
+        (tmp_dir / 'export.json').write_text(json.dumps(info, indent=2))
+        os.replace(tmp_dir, directory)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    logger.info("Exported %s graphs to %s", backend, directory)
+
+class TorchScriptGraph:
+    """A saved TorchScript graph, called with and returning tensors."""
+
+    def __init__(self, path):
+        self.module = torch.jit.freeze(torch.jit.load(str(path)).eval())
+
+    def __call__(self, *inputs):
+        # The cache grows every step; NNC would re-specialize its fused kernels for each new length
+        with torch.jit.fuser('fuser0'):
+            outputs = self.module(*inputs)
+        return outputs if isinstance(outputs, tuple) else (outputs,)
+
+class OnnxGraph:
+    """An ONNX graph under ONNX Runtime, called with and returning tensors."""
+
+    def __init__(self, path):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+        self.session = onnxruntime.InferenceSession(str(path), options, providers=['CPUExecutionProvider'])
+        self.input_names = [graph_input.name for graph_input in self.session.get_inputs()]
+
+    def __call__(self, *inputs):
+        feeds = {name: tensor.contiguous().numpy() for name, tensor in zip(self.input_names, inputs)}
+        return tuple(torch.from_numpy(output) for output in self.session.run(None, feeds))
+
+GRAPH_RUNNERS = {'torchscript': TorchScriptGraph, 'onnx': OnnxGraph}
+
+class ExportedWhisper:
+    """
+    Greedy Whisper decoding over exported graphs.
+
+    Stands in for the eager model where the app uses it: it has a
+    generation_config, a dtype and a generate method.
+
+    Args:
+        directory (str or Path): An export written by export_model
+        model_id (str): Checkpoint the export must have been made from, if
+            given (export.json's metadata model_id)
+
+    Raises:
+        ValueError: If the export was written in another format or from
+            another checkpoint
+    """
+
+    def __init__(self, directory, model_id=None):
+        directory = Path(directory)
+        info = json.loads((directory / 'export.json').read_text())
+        if info.get('format') != EXPORT_FORMAT:
+            raise ValueError(f"{directory} holds export format {info.get('format')}, expected {EXPORT_FORMAT}")
+        exported_id = info.get('metadata', {}).get('model_id')
+        if model_id is not None and exported_id != model_id:
+            raise ValueError(f"{directory} holds an export of {exported_id}, expected {model_id}")
+        self.backend = info['backend']
+        self.dtype = getattr(torch, info['dtype'])
+        self.layers = info['decoder_layers']
+        self.prompt = info['prompt']
+        self.metadata = info['metadata']
+        self.generation_config = GenerationConfig.from_pretrained(directory)
+        runner = GRAPH_RUNNERS[self.backend]
+        suffix = GRAPH_SUFFIXES[self.backend]
+        self.encoder = runner(directory / f'encoder{suffix}')
+        self.decoder_init = runner(directory / f'decoder_init{suffix}')
+        self.decoder_step = runner(directory / f'decoder_step{suffix}')
+
+    def generate(self, inputs, max_length=None, num_beams=1, logits_processor=None):
+        """
+        Greedy decoding, like the eager model's generate.
+
+        Args:
+            inputs (torch.Tensor): (batch, n_mels, frames) log-mel features
+            max_length (int): Longest output, prompt included
+            num_beams (int): Only 1 is supported
+            logits_processor (LogitsProcessorList): Applied after the suppress-token rules
+
+        Returns:
+            torch.Tensor: (batch, length) token ids, prompt included, finished
+            rows padded with the pad token
+        """
+        if num_beams != 1:
+            raise ValueError("Exported backends only decode greedily (num_beams=1)")
+        config = self.generation_config
+        max_length = max_length or config.max_length
+        eos = config.eos_token_id
+        pad = config.pad_token_id if config.pad_token_id is not None else eos
+        suppress = torch.tensor(config.suppress_tokens or [], dtype=torch.long)
+        begin_suppress = torch.tensor(config.begin_suppress_tokens or [], dtype=torch.long)
+
+        batch = inputs.shape[0]
+        input_ids = torch.tensor([self.prompt] * batch, dtype=torch.long)
+        encoder_states = self.encoder(inputs.to(self.dtype))[0]
+        logits, *present = self.decoder_init(input_ids, encoder_states)
+        # Per layer: the self-attention cache grows every step, the cross-attention cache is fixed
+        self_cache = [present[i:i + 2] for i in range(0, len(present), 4)]
+        cross_cache = [present[i + 2:i + 4] for i in range(0, len(present), 4)]
+        finished = torch.zeros(batch, dtype=torch.bool)
+        while True:
+            scores = logits.float()
+            scores[:, suppress] = -float('inf')
+            if input_ids.shape[1] == len(self.prompt):
+                scores[:, begin_suppress] = -float('inf')
+            if logits_processor is not None:
+                scores = logits_processor(input_ids, scores)
+            next_tokens = scores.argmax(dim=-1).masked_fill(finished, pad)
+            input_ids = torch.cat([input_ids, next_tokens[:, None]], dim=1)
+            finished |= next_tokens == eos
+            if finished.all() or input_ids.shape[1] >= max_length:
+                break
+            cache = [tensor for layer in range(self.layers) for tensor in (*self_cache[layer], *cross_cache[layer])]
+            logits, *present = self.decoder_step(next_tokens[:, None], *cache)
+            self_cache = [present[i:i + 2] for i in range(0, len(present), 2)]
+        return input_ids
+
+def main():
+    import argparse
+    from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor
+    from .precision import PRECISIONS, convert_model
+
+    parser = argparse.ArgumentParser(description="Export the ASR model's encoder and decoder graphs.")
+    parser.add_argument('--backend', choices=list(GRAPH_SUFFIXES), required=True, help='Export format')
+    parser.add_argument('--output', required=True, help='Directory to write (must not exist)')
+    parser.add_argument('--model', default="fawzanaramam/Whisper-Small-Finetuned-on-Surah-Fatiha",
+                        help='Checkpoint to export')
+    parser.add_argument('--precision', choices=PRECISIONS, default='fp32', help='Precision mode of the export')
+    args = parser.parse_args()
+
+    model = AutoModelForSpeechSeq2Seq.from_pretrained(args.model, torch_dtype=torch.float32)
+    model.generation_config = GenerationConfig.from_pretrained(args.model)
+    model = convert_model(model, args.precision)
+    export_model(model, args.output, args.backend, metadata={'model_id': args.model, 'precision': args.precision},
+                 processor=AutoProcessor.from_pretrained(args.model))
+
+if __name__ == '__main__':
+    main()
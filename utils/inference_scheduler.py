@@ -0,0 +1,143 @@
+# inference_scheduler.py
+"""
+Dynamic micro-batching for model inference.
+
+Request threads submit single inputs; one worker thread gathers whatever
+is pending into a batch (up to max_batch_size, waiting at most
+max_wait_ms after the first input arrives), runs the batch function once
+and hands each caller its own result. Under concurrent load this turns N
+batch-size-1 generate calls into one padded batch; with a single caller
+it adds at most max_wait_ms of latency.
+"""
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from .log_config import get_logger
+
+logger = get_logger('asr')
+
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get('ASR_MAX_BATCH_SIZE', 8))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get('ASR_MAX_WAIT_MS', 10))
+
+# Latencies kept for the percentile stats
+LATENCY_WINDOW = 2048
+
+class InferenceScheduler:
+    """
+    Gather submitted inputs into batches for a batch function.
+
+    Args:
+        run_batch (callable): Takes a list of inputs and returns a list of
+            results in the same order
+        max_batch_size (int): Largest batch handed to run_batch
+        max_wait_ms (float): How long the first input of a batch waits for
+            company before the batch runs anyway
+        name (str): Name of the worker thread
+    """
+
+    def __init__(self, run_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, name='inference-scheduler'):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self._started = time.monotonic()
+        self.items = 0
+        self.batches = 0
+        self.failures = 0
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """Queue one input; returns a Future for its result."""
+        if self._closed:
+            raise RuntimeError("InferenceScheduler is closed")
+        future = Future()
+        self._queue.put((item, future, time.monotonic()))
+        return future
+
+    def infer(self, item, timeout=None):
+        """Run one input through the next batch and wait for its result."""
+        return self.submit(item).result(timeout)
+
+    def close(self, timeout=None):
+        """Finish the queued work and stop the worker thread."""
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.run_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"Batch function returned {len(results)} results for {len(items)} inputs")
+            except Exception as e:
+                logger.exception("Batch of %d failed", len(items))
+                with self._lock:
+                    self.failures += len(items)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            done = time.monotonic()
+            with self._lock:
+                self.items += len(items)
+                self.batches += 1
+                self._batch_sizes.append(len(items))
+                self._latencies.extend(done - submitted for _, _, submitted in batch)
+            logger.debug("Ran batch of %d", len(items))
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def stats(self):
+        """Throughput, batch size and latency percentiles, e.g. for a health endpoint."""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000.0
+            sizes = list(self._batch_sizes)
+            items, batches, failures = self.items, self.batches, self.failures
+        elapsed = time.monotonic() - self._started
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'queue_depth': self._queue.qsize(),
+            'items': items,
+            'batches': batches,
+            'failures': failures,
+            'mean_batch_size': round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            'throughput_per_s': round(items / elapsed, 3) if elapsed > 0 else 0.0,
+            'latency_p50_ms': round(float(np.percentile(latencies, 50)), 2) if latencies.size else None,
+            'latency_p99_ms': round(float(np.percentile(latencies, 99)), 2) if latencies.size else None,
+        }
@@ -0,0 +1,67 @@
+# log_config.py
+"""
+Leveled logging for the app and the text pipeline, configured from the environment.
+
+Every subsystem logs through its own `tajweed.<subsystem>` logger with
+%-style arguments, so a disabled message costs one level check and no
+string formatting. Work done only to produce a message (normalizing a
+transcript, reading process memory) is guarded by `isEnabledFor`.
+
+Environment:
+    TAJWEED_LOG_LEVEL: Level for every subsystem (default INFO)
+    TAJWEED_LOG_<SUBSYSTEM>: Level for one subsystem, e.g. TAJWEED_LOG_MATCHER=DEBUG
+"""
+import logging
+import os
+import sys
+
+ROOT_LOGGER = 'tajweed'
+DEFAULT_LEVEL = 'INFO'
+LOG_FORMAT = '[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s'
+
+SUBSYSTEMS = (
+    'app',       # Startup and route handling
+    'requests',  # Per-request log written to request_log.txt
+    'ws',        # /ws streaming endpoint
+    'memory',    # Process memory measurements
+    'asr',       # Model loading and transcription
+    'matcher',   # Ayah and word matching (utils.text_matcher)
+    'checker',   # Tajweed analysis (utils.tajweed_checker)
+)
+
+def get_logger(subsystem):
+    """Logger for one subsystem, e.g. get_logger('matcher')."""
+    return logging.getLogger(f'{ROOT_LOGGER}.{subsystem}')
+
+def _level(name, default):
+    value = (name or default).strip().upper()
+    level = logging.getLevelName(value)
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level: {name}")
+    return level
+
+def configure_logging(environ=None, stream=None):
+    """
+    Attach a handler to the `tajweed` logger and set subsystem levels from the environment.
+
+    Safe to call more than once; later calls only update the levels.
+
+    Returns:
+        dict: Effective level name per subsystem
+    """
+    environ = os.environ if environ is None else environ
+    root = logging.getLogger(ROOT_LOGGER)
+    if not root.handlers:
+        handler = logging.StreamHandler(stream or sys.stdout)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+        root.propagate = False
+    root.setLevel(_level(environ.get('TAJWEED_LOG_LEVEL'), DEFAULT_LEVEL))
+
+    levels = {}
+    for subsystem in SUBSYSTEMS:
+        logger = get_logger(subsystem)
+        override = environ.get(f'TAJWEED_LOG_{subsystem.upper()}')
+        logger.setLevel(_level(override, DEFAULT_LEVEL) if override else logging.NOTSET)
+        levels[subsystem] = logging.getLevelName(logger.getEffectiveLevel())
+    return levels
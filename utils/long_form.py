@@ -0,0 +1,103 @@
+# long_form.py
+"""
+Long-form transcription: recordings longer than Whisper's 30 s window.
+
+The clip is cut into windows of at most 30 s. Each cut is placed at the
+last pause (usually between ayat) in the second half of its window. Where
+no pause is found the cut is hard, and the next window starts a little
+earlier, so words on the cut appear in both windows. The windows are
+transcribed together in batches, and their texts are joined, dropping the
+words the overlap transcribed twice.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .audio_io import HOP_LENGTH
+from .text_matcher import similar, MATCH_THRESHOLD
+
+WINDOW_SECONDS = 30.0
+# How far back from the end of a window to look for a pause to cut at; never past its first half
+SEARCH_SECONDS = 15.0
+# Audio repeated across a cut that is not at a pause
+OVERLAP_SECONDS = 2.0
+# Energy smoothing before looking for pauses
+SMOOTHING_SECONDS = 0.2
+# A pause is quieter than this fraction of the clip's loud (95th percentile) energy
+SILENCE_RATIO = 0.1
+# Most words an overlap of OVERLAP_SECONDS can have transcribed twice
+MAX_OVERLAP_WORDS = 8
+
+# start/end in samples; overlap is True when the window starts before the previous one ended
+Window = namedtuple('Window', ['start', 'end', 'overlap'])
+
+def split_windows(clip, window_seconds=WINDOW_SECONDS):
+    """
+    Plan the windows a clip is transcribed in.
+
+    Args:
+        clip (AudioClip): The recording
+        window_seconds (float): Longest window
+
+    Returns:
+        list of Window: A single window for clips that fit in one
+    """
+    rate = clip.sample_rate
+    max_samples = int(window_seconds * rate)
+    total = len(clip)
+    if total <= max_samples:
+        return [Window(0, total, False)]
+
+    # Frame i of the energy is centred on sample i * HOP_LENGTH
+    width = max(1, int(SMOOTHING_SECONDS * rate / HOP_LENGTH))
+    energy = np.convolve(clip.frame_energy, np.ones(width, dtype=np.float32) / width, mode='same')
+    threshold = SILENCE_RATIO * np.percentile(energy, 95)
+    search = int(SEARCH_SECONDS * rate / HOP_LENGTH)
+    overlap = int(OVERLAP_SECONDS * rate)
+
+    windows = []
+    start, overlapping = 0, False
+    while total - start > max_samples:
+        last_frame = (start + max_samples) // HOP_LENGTH
+        # Only the second half, so a pause near the start cannot leave a sliver of a window
+        first_frame = max((start + max_samples // 2) // HOP_LENGTH, last_frame - search)
+        quiet = np.flatnonzero(energy[first_frame:last_frame] <= threshold)
+        if len(quiet):
+            end = (first_frame + int(quiet[-1])) * HOP_LENGTH
+            windows.append(Window(start, end, overlapping))
+            start, overlapping = end, False
+        else:
+            end = start + max_samples
+            windows.append(Window(start, end, overlapping))
+            start, overlapping = end - overlap, True
+    windows.append(Window(start, total, overlapping))
+    return windows
+
+def merge_transcripts(texts, windows):
+    """
+    Join the transcripts of consecutive windows.
+
+    Where a window overlaps the previous one, the longest run of words that
+    ends the text so far and starts the window's text is kept once. Words
+    match when they are similar (see text_matcher.similar), since the two
+    windows may spell a word on the cut differently.
+
+    Args:
+        texts (list of str): Transcript of each window
+        windows (list of Window): The windows, from split_windows
+
+    Returns:
+        str: The transcript of the whole clip
+    """
+    words = []
+    for text, window in zip(texts, windows):
+        new_words = text.split()
+        if window.overlap and words:
+            tail = words[-MAX_OVERLAP_WORDS:]
+            head = new_words[:MAX_OVERLAP_WORDS]
+            for size in range(min(len(tail), len(head)), 0, -1):
+                if all(similar(a, b) > MATCH_THRESHOLD for a, b in zip(tail[-size:], head[:size])):
+                    new_words = new_words[size:]
+                    break
+        words.extend(new_words)
+    return ' '.join(words)
@@ -0,0 +1,142 @@
+# mel_frontend.py
+"""
+Batched log-mel front end for Whisper.
+
+Computes the same 80 x 3000 input features as the Hugging Face
+WhisperFeatureExtractor, but:
+
+- the mel filterbank and Hann window are built once and reused
+- clips of a batch with similar lengths share one float32 torch.stft call
+- only the frames that overlap audio are transformed; Al-Fatiha ayat are
+  3-12 s long, so most of Whisper's 30 s window is padding, and padding
+  frames all have the same (floor) value
+- the padded sample buffer is kept and reused between calls
+- torch and librosa are imported, and the filterbank built, on the first
+  call rather than at import
+"""
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+N_FFT = 400
+HOP_LENGTH = 160
+N_MELS = 80
+CHUNK_SECONDS = 30
+N_SAMPLES = CHUNK_SECONDS * SAMPLE_RATE
+N_FRAMES = N_SAMPLES // HOP_LENGTH
+
+# Power floor before log10, and the dynamic range kept below each clip's peak
+MEL_FLOOR = 1e-10
+DYNAMIC_RANGE = 8.0
+
+# How much more audio than it holds a batched transform may process because of padding
+PADDING_SLACK = 1.25
+
+@lru_cache(maxsize=None)
+def mel_filters(n_mels=N_MELS, n_fft=N_FFT, sample_rate=SAMPLE_RATE):
+    """Slaney-normalized mel filterbank, (n_mels, n_fft // 2 + 1) float32 tensor."""
+    import librosa
+    import torch
+    filters = librosa.filters.mel(sr=sample_rate, n_fft=n_fft, n_mels=n_mels, fmin=0.0,
+                                  fmax=sample_rate / 2, htk=False, norm='slaney')
+    return torch.from_numpy(filters.astype(np.float32))
+
+@lru_cache(maxsize=None)
+def hann_window(n_fft=N_FFT):
+    """Periodic Hann window, as used by Whisper."""
+    import torch
+    return torch.hann_window(n_fft, periodic=True, dtype=torch.float32)
+
+class MelFrontend:
+    """
+    Turn 16 kHz clips into Whisper log-mel features.
+
+    Args:
+        n_mels (int): Mel bins
+        n_frames (int): Frames per clip in the output (Whisper's 30 s window)
+    """
+
+    def __init__(self, n_mels=N_MELS, n_frames=N_FRAMES):
+        self.n_mels = n_mels
+        self.n_frames = n_frames
+        self.max_samples = n_frames * HOP_LENGTH
+        self.filters = mel_filters(n_mels)
+        self.window = hann_window()
+        # One padding buffer per thread, grown as needed
+        self._local = threading.local()
+
+    def _buffer(self, batch, samples):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.shape[0] < batch or buffer.shape[1] < samples:
+            rows = max(batch, buffer.shape[0] if buffer is not None else 0)
+            buffer = np.zeros((rows, self.max_samples), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer[:batch, :samples]
+
+    def __call__(self, clips):
+        """
+        Compute log-mel features for a batch of clips.
+
+        Clips of similar length are transformed together, so a long clip
+        does not make the short ones of its batch pay for its padding.
+
+        Args:
+            clips (list of np.ndarray): Mono 16 kHz samples; longer than 30 s is truncated
+
+        Returns:
+            np.ndarray: (len(clips), n_mels, n_frames) float32
+        """
+        features = np.empty((len(clips), self.n_mels, self.n_frames), dtype=np.float32)
+        order = sorted(range(len(clips)), key=lambda i: len(clips[i]))
+        group = []
+        for i in order:
+            # A group stays together while padding to its longest clip costs at most PADDING_SLACK extra work
+            longest = len(clips[i]) + N_FFT
+            if group and longest * (len(group) + 1) > PADDING_SLACK * sum(len(clips[j]) + N_FFT for j in group + [i]):
+                features[group] = self._transform([clips[j] for j in group])
+                group = []
+            group.append(i)
+        if group:
+            features[group] = self._transform([clips[j] for j in group])
+        return features
+
+    def _transform(self, clips):
+        import torch
+        lengths = [min(len(clip), self.max_samples) for clip in clips]
+        # Frames past a clip's end + half a window see only zeros; stop the transform there.
+        # The extra window of zeros keeps the reflect padding at the end all zeros too.
+        samples = min(self.max_samples, -(-(max(lengths, default=0) + N_FFT) // HOP_LENGTH) * HOP_LENGTH)
+        buffer = self._buffer(len(clips), samples)
+        for row, clip, length in zip(buffer, clips, lengths):
+            row[:length] = clip[:length]
+            row[length:] = 0.0
+
+        with torch.no_grad():
+            spectrum = torch.stft(torch.from_numpy(buffer), N_FFT, HOP_LENGTH, window=self.window,
+                                  center=True, pad_mode='reflect', return_complex=True)
+            power = spectrum.real.square() + spectrum.imag.square()
+            mel = torch.matmul(self.filters, power)
+        computed = min(mel.shape[-1], self.n_frames)
+
+        features = np.empty((len(clips), self.n_mels, self.n_frames), dtype=np.float32)
+        features[:, :, :computed] = torch.log10(mel[..., :computed].clamp(min=MEL_FLOOR)).numpy()
+        features[:, :, computed:] = np.log10(MEL_FLOOR)
+        peaks = features.max(axis=(1, 2), keepdims=True)
+        np.maximum(features, peaks - DYNAMIC_RANGE, out=features)
+        features += 4.0
+        features /= 4.0
+        return features
+
+FRONTEND = None
+_frontend_lock = threading.Lock()
+
+def log_mel_spectrogram(clips):
+    """Whisper log-mel features for a batch of 16 kHz clips, (batch, 80, 3000) float32."""
+    global FRONTEND
+    if FRONTEND is None:
+        with _frontend_lock:
+            if FRONTEND is None:
+                FRONTEND = MelFrontend()
+    return FRONTEND(clips)
@@ -0,0 +1,181 @@
+# model_snapshot.py
+"""
+Local, pre-converted snapshots of the ASR model.
+
+Loading from the Hub resolves the checkpoint, parses its configs and
+converts the weights to the precision mode on every boot. A snapshot does
+that once and writes everything a worker needs to one directory:
+
+- model.safetensors: weights already in the precision mode (int8 layers
+  quantized), memory-mapped by every worker (see precision.load_model)
+- config.json and generation_config.json: the model's configs
+- the processor's tokenizer and feature extractor files
+- snapshot.json: snapshot format, precision, source checkpoint and
+  revision, library versions
+
+Workers then boot from the directory with no network access and no
+conversion. The app writes the snapshot on first start if it is missing,
+or it can be written ahead of time (e.g. in a Docker build step) with:
+
+    python -m utils.model_snapshot --precision int8 --output model_cache/whisper-small-fatiha-int8-v1
+
+torch and transformers are imported on first use, so app.py can import
+this module at start-up.
+"""
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .log_config import get_logger
+
+logger = get_logger('asr')
+
+# Bump when the files of a snapshot change incompatibly; the app's default path includes it
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_INFO = 'snapshot.json'
+WEIGHTS_FILE = 'model.safetensors'
+
+def read_snapshot(directory):
+    """
+    Read a snapshot's snapshot.json.
+
+    Returns:
+        dict: The snapshot info, or None if the directory holds no snapshot
+
+    Raises:
+        ValueError: If the snapshot was written in another format
+    """
+    path = Path(directory) / SNAPSHOT_INFO
+    if not path.exists():
+        return None
+    info = json.loads(path.read_text())
+    if info.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"{directory} holds snapshot format {info.get('format')}, expected {SNAPSHOT_FORMAT}")
+    return info
+
+def save_snapshot(model, processor, directory, precision, metadata=None):
+    """
+    Convert a model to a precision mode and write it with its processor.
+
+    The snapshot is written to a temporary directory and moved into place,
+    so a worker never sees a partial one; when several workers write the
+    same snapshot at once, the first one to finish wins.
+
+    Args:
+        model (WhisperForConditionalGeneration): fp32 model with its
+            generation config set; converted in place
+        processor (ProcessorMixin): Its processor
+        directory (str or Path): Where to write the snapshot
+        precision (str): A mode from PRECISIONS
+        metadata (dict): Extra string fields for snapshot.json (e.g. model_id)
+    """
+    import torch
+    import transformers
+    from .precision import convert_model, save_model
+
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f'.{directory.name}.', dir=directory.parent))
+    try:
+        model = convert_model(model, precision)
+        save_model(model, tmp_dir / WEIGHTS_FILE, precision, metadata=metadata)
+        model.config.save_pretrained(tmp_dir)
+        model.generation_config.save_pretrained(tmp_dir)
+        processor.save_pretrained(tmp_dir)
+        info = {
+            'format': SNAPSHOT_FORMAT,
+            'precision': precision,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'torch_version': torch.__version__,
+            'transformers_version': transformers.__version__,
+            'metadata': dict(metadata or {}),
+        }
+        # Written last: a directory with snapshot.json is complete
+        (tmp_dir / SNAPSHOT_INFO).write_text(json.dumps(info, indent=2))
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            if read_snapshot(directory) is None:
+                raise
+            logger.info("Snapshot %s was written by another worker", directory)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    logger.info("Wrote %s model snapshot to %s", precision, directory)
+
+def write_snapshot(model_id, directory, precision, revision=None):
+    """
+    Download a checkpoint from the Hub and write it as a snapshot.
+
+    Args:
+        model_id (str): Hub checkpoint
+        directory (str or Path): Where to write the snapshot
+        precision (str): A mode from PRECISIONS
+        revision (str): Branch, tag or commit to snapshot; defaults to main
+    """
+    import torch
+    from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, GenerationConfig
+
+    processor = AutoProcessor.from_pretrained(model_id, revision=revision)
+    model = AutoModelForSpeechSeq2Seq.from_pretrained(model_id, revision=revision, torch_dtype=torch.float32)
+    model.generation_config = GenerationConfig.from_pretrained(model_id, revision=revision)
+    # The commit the Hub resolved, so the snapshot records exactly which weights it holds
+    resolved = getattr(model.config, '_commit_hash', None) or revision or ''
+    save_snapshot(model, processor, directory, precision, metadata={'model_id': model_id, 'revision': resolved})
+
+def load_snapshot_processor(directory):
+    """The processor of a snapshot."""
+    from transformers import AutoProcessor
+    return AutoProcessor.from_pretrained(str(directory))
+
+def load_snapshot_model(directory, precision, model_id=None):
+    """
+    Load the model of a snapshot, with its weights memory-mapped.
+
+    Args:
+        directory (str or Path): The snapshot
+        precision (str): Precision mode the weights must be in
+        model_id (str): Checkpoint the snapshot must have been made from, if given
+
+    Raises:
+        FileNotFoundError: If the directory holds no snapshot
+        ValueError: If the snapshot has another format, precision mode or checkpoint
+    """
+    from transformers import AutoConfig, AutoModelForSpeechSeq2Seq, GenerationConfig
+    from .precision import load_model
+
+    directory = Path(directory)
+    info = read_snapshot(directory)
+    if info is None:
+        raise FileNotFoundError(f"No model snapshot in {directory}")
+    snapshot_id = info['metadata'].get('model_id')
+    if model_id is not None and snapshot_id != model_id:
+        raise ValueError(f"{directory} holds a snapshot of {snapshot_id}, expected {model_id}")
+    config = AutoConfig.from_pretrained(str(directory))
+    model = load_model(lambda dtype: AutoModelForSpeechSeq2Seq.from_config(config, torch_dtype=dtype),
+                       directory / WEIGHTS_FILE, precision)
+    model.generation_config = GenerationConfig.from_pretrained(str(directory))
+    return model
+
+def main():
+    import argparse
+    from .runtime_config import PRECISIONS
+
+    parser = argparse.ArgumentParser(description="Write a pre-converted local snapshot of the ASR model.")
+    parser.add_argument('--output', required=True, help='Directory to write')
+    parser.add_argument('--precision', choices=PRECISIONS, default='fp32', help='Precision mode of the weights')
+    parser.add_argument('--model', default="fawzanaramam/Whisper-Small-Finetuned-on-Surah-Fatiha",
+                        help='Checkpoint to snapshot')
+    parser.add_argument('--revision', default=None, help='Branch, tag or commit of the checkpoint')
+    args = parser.parse_args()
+
+    write_snapshot(args.model, args.output, args.precision, revision=args.revision)
+    print(json.dumps(read_snapshot(args.output), indent=2))
+
+if __name__ == '__main__':
+    main()
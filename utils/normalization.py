@@ -0,0 +1,127 @@
+# normalization.py
+"""
+Arabic normalization engine shared by the text matcher and the Tajweed checker.
+
+Every table below is compiled once at import time so a call costs two
+``str.translate`` passes, one madd-word regex and one character filter,
+and repeated inputs are served from a bounded LRU memo.
+"""
+from functools import lru_cache
+import re
+
+# Phonetic mapping for common variations
+PHONETIC_MAPPING = {
+    'ا': ['ى', 'آ', 'أ', 'إ', 'ٱ', 'ٰ'],  # Added superscript alif
+    'ه': ['ة'],
+    'ي': ['ى', 'ئ'],
+    'و': ['ؤ'],
+    'س': ['ص'],
+    'ت': ['ط'],
+    'ذ': ['ز', 'ظ'],
+    'د': ['ض'],
+    'ح': ['ه'],
+    'ك': ['ق'],
+    'م': ['مٰ', 'مَٰ']  # Added madd variations for meem
+}
+
+# Add specific mappings for words with madd
+MADD_WORD_MAPPING = {
+    # Bismillah (Ayah 0)
+    'الرحمن': ['الرحمٰن', 'الرحمان'],
+    'الرحيم': ['الرحيم'],  # No madd variation but included for completeness
+
+    # Al-Hamd (Ayah 1)
+    'العالمين': ['العٰلمين', 'العالمين'],
+
+    # Ar-Rahman Ar-Raheem (Ayah 2)
+    # Already covered in Ayah 0
+
+    # Maaliki Yawm id-Deen (Ayah 3)
+    'مالك': ['مٰلك', 'مالك'],
+
+    # Iyyaka Na'budu (Ayah 4)
+    # No madd variations
+
+    # Ihdina (Ayah 5)
+    'الصراط': ['الصرٰط', 'الصراط'],
+    'المستقيم': ['المستقيم'],  # Has madd in ي but that's handled differently
+
+    # Siratal-ladhina (Ayah 6)
+    'صراط': ['صرٰط', 'صراط'],
+    'الذين': ['الذين'],  # Has madd in ي but that's handled differently
+    'الضالين': ['الضٰلين', 'الضالين', 'الضآلين']  # Also handle آ form
+}
+
+# Maximum number of distinct inputs remembered by each memo
+NORMALIZE_CACHE_SIZE = 8192
+
+# Standalone madd (tatweel + superscript alif) becomes a plain alif
+_STANDALONE_MADD = 'ـٰ'
+
+# Alif forms and the superscript alif fold to a plain alif before the madd words are rewritten
+_ALIF_FOLD = str.maketrans({ch: 'ا' for ch in 'آٱأإٰ'})
+
+# Tashkeel and tatweel are dropped, then the remaining letter variants are folded
+_LETTER_FOLD = str.maketrans({
+    **{chr(cp): None for cp in range(0x064B, 0x0660)},
+    'ٰ': None,
+    'ـ': None,
+    'ة': 'ه',
+    'ى': 'ي',
+    'ئ': 'ي',
+    'ؤ': 'و',
+})
+
+_NON_ARABIC = re.compile(r'[^\u0600-\u06FF\s]')
+
+def _compile_madd_rewrites(mapping):
+    """Build a single regex and lookup table for the madd word rewrites.
+
+    Variations are folded the same way the input is before the rewrite
+    runs, so spellings that can no longer occur (e.g. with a superscript
+    alif) and identity rewrites are dropped.
+    """
+    rewrites = {}
+    for base_word, variations in mapping.items():
+        for variation in variations:
+            folded = variation.replace(_STANDALONE_MADD, 'ا').translate(_ALIF_FOLD)
+            if folded != base_word:
+                rewrites.setdefault(folded, base_word)
+    # A rewrite must not feed another one, otherwise a single pass would
+    # differ from applying the mapping entry by entry
+    for target in rewrites.values():
+        if any(source in target for source in rewrites):
+            raise ValueError(f"Madd rewrite target '{target}' overlaps another rewrite")
+    if not rewrites:
+        return None, rewrites
+    # Longest first so the alternation prefers the longest spelling
+    alternation = '|'.join(map(re.escape, sorted(rewrites, key=len, reverse=True)))
+    return re.compile(alternation), rewrites
+
+_MADD_PATTERN, _MADD_REWRITES = _compile_madd_rewrites(MADD_WORD_MAPPING)
+
+def _rewrite_madd(match):
+    return _MADD_REWRITES[match.group(0)]
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_arabic_text(text):
+    """Normalize Arabic text by removing diacritics and normalizing letters."""
+    text = text.replace(_STANDALONE_MADD, 'ا').translate(_ALIF_FOLD)
+    if _MADD_PATTERN is not None:
+        text = _MADD_PATTERN.sub(_rewrite_madd, text)
+    text = _NON_ARABIC.sub('', text.translate(_LETTER_FOLD))
+    return ' '.join(text.split())
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_tajweed_text(text):
+    """Normalize Arabic text for the Tajweed checker's word comparisons.
+
+    Same as :func:`normalize_arabic_text`, plus the short spelling of
+    Maaliki is expanded to 'مالك'.
+    """
+    return normalize_arabic_text(text).replace('ملك', 'مالك')
+
+def clear_normalization_cache():
+    """Drop all memoized normalizations (e.g. after editing the mapping tables)."""
+    normalize_tajweed_text.cache_clear()
+    normalize_arabic_text.cache_clear()
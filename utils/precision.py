@@ -0,0 +1,122 @@
+# precision.py
+"""
+Numeric precision modes for running the ASR model on CPU.
+
+fp16 matmuls are emulated on most x86 CPUs and usually run slower than
+fp32, so the model can run in one of:
+
+- fp32: full precision, the reference for the other modes
+- bf16: bfloat16 weights, only on CPUs with native bf16 instructions
+  (AVX512-BF16 / AMX on x86, the bf16 feature on ARM)
+- int8: dynamic quantization of every Linear layer (int8 weights,
+  activations quantized on the fly), the rest of the model in fp32
+- fp16: half precision, the previous default, kept for GPUs
+
+The converted model is written to disk once per mode (see save_model), so
+workers load it directly instead of converting or re-quantizing on every
+boot.
+"""
+import json
+
+import torch
+from torch.ao.nn.quantized import dynamic as quantized_dynamic
+
+from .runtime_config import PRECISIONS, resolve_precision  # noqa: F401 (re-exported)
+from .weight_store import save_state_dict, load_state_dict, read_header, assign_weights
+
+# Floating point dtype of the weights that are not quantized
+TORCH_DTYPES = {
+    'fp32': torch.float32,
+    'bf16': torch.bfloat16,
+    'int8': torch.float32,
+    'fp16': torch.float16,
+}
+
+def convert_model(model, precision):
+    """
+    Convert a loaded model to a precision mode, in place.
+
+    Returns:
+        torch.nn.Module: The converted model, in eval mode
+    """
+    model = model.to(TORCH_DTYPES[precision]).eval()
+    if precision == 'int8':
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    return model
+
+def _quantized_linears(model):
+    return {
+        name: module for name, module in model.named_modules()
+        if isinstance(module, quantized_dynamic.Linear)
+    }
+
+def save_model(model, path, precision, metadata=None):
+    """
+    Write a model converted by convert_model to a safetensors file.
+
+    Quantized Linear layers are stored as their int8 weight, scale, zero
+    point and fp32 bias; everything else is stored as is.
+    """
+    quantized = _quantized_linears(model)
+    prefixes = tuple(f'{name}.' for name in quantized)
+    state_dict = {
+        name: tensor for name, tensor in model.state_dict().items()
+        if not (prefixes and name.startswith(prefixes))
+    }
+    for name, module in quantized.items():
+        weight, bias = module.weight(), module.bias()
+        if weight.qscheme() != torch.per_tensor_affine:
+            raise ValueError(f"Unsupported quantization scheme {weight.qscheme()} for {name}")
+        state_dict[f'{name}.weight'] = weight.int_repr()
+        state_dict[f'{name}.weight_scale'] = torch.tensor([weight.q_scale()], dtype=torch.float64)
+        state_dict[f'{name}.weight_zero_point'] = torch.tensor([weight.q_zero_point()], dtype=torch.int64)
+        if bias is not None:
+            state_dict[f'{name}.bias'] = bias.detach()
+
+    save_state_dict(state_dict, path, metadata={
+        **(metadata or {}),
+        'precision': precision,
+        'quantized_linears': json.dumps(sorted(quantized)),
+    })
+
+def load_model(build, path, precision):
+    """
+    Load a model written by save_model.
+
+    The skeleton is built on the meta device and the floating point weights
+    are memory-mapped (see weight_store). Quantized layers are rebuilt from
+    their int8 weights; the quantized kernels repack them, so those layers
+    are private to each worker, at a quarter of their fp32 size.
+
+    Args:
+        build (callable): Takes a torch dtype and constructs the model
+        path (str or Path): File written by save_model
+        precision (str): Mode the file must have been written with
+
+    Raises:
+        ValueError: If the file holds a different precision mode
+    """
+    _, metadata, _ = read_header(path)
+    stored = metadata.get('precision')
+    if stored != precision:
+        raise ValueError(f"{path} holds {stored} weights, not {precision}")
+
+    with torch.device('meta'):
+        model = build(TORCH_DTYPES[precision])
+    state_dict = load_state_dict(path)
+    for name in json.loads(metadata.get('quantized_linears', '[]')):
+        original = model.get_submodule(name)
+        weight = state_dict.pop(f'{name}.weight')
+        scale = float(state_dict.pop(f'{name}.weight_scale')[0])
+        zero_point = int(state_dict.pop(f'{name}.weight_zero_point')[0])
+        bias = state_dict.pop(f'{name}.bias', None)
+
+        layer = quantized_dynamic.Linear(original.in_features, original.out_features,
+                                         bias_=bias is not None, dtype=torch.qint8)
+        qweight = torch._make_per_tensor_quantized_tensor(weight, scale, zero_point)
+        layer.set_weight_bias(qweight, None if bias is None else bias.float())
+        parent_name, _, attr = name.rpartition('.')
+        setattr(model.get_submodule(parent_name), attr, layer)
+    return assign_weights(model, state_dict, source=path)
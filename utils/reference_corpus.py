@@ -0,0 +1,142 @@
+# reference_corpus.py
+"""
+Single source of truth for the reference ayat.
+
+The corpus is compiled once at import: every ayah carries its words,
+their normalized forms and the set of spellings accepted as an exact
+match for each word, and the corpus keeps a hash map from every accepted
+normalized full-ayah string to the ayah id. A transcript that normalizes
+to a reference ayah is identified with a single dict lookup, which lets
+the matcher and the checker skip fuzzy matching for clean recitations.
+"""
+from itertools import islice, product
+
+from .normalization import MADD_WORD_MAPPING, normalize_tajweed_text
+from .similarity import encode_word
+
+# Ayahs of Surah Fatiha: (Uthmani text, simple spelling as produced by ASR)
+FATIHA_AYAT = {
+    0: ("بِسْمِ ٱللَّهِ ٱلرَّحْمَٰنِ ٱلرَّحِيمِ",
+        "بسم الله الرحمن الرحيم"),
+    1: ("ٱلْحَمْدُ لِلَّهِ رَبِّ ٱلْعَٰلَمِينَ",
+        "الحمد لله رب العالمين"),
+    2: ("ٱلرَّحْمَٰنِ ٱلرَّحِيمِ",
+        "الرحمن الرحيم"),
+    3: ("مَٰلِكِ يَوْمِ ٱلدِّينِ",
+        "مالك يوم الدين"),
+    4: ("إِيَّاكَ نَعْبُدُ وَإِيَّاكَ نَسْتَعِينُ",
+        "اياك نعبد واياك نستعين"),
+    5: ("ٱهْدِنَا ٱلصِّرَٰطَ ٱلْمُسْتَقِيمَ",
+        "اهدنا الصراط المستقيم"),
+    6: ("صِرَٰطَ ٱلَّذِينَ أَنْعَمْتَ عَلَيْهِمْ غَيْرِ ٱلْمَغْضُوبِ عَلَيْهِمْ وَلَا ٱلضَّآلِّينَ",
+        "صراط الذين انعمت عليهم غير المغضوب عليهم ولا الضالين"),
+}
+
+# Spellings that can't be handled by normalization alone, keyed by the normalized simple spelling
+WORD_SPELLINGS = {
+    'العالمين': ['العلمين'],  # Handle missing alif case
+}
+
+# Upper bound on full-ayah spellings hashed per ayah
+MAX_AYAH_SPELLINGS = 256
+
+class ReferenceAyah:
+    """
+    One reference ayah with everything the matcher needs precomputed.
+
+    Attributes:
+        id: Ayah identifier (0-based index within Al-Fatiha for FATIHA)
+        text (str): Uthmani text
+        words (list): Uthmani words
+        simple_words (list): Words in simple spelling
+        normalized_words (list): Normalized Uthmani words
+        variants (list): Per word, the frozenset of normalized spellings accepted as exact
+        encoded_words (list): Per word, letter codes for the similarity kernel
+        normalized_text (str): Normalized Uthmani text
+    """
+
+    def __init__(self, ayah_id, text, simple_text=None):
+        self.id = ayah_id
+        self.text = text
+        self.words = text.split()
+        self.simple_words = simple_text.split() if simple_text else list(self.words)
+        self.normalized_words = [normalize_tajweed_text(word) for word in self.words]
+        self.normalized_text = ' '.join(self.normalized_words)
+        simple_words = self.simple_words if len(self.simple_words) == len(self.words) else self.words
+        self.variants = [
+            self._word_variants(word, simple) for word, simple in zip(self.words, simple_words)
+        ]
+        self.encoded_words = [encode_word(word) for word in self.normalized_words]
+
+    @staticmethod
+    def _word_variants(word, simple):
+        norm_simple = normalize_tajweed_text(simple)
+        spellings = {normalize_tajweed_text(word), norm_simple}
+        for variation in MADD_WORD_MAPPING.get(norm_simple, []):
+            spellings.add(normalize_tajweed_text(variation))
+        for variation in WORD_SPELLINGS.get(norm_simple, []):
+            spellings.add(normalize_tajweed_text(variation))
+        spellings.discard('')
+        return frozenset(spellings)
+
+    def spellings(self, limit=MAX_AYAH_SPELLINGS):
+        """Yield accepted normalized spellings of the whole ayah (at most `limit`)."""
+        combos = product(*[sorted(v) for v in self.variants])
+        for combo in islice(combos, limit):
+            yield ' '.join(combo)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __repr__(self):
+        return f"ReferenceAyah({self.id!r}, {self.text!r})"
+
+class ReferenceCorpus:
+    """Reference ayat compiled once, with an exact-match hash map."""
+
+    def __init__(self, ayat):
+        """
+        Args:
+            ayat (dict): Ayah id -> Uthmani text, or (Uthmani text, simple spelling)
+        """
+        self.ayat = {}
+        self._by_text = {}
+        self._exact = {}
+        for ayah_id, texts in ayat.items():
+            text, simple = (texts, None) if isinstance(texts, str) else texts
+            ayah = ReferenceAyah(ayah_id, text, simple)
+            self.ayat[ayah_id] = ayah
+            self._by_text[text] = ayah
+            if simple:
+                self._by_text.setdefault(simple, ayah)
+            # Identical ayat keep the first id
+            for spelling in ayah.spellings():
+                self._exact.setdefault(spelling, ayah_id)
+
+    def __getitem__(self, ayah_id):
+        return self.ayat[ayah_id]
+
+    def __contains__(self, ayah_id):
+        return ayah_id in self.ayat
+
+    def __iter__(self):
+        return iter(self.ayat.values())
+
+    def __len__(self):
+        return len(self.ayat)
+
+    def get(self, ayah_id, default=None):
+        return self.ayat.get(ayah_id, default)
+
+    def exact_match(self, transcript):
+        """Return the id of the ayah the transcript spells exactly, or None."""
+        return self._exact.get(normalize_tajweed_text(transcript))
+
+    def reference_for(self, text):
+        """Return the compiled ayah for a reference text, compiling unknown texts on the fly."""
+        ayah = self._by_text.get(text)
+        if ayah is None:
+            ayah = ReferenceAyah(None, text)
+        return ayah
+
+FATIHA = ReferenceCorpus(FATIHA_AYAT)
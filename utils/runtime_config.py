@@ -0,0 +1,164 @@
+# runtime_config.py
+"""
+ASR run modes chosen from the environment at start-up.
+
+The modes are resolved when app.py is imported, before the model loads,
+so this module imports neither torch nor transformers: the modules that
+implement each mode (precision, constrained_decoding, exported_backend)
+pull those in, and the app imports them on first use.
+
+Environment:
+    ASR_PRECISION: fp32, bf16, int8 or fp16 (see precision.py)
+    ASR_DECODING: free or constrained (see constrained_decoding.py)
+    ASR_BACKEND: eager, torchscript or onnx (see exported_backend.py)
+    ASR_CONSTRAINT_PENALTY, ASR_CONSTRAINT_MISSES: constrained decoding knobs
+    ASR_ENCODER_BUCKETS: encoder lengths in seconds (see encoder_buckets.py)
+
+resolve_settings reads them all into one RuntimeSettings; anything that
+can change a transcript belongs there, since the transcription cache is
+keyed on its fingerprint.
+"""
+import importlib.util
+import os
+from collections import namedtuple
+
+from .encoder_buckets import parse_buckets
+from .log_config import get_logger
+
+logger = get_logger('asr')
+
+PRECISIONS = ('fp32', 'bf16', 'int8', 'fp16')
+DEFAULT_PRECISION = 'fp32'
+
+DECODING_MODES = ('free', 'constrained')
+DEFAULT_DECODING = 'free'
+
+BACKENDS = ('eager', 'torchscript', 'onnx')
+DEFAULT_BACKEND = 'eager'
+# Bump when the exported graphs or export.json change incompatibly; the app's default export path includes it
+EXPORT_FORMAT = 1
+
+# Logit penalty on tokens that leave the reference; inf makes the constraint hard
+DEFAULT_CONSTRAINT_PENALTY = 5.0
+# Off-reference tokens (and resyncs) allowed before end-of-text is forced
+DEFAULT_CONSTRAINT_MISSES = 8
+
+# Every setting that can change what the model transcribes
+RuntimeSettings = namedtuple('RuntimeSettings', ['precision', 'decoding', 'constraint_penalty',
+                                                 'constraint_misses', 'backend', 'encoder_buckets'])
+
+# /proc/cpuinfo flags that mean bf16 math runs natively
+BF16_CPU_FLAGS = {'avx512_bf16', 'amx_bf16', 'bf16'}
+
+def cpu_supports_bf16(cpuinfo_path='/proc/cpuinfo'):
+    """Whether the CPU advertises native bfloat16 instructions."""
+    try:
+        with open(cpuinfo_path) as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key.strip() in ('flags', 'Features'):
+                    return bool(BF16_CPU_FLAGS & set(value.split()))
+    except OSError:
+        pass
+    return False
+
+def resolve_precision(requested=None, environ=None):
+    """
+    Pick the precision mode to run with.
+
+    Args:
+        requested (str): Mode name; defaults to the ASR_PRECISION environment
+            variable, then to fp32
+        environ (dict): Environment to read instead of os.environ
+
+    Returns:
+        str: A mode from PRECISIONS; bf16 falls back to fp32 on CPUs
+        without native bf16 support
+
+    Raises:
+        ValueError: If the mode is not one of PRECISIONS
+    """
+    environ = os.environ if environ is None else environ
+    precision = (requested or environ.get('ASR_PRECISION') or DEFAULT_PRECISION).lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}; expected one of {', '.join(PRECISIONS)}")
+    if precision == 'bf16' and not cpu_supports_bf16():
+        logger.warning("CPU has no native bf16 support, using fp32 instead")
+        return 'fp32'
+    return precision
+
+def resolve_decoding(requested=None, environ=None):
+    """
+    Pick the decoding mode to run with.
+
+    Args:
+        requested (str): Mode name; defaults to the ASR_DECODING environment
+            variable, then to free
+        environ (dict): Environment to read instead of os.environ
+
+    Raises:
+        ValueError: If the mode is not one of DECODING_MODES
+    """
+    environ = os.environ if environ is None else environ
+    mode = (requested or environ.get('ASR_DECODING') or DEFAULT_DECODING).lower()
+    if mode not in DECODING_MODES:
+        raise ValueError(f"Unknown decoding mode {mode!r}; expected one of {', '.join(DECODING_MODES)}")
+    return mode
+
+def resolve_backend(requested=None, environ=None, precision=None):
+    """
+    Pick the inference backend to run with.
+
+    Args:
+        requested (str): Backend name; defaults to the ASR_BACKEND environment
+            variable, then to eager
+        environ (dict): Environment to read instead of os.environ
+        precision (str): Resolved precision mode, if known
+
+    Returns:
+        str: A backend from BACKENDS; onnx falls back to eager when
+        onnxruntime is not installed or the precision mode is not fp32
+
+    Raises:
+        ValueError: If the backend is not one of BACKENDS
+    """
+    environ = os.environ if environ is None else environ
+    backend = (requested or environ.get('ASR_BACKEND') or DEFAULT_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    if backend == 'onnx' and importlib.util.find_spec('onnxruntime') is None:
+        logger.warning("onnxruntime is not installed, using the eager backend instead")
+        return 'eager'
+    if backend == 'onnx' and precision not in (None, 'fp32'):
+        # Checked here rather than at export, so a bad combination cannot fail every boot
+        logger.warning("The onnx backend needs fp32, not %s; using the eager backend instead", precision)
+        return 'eager'
+    return backend
+
+def resolve_settings(environ=None):
+    """
+    Resolve every run setting from the environment.
+
+    Args:
+        environ (dict): Environment to read instead of os.environ
+
+    Returns:
+        RuntimeSettings
+
+    Raises:
+        ValueError: If a setting has an invalid value
+    """
+    environ = os.environ if environ is None else environ
+    precision = resolve_precision(environ=environ)
+    return RuntimeSettings(
+        precision=precision,
+        decoding=resolve_decoding(environ=environ),
+        constraint_penalty=float(environ.get('ASR_CONSTRAINT_PENALTY', DEFAULT_CONSTRAINT_PENALTY)),
+        constraint_misses=int(environ.get('ASR_CONSTRAINT_MISSES', DEFAULT_CONSTRAINT_MISSES)),
+        backend=resolve_backend(environ=environ, precision=precision),
+        encoder_buckets=parse_buckets(environ.get('ASR_ENCODER_BUCKETS', '')),
+    )
+
+def settings_fingerprint(settings):
+    """Stable text naming every field of a RuntimeSettings, for cache keys."""
+    return ';'.join(f'{name}={value}' for name, value in settings._asdict().items())
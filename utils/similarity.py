@@ -0,0 +1,224 @@
+# similarity.py
+"""
+Bounded edit-distance similarity kernel for normalized Arabic words.
+
+Words are encoded once into compact uint8 letter codes and compared with a
+weighted Levenshtein distance: insertions and deletions cost 1, a
+substitution costs 2 (the same as delete + insert) and a substitution
+between phonetically confusable letters (see PHONETIC_MAPPING) costs 1/2.
+The resulting ratio ``1 - distance / (len(a) + len(b))`` is the classic
+indel similarity, so it lines up with SequenceMatcher's ``2 * M / T`` scale,
+with the phonetic confusions priced in instead of enumerated as variant
+strings.
+
+The DP is bounded by the caller's cutoff and stops as soon as a whole row
+exceeds the allowed distance. It is compiled with Numba when available, on
+first use rather than at import, since importing Numba alone takes a
+noticeable part of the app's start-up.
+"""
+import threading
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+from .normalization import PHONETIC_MAPPING, normalize_arabic_text
+
+# Costs are integers in half-letter units so the kernel never touches floats
+INDEL_COST = 2
+SUBSTITUTION_COST = 4
+PHONETIC_SUBSTITUTION_COST = 1
+
+ALPHABET_SIZE = 256
+ENCODE_CACHE_SIZE = 32768
+
+def _letter_code(ch):
+    """Arabic block letters keep their offset in the block, anything else maps to 0."""
+    code = ord(ch) - 0x0600
+    return code if 0 < code < ALPHABET_SIZE else 0
+
+def _confusable_pairs(mapping):
+    """Letter pairs that PHONETIC_MAPPING can render as the same symbol.
+
+    Two normalized letters are confusable when one maps to the other, or
+    both map to a common variant (e.g. ا and ي both have the ى variant).
+    """
+    renderings = {}
+    for letter, variants in mapping.items():
+        renderings.setdefault(letter, {letter}).update(v for v in variants if len(v) == 1)
+    letters = {
+        ch for ch in set(renderings) | {v for forms in renderings.values() for v in forms}
+        if normalize_arabic_text(ch) == ch
+    }
+    pairs = set()
+    for x, y in combinations(sorted(letters), 2):
+        if renderings.get(x, {x}) & renderings.get(y, {y}):
+            pairs.add((x, y))
+    return pairs
+
+def _build_cost_table(pairs):
+    """Flat ALPHABET_SIZE x ALPHABET_SIZE substitution cost table."""
+    costs = np.full((ALPHABET_SIZE, ALPHABET_SIZE), SUBSTITUTION_COST, dtype=np.int32)
+    np.fill_diagonal(costs, 0)
+    for x, y in pairs:
+        cx, cy = _letter_code(x), _letter_code(y)
+        costs[cx, cy] = costs[cy, cx] = PHONETIC_SUBSTITUTION_COST
+    return costs.ravel()
+
+CONFUSABLE_LETTERS = frozenset(_confusable_pairs(PHONETIC_MAPPING))
+SUBSTITUTION_COSTS = _build_cost_table(CONFUSABLE_LETTERS)
+
+def _bounded_distance(a, b, costs, max_dist):
+    """Weighted edit distance between code sequences a and b.
+
+    Returns max_dist + 1 as soon as the distance is known to exceed max_dist.
+    """
+    la = len(a)
+    lb = len(b)
+    prev = [j * INDEL_COST for j in range(lb + 1)]
+    cur = [0] * (lb + 1)
+    for i in range(1, la + 1):
+        cur[0] = i * INDEL_COST
+        row_min = cur[0]
+        row = a[i - 1] * ALPHABET_SIZE
+        for j in range(1, lb + 1):
+            best = prev[j - 1] + costs[row + b[j - 1]]
+            deletion = prev[j] + INDEL_COST
+            if deletion < best:
+                best = deletion
+            insertion = cur[j - 1] + INDEL_COST
+            if insertion < best:
+                best = insertion
+            cur[j] = best
+            if best < row_min:
+                row_min = best
+        if row_min > max_dist:
+            return max_dist + 1
+        prev, cur = cur, prev
+    return prev[lb]
+
+def _python_distance(a, b, costs, max_dist):
+    return _bounded_distance(a.tolist(), b.tolist(), costs, max_dist)
+
+def _pairwise_distances(codes_a, offsets_a, codes_b, offsets_b, costs, limits):
+    """Bounded distance between every word of a and every word of b.
+
+    Words are slices of the flat code arrays delimited by their offsets;
+    pairs whose length difference alone exceeds the limit are not scored.
+    """
+    n = len(offsets_a) - 1
+    m = len(offsets_b) - 1
+    out = np.empty((n, m), dtype=np.int32)
+    for i in range(n):
+        a = codes_a[offsets_a[i]:offsets_a[i + 1]]
+        for j in range(m):
+            b = codes_b[offsets_b[j]:offsets_b[j + 1]]
+            limit = limits[i, j]
+            if abs(len(a) - len(b)) * INDEL_COST > limit:
+                out[i, j] = limit + 1
+            else:
+                out[i, j] = _distance_kernel(a, b, costs, limit)
+    return out
+
+# Set by compile_kernels on first use
+_distance_kernel = _pairwise_kernel = _KERNEL_COSTS = None
+_compile_lock = threading.Lock()
+
+def compile_kernels():
+    """Compile the distance kernels with Numba (or fall back to Python); idempotent."""
+    global _distance_kernel, _pairwise_kernel, _KERNEL_COSTS
+    with _compile_lock:
+        if _KERNEL_COSTS is not None:
+            return
+        try:
+            from numba import njit
+        except ImportError:  # pragma: no cover - numba is listed in requirements.txt
+            _distance_kernel, _pairwise_kernel = _python_distance, _pairwise_distances
+            _KERNEL_COSTS = SUBSTITUTION_COSTS.tolist()
+            return
+        # The pairwise kernel calls _distance_kernel, so it must be compiled first
+        _distance_kernel = njit(cache=True, nogil=True)(_bounded_distance)
+        _pairwise_kernel = njit(cache=True, nogil=True)(_pairwise_distances)
+        _KERNEL_COSTS = SUBSTITUTION_COSTS
+
+@lru_cache(maxsize=ENCODE_CACHE_SIZE)
+def encode_word(word):
+    """Encode an already normalized word as a read-only uint8 array of letter codes."""
+    return np.frombuffer(bytes(_letter_code(ch) for ch in word), dtype=np.uint8)
+
+def max_distance(len_a, len_b, cutoff):
+    """Largest distance (in kernel units) that still reaches a ratio of `cutoff`."""
+    return int((1.0 - cutoff) * INDEL_COST * (len_a + len_b) + 1e-9)
+
+def encoded_ratio(a, b, cutoff=0.0):
+    """
+    Similarity ratio between two encoded words.
+
+    Args:
+        a, b (np.ndarray): Letter codes from encode_word
+        cutoff (float): Scores below this are reported as 0.0, which lets
+            the kernel stop early
+
+    Returns:
+        float: Ratio in [0, 1]
+    """
+    len_a, len_b = len(a), len(b)
+    total = len_a + len_b
+    if total == 0:
+        return 1.0
+    limit = int((1.0 - cutoff) * INDEL_COST * total + 1e-9)
+    if abs(len_a - len_b) * INDEL_COST > limit:
+        return 0.0
+    if _KERNEL_COSTS is None:
+        compile_kernels()
+    distance = _distance_kernel(a, b, _KERNEL_COSTS, limit)
+    if distance > limit:
+        return 0.0
+    return 1.0 - distance / (INDEL_COST * total)
+
+def phonetic_ratio(a_norm, b_norm, cutoff=0.0):
+    """Similarity ratio between two normalized words (see encoded_ratio)."""
+    if a_norm == b_norm:
+        return 1.0
+    return encoded_ratio(encode_word(a_norm), encode_word(b_norm), cutoff)
+
+def encode_words(words):
+    """
+    Encode normalized words into one flat code array.
+
+    Returns:
+        tuple: (codes, offsets) where word i is codes[offsets[i]:offsets[i + 1]]
+    """
+    encoded = [encode_word(word) for word in words]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)).cumsum()
+    codes = np.concatenate(encoded) if encoded else np.empty(0, dtype=np.uint8)
+    return codes, offsets
+
+def ratio_matrix(words_a, words_b, cutoff=0.0):
+    """
+    Similarity ratio between every pair of normalized words in one call.
+
+    Each word is encoded once, however many comparisons it takes part in,
+    and all pairs are scored by a single compiled loop.
+
+    Args:
+        words_a, words_b (list): Normalized words
+        cutoff (float): Scores below this are reported as 0.0
+
+    Returns:
+        np.ndarray: float64 matrix of shape (len(words_a), len(words_b))
+    """
+    codes_a, offsets_a = encode_words(words_a)
+    codes_b, offsets_b = encode_words(words_b)
+    totals = np.add.outer(offsets_a[1:] - offsets_a[:-1], offsets_b[1:] - offsets_b[:-1])
+    if not totals.size:
+        return np.zeros(totals.shape)
+    limits = ((1.0 - cutoff) * INDEL_COST * totals + 1e-9).astype(np.int64)
+    if _KERNEL_COSTS is None:
+        compile_kernels()
+    distances = _pairwise_kernel(codes_a, offsets_a, codes_b, offsets_b, _KERNEL_COSTS, limits)
+    # Two empty words have distance 0 and score 1.0
+    ratios = 1.0 - distances / (INDEL_COST * np.maximum(totals, 1))
+    ratios[distances > limits] = 0.0
+    return ratios
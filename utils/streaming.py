@@ -0,0 +1,131 @@
+# streaming.py
+"""
+Incremental transcription of a live recording.
+
+Audio arrives in small chunks. Every STREAM_UPDATE_SECONDS of new audio the
+open segment (the audio not yet committed) is decoded again and a partial
+transcript is produced. Once the segment grows past STREAM_SEGMENT_SECONDS
+it is cut at a pause (see long_form.split_windows): the text before the
+cut is committed and its audio dropped. Each update therefore decodes at
+most two windows of bounded length, however long the recitation runs,
+and after the last chunk only the open segment is left to decode.
+
+Audio is kept in a fixed-size ring buffer (see audio_stream), which only
+ever needs to hold the open segment.
+"""
+import os
+
+import numpy as np
+
+from .audio_io import AudioClip, TARGET_SAMPLE_RATE
+from .audio_stream import AudioRingBuffer, STREAM_BUFFER_SECONDS
+from .long_form import split_windows, merge_transcripts, Window
+from .text_matcher import RecitationTracker
+
+STREAM_UPDATE_SECONDS = float(os.environ.get('WS_PARTIAL_INTERVAL', 2.0))
+STREAM_SEGMENT_SECONDS = float(os.environ.get('WS_SEGMENT_SECONDS', 15.0))
+
+class StreamingTranscriber:
+    """
+    Turn a stream of audio chunks into partial transcripts.
+
+    Args:
+        transcribe (callable): Takes a list of AudioClips and returns their
+            transcripts; the clips of one update are passed together so they
+            can share a batch
+        update_seconds (float): New audio that triggers a partial decode
+        segment_seconds (float): Longest stretch of audio decoded at once
+        sample_rate (int): Sample rate of the chunks
+        buffer_seconds (float): Audio held in memory; at least
+            segment_seconds + update_seconds
+    """
+
+    def __init__(self, transcribe, update_seconds=STREAM_UPDATE_SECONDS,
+                 segment_seconds=STREAM_SEGMENT_SECONDS, sample_rate=TARGET_SAMPLE_RATE,
+                 buffer_seconds=STREAM_BUFFER_SECONDS):
+        if segment_seconds <= update_seconds:
+            raise ValueError("segment_seconds must be longer than update_seconds")
+        if buffer_seconds < segment_seconds + update_seconds:
+            raise ValueError("buffer_seconds must hold segment_seconds + update_seconds of audio")
+        self.transcribe = transcribe
+        self.update_samples = int(update_seconds * sample_rate)
+        self.segment_seconds = segment_seconds
+        self.sample_rate = sample_rate
+        self.tracker = RecitationTracker()
+        self.committed_text = ''
+        self.segment_text = ''
+        self.buffer = AudioRingBuffer(int(buffer_seconds * sample_rate))
+        # Where the open segment starts in the stream, and whether it overlaps the committed audio
+        self._segment_start = 0
+        self._overlap = False
+        self._undecoded = 0
+        self.decodes = 0
+
+    @property
+    def total_samples(self):
+        return self.buffer.written
+
+    @property
+    def transcript(self):
+        """Committed text followed by the latest decode of the open segment."""
+        return merge_transcripts([self.committed_text, self.segment_text],
+                                 [Window(0, 0, False), Window(0, 0, self._overlap)])
+
+    def add(self, samples):
+        """
+        Append a chunk of mono float32 samples.
+
+        Returns:
+            dict: A partial result (see result) when the chunk completed an
+            update interval, otherwise None
+        """
+        samples = np.asarray(samples, dtype=np.float32)
+        update = None
+        # A long chunk is taken an update interval at a time, so the open segment never outgrows the buffer
+        while len(samples):
+            take = min(len(samples), self.update_samples - self._undecoded)
+            self.buffer.write(samples[:take])
+            self._undecoded += take
+            samples = samples[take:]
+            if self._undecoded >= self.update_samples:
+                self._decode()
+                update = self.result(final=False)
+        return update
+
+    def finish(self):
+        """Decode whatever audio arrived since the last update and return the final result."""
+        if self._undecoded:
+            self._decode()
+        return self.result(final=True)
+
+    def result(self, final):
+        """The transcript so far and the ayah/word it has reached."""
+        text = self.transcript
+        ayah_number, word_index = self.tracker.sync(text)
+        return {
+            'text': text,
+            'ayah_number': ayah_number,
+            'word_index': word_index,
+            'final': final,
+            'audio_seconds': round(self.total_samples / self.sample_rate, 2),
+        }
+
+    def _decode(self):
+        clip = AudioClip(self.buffer.read(self._segment_start), self.sample_rate)
+        windows = split_windows(clip, self.segment_seconds)
+        texts = self.transcribe([clip.segment(window.start, window.end) for window in windows])
+        self.decodes += len(windows)
+
+        # Everything but the last window is final: commit its text and drop its audio. split_windows
+        # only cuts in the second half of a window, so a committed window is never a sliver of silence
+        # whose text would be a hallucination
+        for text, window in zip(texts[:-1], windows[:-1]):
+            overlap = self._overlap if window is windows[0] else window.overlap
+            self.committed_text = merge_transcripts([self.committed_text, text],
+                                                    [Window(0, 0, False), Window(0, 0, overlap)])
+        last = windows[-1]
+        self._segment_start += last.start
+        if len(windows) > 1:
+            self._overlap = last.overlap
+        self.segment_text = texts[-1]
+        self._undecoded = 0
@@ -1,86 +1,46 @@
 # tajweed_checker.py
-from .text_matcher import similar, normalize_arabic_text as text_matcher_normalize
-from difflib import SequenceMatcher
-import re
-from flask import current_app
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .text_matcher import match_ayah_and_word
+from .normalization import normalize_tajweed_text as normalize_arabic_text
+from .reference_corpus import FATIHA
+from .similarity import phonetic_ratio
+from .alignment import align_words, align_transcript, SUBSTITUTION, OMISSION
+from .cache import ResultCache
+from .log_config import get_logger
+
+DEFAULT_LOGGER = get_logger('checker')
+
+# Pairs sent to a worker process at a time by analyze_ayah_parallel
+PARALLEL_CHUNK_SIZE = 256
 
 ARABIC_MADD_LETTERS = ['ا', 'و', 'ي']
 
-# Ayahs of Surah Fatiha with their word-by-word breakdown
+# Ayahs of Surah Fatiha with their word-by-word breakdown, derived from the reference corpus
 SURAH_FATIHA = {
-    0: {
-        'text': "بِسْمِ ٱللَّهِ ٱلرَّحْمَٰنِ ٱلرَّحِيمِ",
-        'key_words': ['بسم', 'الله', 'الرحمن', 'الرحيم']
-    },
-    1: {
-        'text': "ٱلْحَمْدُ لِلَّهِ رَبِّ ٱلْعَٰلَمِينَ",
-        'key_words': ['الحمد', 'لله', 'رب', 'العالمين']
-    },
-    2: {
-        'text': "ٱلرَّحْمَٰنِ ٱلرَّحِيمِ",
-        'key_words': ['الرحمن', 'الرحيم']
-    },
-    3: {
-        'text': "مَٰلِكِ يَوْمِ ٱلدِّينِ",
-        'key_words': ['مٰلك', 'مالك', 'يوم', 'الدين']
-    },
-    4: {
-        'text': "إِيَّاكَ نَعْبُدُ وَإِيَّاكَ نَسْتَعِينُ",
-        'key_words': ['إياك', 'نعبد', 'وإياك', 'نستعين']
-    },
-    5: {
-        'text': "ٱهْدِنَا ٱلصِّرَٰطَ ٱلْمُسْتَقِيمَ",
-        'key_words': ['اهدنا', 'الصراط', 'المستقيم']
-    },
-    6: {
-        'text': "صِرَٰطَ ٱلَّذِينَ أَنْعَمْتَ عَلَيْهِمْ غَيْرِ ٱلْمَغْضُوبِ عَلَيْهِمْ وَلَا ٱلضَّآلِّينَ",
-        'key_words': ['صراط', 'الذين', 'أنعمت', 'عليهم', 'غير', 'المغضوب', 'عليهم', 'ولا', 'الضالين']
+    ayah.id: {
+        'text': ayah.text,
+        'key_words': ayah.simple_words
     }
+    for ayah in FATIHA
 }
 
-def normalize_arabic_text(text):
-    """Remove diacritics and normalize Arabic text for comparison."""
-    # First normalize using text_matcher's normalization
-    text = text_matcher_normalize(text)
-    
-    # Special case for مَٰلِكِ and مَالِكِ
-    text = re.sub('مَٰلِكِ|مَالِكِ|ملك|مٰلك', 'مالك', text)
-    
-    # Normalize all forms of madd and alif
-    text = re.sub('[آٱأإاٰ]', 'ا', text)  # Normalize all alif forms including madd
-    text = re.sub('ـٰ', '', text)         # Remove standalone madd symbol
-    text = re.sub('ٰ', '', text)          # Remove superscript alif
-    
-    # Remove additional diacritical marks that might affect comparison
-    text = re.sub('[\u064B-\u0652]', '', text)  # Remove all tashkeel (diacritics)
-    text = re.sub('ـ', '', text)                # Remove tatweel (elongation)
-    
-    # Normalize other common variations
-    text = re.sub('ى', 'ي', text)    # Normalize alif maqsura to ya
-    text = re.sub('ة', 'ه', text)    # Normalize taa marbouta to haa
-    
-    # Remove any non-Arabic characters and extra spaces
-    text = re.sub(r'[^\u0600-\u06FF\s]', '', text)
-    return ' '.join(text.split())
+BASIC_CHECK_PASSED = "✅ Basic pronunciation check passed! Note: Detailed Tajweed rules like Madd duration, Ghunnah, Qalqalah, and Idghaam cannot be automatically verified."
 
-def check_word_presence(expected_words, actual_text):
+def check_word_presence(expected_words, actual_text, alignment=None):
     """Check if all expected words are present in the recitation."""
     feedback = []
     
-    # Normalize the actual text
-    normalized_actual = normalize_arabic_text(actual_text)
-    actual_words = set(normalized_actual.split())
-    
-    # Normalize expected words
-    normalized_expected = [normalize_arabic_text(word) for word in expected_words]
+    # Align once unless the caller already did
+    if alignment is None:
+        normalized_expected = [normalize_arabic_text(word) for word in expected_words]
+        actual_words = [w for w in normalize_arabic_text(actual_text).split() if w]
+        alignment = align_words(normalized_expected, actual_words)
     
-    # Check for missing words (with more lenient matching)
-    missing_words = []
-    for i, word in enumerate(normalized_expected):
-        if not any(similar(word, actual_word) > 0.7 for actual_word in actual_words):  # More lenient threshold
-            # Double check with phonetic similarity before marking as missing
-            if not any(is_phonetically_similar(word, actual_word) for actual_word in actual_words):
-                missing_words.append(expected_words[i])
+    # Words that were skipped or aligned to something dissimilar (lenient threshold)
+    missing_words = [expected_words[i] for i in alignment.missing_ref_indices()]
     
     if missing_words:
         if len(missing_words) == len(expected_words):
@@ -96,21 +56,17 @@ def check_word_presence(expected_words, actual_text):
     
     return feedback
 
-def check_extra_content(expected_text, actual_text):
+def check_extra_content(expected_text, actual_text, alignment=None):
     """Check for any unexpected additional content in the recitation."""
     feedback = []
-    normalized_expected = normalize_arabic_text(expected_text)
-    normalized_actual = normalize_arabic_text(actual_text)
     
-    # Split into words
-    expected_words = set(normalized_expected.split())
-    actual_words = set(normalized_actual.split())
+    if alignment is None:
+        expected_words = [w for w in normalize_arabic_text(expected_text).split() if w]
+        actual_words = [w for w in normalize_arabic_text(actual_text).split() if w]
+        alignment = align_words(expected_words, actual_words)
     
-    # Find extra words
-    extra_words = set()
-    for word in actual_words:
-        if not any(similar(word, expected) > 0.8 for expected in expected_words):
-            extra_words.add(word)
+    # Transcript words with no counterpart in the expected text
+    extra_words = list(dict.fromkeys(alignment.trans_words[pair.trans_index] for pair in alignment.insertions))
     
     if extra_words:
         if len(extra_words) > 3:
@@ -132,96 +88,77 @@ def get_word_similarity(word1, word2):
     word1 = normalize_arabic_text(word1)
     word2 = normalize_arabic_text(word2)
     
-    # Use SequenceMatcher to get similarity ratio
-    return SequenceMatcher(None, word1, word2).ratio()
+    # Same ratio scale as SequenceMatcher, with phonetic confusions priced in
+    return phonetic_ratio(word1, word2)
 
 def is_phonetically_similar(word1, word2, threshold=0.8):
     """Check if two words are phonetically similar."""
     # For now, just use text similarity
     return get_word_similarity(word1, word2) > threshold
 
-def analyze_mistakes(transcribed_text, expected_text):
+def analyze_mistakes(transcribed_text, expected_text, alignment=None):
     """
     Analyze mistakes in the recitation based on ASR output.
+
+    Substitutions and omissions come from a word alignment, so a skipped or
+    extra word does not shift the comparison of every word after it.
     """
     mistakes = []
     
-    # Tokenize both texts
-    trans_words = transcribed_text.split()
-    ref_words = expected_text.split()
-    
-    # Track processed words to avoid duplicate flags
-    processed_words = set()
-    
-    # Special cases for common variations that can't be handled by normalization alone
-    special_variations = {
-        'العالمين': ['العالمين', 'العلمين'],  # Handle missing alif case
-        'الرحمن': ['الرحمن'],
-        'الرحيم': ['الرحيم']
-    }
-    
-    # 1. Word Substitution and Mispronunciation
-    for i, ref_word in enumerate(ref_words):
-        if i < len(trans_words):
-            trans_word = trans_words[i]
-            norm_trans = normalize_arabic_text(trans_word)
-            norm_ref = normalize_arabic_text(ref_word)
-            
-            # Check if this is a special case word
-            is_special_match = False
-            for base_word, variations in special_variations.items():
-                if any(normalize_arabic_text(var) == norm_ref for var in variations) and \
-                   any(normalize_arabic_text(var) == norm_trans for var in variations):
-                    is_special_match = True
-                    break
-            
-            if is_special_match:
-                continue  # Skip further checks for this word
-            
-            # Regular word comparison
-            if norm_trans != norm_ref and not is_phonetically_similar(trans_word, ref_word, 0.8):
-                mistakes.append({
-                    "word": ref_word,
-                    "type": "substitution",
-                    "message": f"Mispronounced '{ref_word}' as '{trans_word}'",
-                    "severity": "critical",
-                    "position": i
-                })
-                processed_words.add(trans_word)
-    
-    # 2. Word Omission (with special case handling)
-    ref_set = set(normalize_arabic_text(w) for w in ref_words)
-    trans_set = set(normalize_arabic_text(w) for w in trans_words)
+    # Reference words come precompiled from the corpus
+    reference = FATIHA.reference_for(expected_text)
+    ref_words = reference.words
+    if alignment is None:
+        alignment = align_transcript(reference, transcribed_text)
     
-    for word in ref_words:
-        norm_word = normalize_arabic_text(word)
-        # Check if the word or any of its variations are present
-        is_present = False
-        for variations in special_variations.values():
-            if any(normalize_arabic_text(var) in trans_set for var in variations):
-                is_present = True
-                break
-        
-        if not is_present and norm_word not in trans_set:
-            position = ref_words.index(word)
+    for pair in alignment.pairs:
+        # 1. Word Substitution and Mispronunciation
+        if pair.op == SUBSTITUTION:
+            ref_word = ref_words[pair.ref_index]
+            trans_word = alignment.trans_tokens[pair.trans_index]
+            mistakes.append({
+                "word": ref_word,
+                "type": "substitution",
+                "message": f"Mispronounced '{ref_word}' as '{trans_word}'",
+                "severity": "critical",
+                "position": pair.ref_index
+            })
+        # 2. Word Omission
+        elif pair.op == OMISSION:
+            word = ref_words[pair.ref_index]
             mistakes.append({
                 "word": word,
                 "type": "omission",
                 "message": f"You skipped the word '{word}'. Make sure to recite every word.",
                 "severity": "critical",
-                "position": position
+                "position": pair.ref_index
             })
     
     return mistakes
 
-def analyze_ayah(ayah_number: int, user_transcript: str):
+def analyze_ayah(ayah_number: int, user_transcript: str, logger=None):
     """
     Analyze a recited ayah focusing on what can be reliably detected.
+
+    Args:
+        ayah_number (int): 0-based ayah number
+        user_transcript (str): Transcribed recitation
+        logger (logging.Logger): Receives debug messages, defaults to the 'checker' subsystem logger
     """
+    logger = logger or DEFAULT_LOGGER
+
+    # Fast path: an exact spelling of the expected ayah needs no fuzzy matching
+    if FATIHA.exact_match(user_transcript) == ayah_number:
+        return [{
+            'type': 'success',
+            'message': BASIC_CHECK_PASSED
+        }]
+
     # Debug logging
-    current_app.logger.info(f"\nDEBUG: Analyzing ayah {ayah_number}")
-    current_app.logger.info(f"DEBUG: Raw transcript: '{user_transcript}'")
-    current_app.logger.info(f"DEBUG: Normalized transcript: '{normalize_arabic_text(user_transcript)}'")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Analyzing ayah %s", ayah_number)
+        logger.debug("Raw transcript: '%s'", user_transcript)
+        logger.debug("Normalized transcript: '%s'", normalize_arabic_text(user_transcript))
 
     ayah_data = SURAH_FATIHA.get(ayah_number)
     if not ayah_data:
@@ -240,12 +177,12 @@ def analyze_ayah(ayah_number: int, user_transcript: str):
         expected = normalize_arabic_text("الرحمن الرحيم")
         expected_words = [w for w in expected.split() if w]
         
-        current_app.logger.info(f"DEBUG: User words: {user_words}")
-        current_app.logger.info(f"DEBUG: Expected words: {expected_words}")
+        logger.debug("User words: %s", user_words)
+        logger.debug("Expected words: %s", expected_words)
         
         # Check if we have exactly the right number of words
         if len(user_words) != len(expected_words):
-            current_app.logger.info(f"DEBUG: Word count mismatch - got {len(user_words)}, expected {len(expected_words)}")
+            logger.debug("Word count mismatch - got %d, expected %d", len(user_words), len(expected_words))
             return [{
                 'type': 'wrong_ayah',
                 'message': "⚠️ For this ayah, recite only 'Ar-Rahmanir-Raheem' (الرحمن الرحيم)."
@@ -258,8 +195,8 @@ def analyze_ayah(ayah_number: int, user_transcript: str):
             direct_match = user_word == expected_word
             phonetic_match = is_phonetically_similar(user_word, expected_word, 0.7)  # More lenient threshold
             
-            current_app.logger.info(f"DEBUG: Comparing '{user_word}' with '{expected_word}'")
-            current_app.logger.info(f"DEBUG: Direct match: {direct_match}, Phonetic match: {phonetic_match}")
+            logger.debug("Comparing '%s' with '%s'", user_word, expected_word)
+            logger.debug("Direct match: %s, Phonetic match: %s", direct_match, phonetic_match)
             
             if not direct_match and not phonetic_match:
                 mistakes.append({
@@ -273,7 +210,7 @@ def analyze_ayah(ayah_number: int, user_transcript: str):
         if not mistakes:
             return [{
                 'type': 'success',
-                'message': "✅ Basic pronunciation check passed! Note: Detailed Tajweed rules like Madd duration, Ghunnah, Qalqalah, and Idghaam cannot be automatically verified."
+                'message': BASIC_CHECK_PASSED
             }]
         
         # Add disclaimer about limitations
@@ -284,22 +221,34 @@ def analyze_ayah(ayah_number: int, user_transcript: str):
         
         return mistakes
 
-    # For other ayahs, use the regular analysis
-    mistakes = analyze_mistakes(user_transcript, ayah_data['text'])
+    # For other ayahs, align once and derive every check from the alignment
+    reference = FATIHA.reference_for(ayah_data['text'])
+    alignment = align_transcript(reference, user_transcript)
     
-    if not mistakes:
-        return [{
-            'type': 'success',
-            'message': "✅ Basic pronunciation check passed! Note: Detailed Tajweed rules like Madd duration, Ghunnah, Qalqalah, and Idghaam cannot be automatically verified."
-        }]
+    presence = check_word_presence(ayah_data['key_words'], user_transcript, alignment)
+    missing = set(alignment.missing_ref_indices())
+    if len(missing) == len(reference.words):
+        return presence
+    
+    # Words already reported as missing are not repeated as mispronunciations
+    mistakes = [
+        mistake for mistake in analyze_mistakes(user_transcript, ayah_data['text'], alignment)
+        if mistake['position'] not in missing
+    ]
     
-    # Convert mistakes to feedback format
-    issues = []
+    issues = list(presence)
     for mistake in mistakes:
         issues.append({
             'type': mistake['type'],
             'message': f"⚠️ {mistake['message']}"
         })
+    issues.extend(check_extra_content(ayah_data['text'], user_transcript, alignment))
+    
+    if not issues:
+        return [{
+            'type': 'success',
+            'message': BASIC_CHECK_PASSED
+        }]
     
     # Add disclaimer about limitations
     issues.append({
@@ -309,6 +258,100 @@ def analyze_ayah(ayah_number: int, user_transcript: str):
     
     return issues
 
+def analyze_ayah_batch(items, logger=None):
+    """
+    analyze_ayah for many recitations, e.g. a whole evaluation set.
+
+    Repeated (ayah, transcript) pairs are analyzed once.
+
+    Args:
+        items (iterable): (ayah_number, user_transcript) pairs
+        logger (logging.Logger): Passed on to analyze_ayah
+
+    Returns:
+        list: Feedback lists in input order
+    """
+    results = {}
+    feedback = []
+    for ayah_number, user_transcript in items:
+        key = (ayah_number, user_transcript)
+        if key not in results:
+            results[key] = analyze_ayah(ayah_number, user_transcript, logger)
+        feedback.append(results[key])
+    return feedback
+
+def analyze_ayah_parallel(items, max_workers=None, chunksize=PARALLEL_CHUNK_SIZE):
+    """
+    analyze_ayah_batch spread over a process pool, for CPU-bound bulk re-analysis.
+
+    Distinct pairs are split into chunks of `chunksize` and analyzed in
+    worker processes, which log to the 'checker' subsystem logger.
+
+    Args:
+        items (iterable): (ayah_number, user_transcript) pairs
+        max_workers (int): Worker processes, defaults to the number of CPUs
+        chunksize (int): Pairs per task
+
+    Returns:
+        list: Feedback lists in input order
+    """
+    items = list(items)
+    unique = list(dict.fromkeys(items))
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(unique) <= chunksize:
+        return analyze_ayah_batch(items)
+    
+    chunks = [unique[i:i + chunksize] for i in range(0, len(unique), chunksize)]
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for chunk, feedback in zip(chunks, executor.map(analyze_ayah_batch, chunks)):
+            results.update(zip(chunk, feedback))
+    return [results[item] for item in items]
+
 def get_formatted_feedback(feedback_list):
     """Convert feedback list to formatted strings for display."""
-    return [item['message'] for item in feedback_list] 
\ No newline at end of file
+    return [item['message'] for item in feedback_list]
+
+ANALYSIS_CACHE = ResultCache(
+    maxsize=int(os.environ.get('ANALYSIS_CACHE_SIZE', 4096)),
+    ttl=float(os.environ.get('ANALYSIS_CACHE_TTL', 3600))
+)
+
+def analyze_transcript(user_transcript, ayah_number=None):
+    """
+    Match, analyze and format feedback for a transcript, with caching.
+
+    ASR output for an ayah repeats heavily across users, so results are
+    cached by (ayah_number, transcript). The key is the exact transcript,
+    not its normalized form: feedback quotes the words as transcribed, so
+    two spellings that normalize the same must not share one. The rules
+    and the reference corpus cannot change while the process runs, so the
+    cache is not versioned; it starts empty on every start.
+
+    Args:
+        user_transcript (str): Transcribed recitation
+        ayah_number (int): 0-based ayah number if known, otherwise it is matched
+
+    Returns:
+        dict: 'ayah_number', 'word_index' and formatted 'feedback'; shared
+        between callers, so treat it as read-only
+    """
+    key = (ayah_number, user_transcript)
+    return ANALYSIS_CACHE.get_or_compute(key, lambda: _analyze_transcript(user_transcript, ayah_number))
+
+def _analyze_transcript(user_transcript, ayah_number):
+    word_index = None
+    if ayah_number is None:
+        ayah_number, word_index = match_ayah_and_word(user_transcript)
+    if ayah_number is not None:
+        feedback = analyze_ayah(ayah_number, user_transcript)
+    else:
+        feedback = [{
+            'type': 'error',
+            'message': "Could not match recitation to any ayah of Surah Al-Fatiha"
+        }]
+    return {
+        'ayah_number': ayah_number,
+        'word_index': word_index,
+        'feedback': get_formatted_feedback(feedback)
+    }
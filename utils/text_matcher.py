@@ -1,92 +1,31 @@
-from difflib import SequenceMatcher
-
-import re
-
-# Fatiha verses with their word-by-word text, including ASR-friendly variations
-FATIHA_VERSES = {
-    0: ["بسم", "الله", "الرحمن", "الرحيم"],  # Simplified without diacritics
-    1: ["الحمد", "لله", "رب", "العالمين"],
-    2: ["الرحمن", "الرحيم"],
-    3: ["مالك", "مٰلك", "يوم", "الدين"],  # Added both forms of Maliki
-    4: ["اياك", "نعبد", "واياك", "نستعين"],
-    5: ["اهدنا", "الصراط", "المستقيم"],
-    6: ["صراط", "الذين", "انعمت", "عليهم", "غير", "المغضوب", "عليهم", "ولا", "الضالين"]
-}
-
-# Phonetic mapping for common variations
-PHONETIC_MAPPING = {
-    'ا': ['ى', 'آ', 'أ', 'إ', 'ٱ', 'ٰ'],  # Added superscript alif
-    'ه': ['ة'],
-    'ي': ['ى', 'ئ'],
-    'و': ['ؤ'],
-    'س': ['ص'],
-    'ت': ['ط'],
-    'ذ': ['ز', 'ظ'],
-    'د': ['ض'],
-    'ح': ['ه'],
-    'ك': ['ق'],
-    'م': ['مٰ', 'مَٰ']  # Added madd variations for meem
-}
-
-# Add specific mappings for words with madd
-MADD_WORD_MAPPING = {
-    # Bismillah (Ayah 0)
-    'الرحمن': ['الرحمٰن', 'الرحمان'],
-    'الرحيم': ['الرحيم'],  # No madd variation but included for completeness
-    
-    # Al-Hamd (Ayah 1)
-    'العالمين': ['العٰلمين', 'العالمين'],
-    
-    # Ar-Rahman Ar-Raheem (Ayah 2)
-    # Already covered in Ayah 0
-    
-    # Maaliki Yawm id-Deen (Ayah 3)
-    'مالك': ['مٰلك', 'مالك'],
-    
-    # Iyyaka Na'budu (Ayah 4)
-    # No madd variations
-    
-    # Ihdina (Ayah 5)
-    'الصراط': ['الصرٰط', 'الصراط'],
-    'المستقيم': ['المستقيم'],  # Has madd in ي but that's handled differently
-    
-    # Siratal-ladhina (Ayah 6)
-    'صراط': ['صرٰط', 'صراط'],
-    'الذين': ['الذين'],  # Has madd in ي but that's handled differently
-    'الضالين': ['الضٰلين', 'الضالين', 'الضآلين']  # Also handle آ form
-}
-
-def normalize_arabic_text(text):
-    """Normalize Arabic text by removing diacritics and normalizing letters."""
-    # First normalize madd and special characters
-    text = re.sub('[آٱأإا]', 'ا', text)  # Normalize all alif forms
-    text = re.sub('ـٰ', 'ا', text)        # Convert standalone madd to alif
-    text = re.sub('ٰ', 'ا', text)         # Convert superscript alif to regular alif
-    
-    # Handle specific words with madd
-    normalized = text
-    for base_word, variations in MADD_WORD_MAPPING.items():
-        pattern = '|'.join(map(re.escape, variations))
-        normalized = re.sub(pattern, base_word, normalized)
-    
-    # Handle ya with madd (ي) separately since it's a different case
-    normalized = re.sub('يْ', 'ي', normalized)  # Remove sukoon from ya
-    normalized = re.sub('يِّ', 'ي', normalized)  # Remove shadda and kasra from ya
-    
-    # Remove ALL diacritical marks
-    normalized = re.sub(r'[\u064B-\u065F\u0670]', '', normalized)  # Remove all tashkeel
-    normalized = re.sub('ـ', '', normalized)                       # Remove tatweel
-    
-    # Normalize other letters
-    normalized = re.sub('ة', 'ه', normalized)    # Normalize taa marbouta
-    normalized = re.sub('[ىئ]', 'ي', normalized)  # Normalize ya variations
-    normalized = re.sub('ؤ', 'و', normalized)     # Normalize waw
-    
-    # Remove any non-Arabic characters
-    normalized = re.sub(r'[^\u0600-\u06FF\s]', '', normalized)
-    
-    # Remove extra spaces and return
-    return ' '.join(normalized.split())
+import os
+
+import numpy as np
+
+from .ayah_index import AyahIndex
+from .normalization import PHONETIC_MAPPING, normalize_arabic_text
+from .similarity import phonetic_ratio, ratio_matrix
+from .reference_corpus import FATIHA
+from .log_config import get_logger
+
+logger = get_logger('matcher')
+
+FATIHA_SURAH = 1
+
+# Minimum share of the transcript's n-gram weight an ayah must contain to count as a match
+MIN_MATCH_COVERAGE = 0.4
+
+def load_ayah_index():
+    """Open the on-disk index named by AYAH_INDEX_PATH, or index Al-Fatiha in memory."""
+    path = os.environ.get('AYAH_INDEX_PATH')
+    if path:
+        return AyahIndex.load(path)
+    return AyahIndex.from_corpus(FATIHA, surah=FATIHA_SURAH)
+
+AYAH_INDEX = load_ayah_index()
+
+# Fatiha verses with their word-by-word text in simple spelling, derived from the reference corpus
+FATIHA_VERSES = {ayah.id: ayah.simple_words for ayah in FATIHA}
 
 def normalize_without_special_cases(text):
     """Normalize text without applying special case rules."""
@@ -114,9 +53,27 @@ def get_phonetic_variations(word):
     
     return variations
 
-def similar(a, b):
-    """Calculate similarity ratio between two strings."""
-    # First normalize both strings
+# Words that are matched with a more lenient threshold
+COMMON_WORDS = frozenset(['بسم', 'الله', 'الرحمن', 'الرحيم'])
+COMMON_WORD_THRESHOLD = 0.7
+MATCH_THRESHOLD = 0.8
+
+def similar(a, b, cutoff=0.0):
+    """
+    Calculate similarity ratio between two strings.
+
+    Scores above MATCH_THRESHOLD (or COMMON_WORD_THRESHOLD when either side
+    is a common word) count as a full match and return 1.0.
+
+    Args:
+        a, b (str): Words to compare, normalized here
+        cutoff (float): Callers only interested in scores above a threshold
+            can pass it here; lower scores come back as 0.0 and are cheaper
+            to compute
+
+    Returns:
+        float: Similarity in [0, 1]
+    """
     a_norm = normalize_arabic_text(a)
     b_norm = normalize_arabic_text(b)
     
@@ -125,101 +82,114 @@ def similar(a, b):
         return 1.0
     
     # Special handling for common words with more lenient matching
-    common_words = ['بسم', 'الله', 'الرحمن', 'الرحيم']
-    if a_norm in common_words or b_norm in common_words:
-        base_similarity = SequenceMatcher(None, a_norm, b_norm).ratio()
-        if base_similarity > 0.7:  # More lenient threshold for common words
-            return 1.0
+    threshold = MATCH_THRESHOLD
+    if a_norm in COMMON_WORDS or b_norm in COMMON_WORDS:
+        threshold = COMMON_WORD_THRESHOLD
     
-    # Get base similarity
-    base_similarity = SequenceMatcher(None, a_norm, b_norm).ratio()
+    # Phonetic confusions are priced into the edit distance, so this single
+    # bounded comparison replaces scoring every pair of phonetic variations
+    similarity = phonetic_ratio(a_norm, b_norm, cutoff=min(cutoff, threshold))
+    if similarity > threshold:
+        return 1.0
     
-    # Check phonetic variations
-    a_variations = get_phonetic_variations(a)
-    b_variations = get_phonetic_variations(b)
+    return similarity
+
+def similarity_matrix(words_a, words_b, cutoff=0.0):
+    """
+    similar() for every pair of words in one vectorized call.
+
+    Each word is normalized and encoded once rather than once per pair.
+
+    Args:
+        words_a, words_b (list): Words to compare, normalized here
+        cutoff (float): As for similar()
+
+    Returns:
+        np.ndarray: float32 matrix with matrix[i, j] == similar(words_a[i], words_b[j], cutoff)
+    """
+    norm_a = [normalize_arabic_text(word) for word in words_a]
+    norm_b = [normalize_arabic_text(word) for word in words_b]
+    ratios = ratio_matrix(norm_a, norm_b, cutoff=min(cutoff, COMMON_WORD_THRESHOLD))
     
-    # Get best similarity score among all variations
-    max_similarity = base_similarity
-    for var_a in a_variations:
-        for var_b in b_variations:
-            # Check exact match first
-            if var_a == var_b:
-                return 1.0
-            # Then check similarity
-            similarity = SequenceMatcher(None, var_a, var_b).ratio()
-            max_similarity = max(max_similarity, similarity)
+    # Per-pair threshold, lenient when either side is a common word
+    common = np.logical_or.outer([w in COMMON_WORDS for w in norm_a], [w in COMMON_WORDS for w in norm_b])
+    thresholds = np.where(common, COMMON_WORD_THRESHOLD, MATCH_THRESHOLD)
+    ratios[ratios < np.minimum(cutoff, thresholds)] = 0.0
+    ratios[ratios > thresholds] = 1.0
+    ratios[np.equal.outer(np.array(norm_a, dtype=object), np.array(norm_b, dtype=object))] = 1.0
+    return ratios.astype(np.float32)
+
+def _match_normalized(text):
+    """
+    Locate already normalized text in Al-Fatiha.
+
+    Returns:
+        tuple: (ayah_number, word_index, candidate) where candidate is the
+        AyahCandidate behind a fuzzy match and None otherwise
+    """
+    if not text:
+        return (None, None, None)
     
-    # Be more lenient with the similarity threshold
-    # If the strings are very close (>0.8), consider them a match
-    if max_similarity > 0.8:
-        return 1.0
+    # Fast path: the transcript spells a reference ayah exactly
+    exact_ayah = FATIHA.exact_match(text)
+    if exact_ayah is not None:
+        return (exact_ayah, 0, None)
+    
+    # Rank the ayat of Al-Fatiha by n-gram overlap
+    candidates = AYAH_INDEX.search(text, top_k=1, surah=FATIHA_SURAH)
+    if not candidates or candidates[0].coverage < MIN_MATCH_COVERAGE:
+        return (None, None, None)
     
-    return max_similarity
+    best = candidates[0]
+    return (best.ayah - 1, best.start_word, best)
 
 def match_ayah_and_word(transcribed_text):
-    """Match transcribed text with Fatiha verses and identify the current ayah and word."""
+    """
+    Match transcribed text with Fatiha verses and identify the current ayah and word.
+
+    Returns:
+        tuple: (ayah_number, word_index) with 0-based ayah numbers, or (None, None)
+    """
     # Clean up and normalize the transcribed text
     transcribed_text = normalize_arabic_text(transcribed_text.strip())
-    transcribed_words = transcribed_text.split()
-    
-    print(f"DEBUG: Normalized transcribed text: {transcribed_text}")
-    print(f"DEBUG: Transcribed words: {transcribed_words}")
+    logger.debug("Normalized transcribed text: %s", transcribed_text)
     
     # If no words were transcribed, return no match
-    if not transcribed_words:
-        print("DEBUG: No words transcribed")
+    if not transcribed_text:
+        logger.debug("No words transcribed")
         return (None, None)
     
-    # Special case: Check if this is Ar-Rahmani Raheem (ayah 2)
-    norm_trans = ' '.join(transcribed_words)
-    print(f"DEBUG: Checking Ar-Rahmani Raheem case. Text: {norm_trans}")
-    print(f"DEBUG: Contains رحمن/رحمان: {'رحمن' in norm_trans or 'رحمان' in norm_trans}")
-    print(f"DEBUG: Contains الرحمن/الرحمان: {'الرحمن' in norm_trans or 'الرحمان' in norm_trans}")
-    print(f"DEBUG: Contains رحيم: {'رحيم' in norm_trans}")
-    print(f"DEBUG: Contains الرحيم: {'الرحيم' in norm_trans}")
-    print(f"DEBUG: Contains بسم: {'بسم' in norm_trans}")
-    print(f"DEBUG: Contains الله: {'الله' in norm_trans}")
-    
-    if len(transcribed_words) <= 3:  # Allow for slight ASR variations
-        if ('رحمن' in norm_trans or 'الرحمن' in norm_trans or 'رحمان' in norm_trans or 'الرحمان' in norm_trans) and \
-           ('رحيم' in norm_trans or 'الرحيم' in norm_trans):
-            # Make sure it's not Bismillah by checking for absence of بسم and الله
-            if 'بسم' not in norm_trans and 'الله' not in norm_trans:
-                print("DEBUG: Matched as Ar-Rahmani Raheem (ayah 2)")
-                return (2, 0)
-
-    # First try exact matches for key words that uniquely identify ayahs
-    unique_identifiers = {
-        0: [["بسم", "الله"]],  # Must have BOTH for Bismillah
-        1: ["الحمد"],  # Only appears in ayah 1
-        2: [["الرحمن", "الرحمان"], ["الرحيم"]],  # Must have both Rahman/Rahman AND Raheem
-        3: ["مالك", "يوم", "الدين"],  # Only appears in ayah 3
-        4: ["نعبد", "نستعين"],  # Only appears in ayah 4
-        5: ["اهدنا", "الصراط"],  # Only appears in ayah 5
-        6: ["انعمت", "المغضوب", "الضالين"]  # Only appears in ayah 6
-    }
-    
-    # Check for unique identifiers first
-    for ayah_num, identifiers in unique_identifiers.items():
-        print(f"DEBUG: Checking ayah {ayah_num} identifiers")
-        if isinstance(identifiers[0], list):
-            # For cases where we need ALL words to match (like Bismillah)
-            matches_all = True
-            for required_group in identifiers:
-                if not any(normalize_arabic_text(word) in norm_trans for word in required_group):
-                    matches_all = False
-                    break
-            if matches_all:
-                print(f"DEBUG: Matched all required words for ayah {ayah_num}")
-                return (ayah_num, 0)
-        else:
-            # For cases where ANY word can match
-            if any(normalize_arabic_text(word) in norm_trans for word in identifiers):
-                print(f"DEBUG: Matched identifier for ayah {ayah_num}")
-                return (ayah_num, 0)
-    
-    print("DEBUG: No match found")
-    return (None, None)
+    ayah_number, word_index, best = _match_normalized(transcribed_text)
+    if ayah_number is None:
+        logger.debug("No match found")
+    elif best is None:
+        logger.debug("Exact match for ayah %d", ayah_number)
+    else:
+        logger.debug("Matched ayah %d from word %d (score %.2f, coverage %.2f)",
+                     ayah_number, word_index, best.score, best.coverage)
+    return (ayah_number, word_index)
+
+def match_ayah_and_word_batch(transcripts):
+    """
+    match_ayah_and_word for many transcripts, e.g. a whole evaluation set.
+
+    Transcripts that normalize to the same text are matched once, and no
+    per-transcript debug messages are logged.
+
+    Args:
+        transcripts (iterable): Transcribed texts
+
+    Returns:
+        list: (ayah_number, word_index) tuples in input order
+    """
+    matches = {}
+    results = []
+    for transcript in transcripts:
+        text = normalize_arabic_text(transcript.strip())
+        if text not in matches:
+            matches[text] = _match_normalized(text)[:2]
+        results.append(matches[text])
+    return results
 
 def get_context(ayah_number, word_index, window=2):
     """
@@ -240,4 +210,139 @@ def get_context(ayah_number, word_index, window=2):
     start = max(0, word_index - window)
     end = min(len(words), word_index + window + 1)
     
-    return words[start:end] 
\ No newline at end of file
+    return words[start:end]
+
+# Beam search costs for the streaming tracker, in units of word dissimilarity
+TRACKER_BEAM_WIDTH = 8
+TRACKER_MAX_SKIP = 2
+TRACKER_SKIP_COST = 0.6
+TRACKER_INSERT_COST = 0.6
+TRACKER_JUMP_COST = 1.0
+
+class RecitationTracker:
+    """
+    Follow a live recitation word by word.
+
+    The tracker keeps a small beam of hypotheses over positions in the
+    corpus (words read so far, across ayat). Each new word extends every
+    hypothesis by a match, a skip of up to TRACKER_MAX_SKIP words, two
+    reference words said as one, or an extra word, and hypotheses can
+    restart at any exact occurrence of the word (or of two adjacent words
+    run together) elsewhere. An update costs
+    O(new words) regardless of how long the recitation has been going.
+
+    Usage:
+        tracker = RecitationTracker()
+        tracker.update("الحمد لله")         # feed new words
+        tracker.sync(partial_transcript)    # or hand over the whole partial transcript
+        ayah, word_index = tracker.position
+    """
+
+    def __init__(self, corpus=FATIHA, beam_width=TRACKER_BEAM_WIDTH, max_skip=TRACKER_MAX_SKIP):
+        self.beam_width = beam_width
+        self.max_skip = max_skip
+        # Flatten the corpus into one word sequence
+        self._ref = []
+        self._lexicon = {}
+        for ayah in corpus:
+            for index, (word, variants) in enumerate(zip(ayah.normalized_words, ayah.variants)):
+                for variant in variants:
+                    self._lexicon.setdefault(variant, []).append(len(self._ref))
+                if index:
+                    # Two words run together land on the second one
+                    self._lexicon.setdefault(ayah.normalized_words[index - 1] + word, []).append(len(self._ref))
+                self._ref.append((ayah.id, index, word, variants))
+        self.reset()
+
+    def reset(self):
+        """Forget everything recited so far."""
+        self._words = []
+        # _history[k] is the beam after k words: {next position: (cost, last matched position)}
+        self._history = [{0: (0.0, None)}]
+
+    @property
+    def words(self):
+        """Normalized words consumed so far."""
+        return list(self._words)
+
+    @property
+    def position(self):
+        """(ayah_number, word_index) of the last recited word, or (None, None)."""
+        cost, last = min(self._history[-1].values())
+        if last is None:
+            return (None, None)
+        ayah_id, index, _, _ = self._ref[last]
+        return (ayah_id, index)
+
+    def update(self, text):
+        """
+        Consume newly recited words.
+
+        Args:
+            text (str or list): New words, as a string or a list of words
+
+        Returns:
+            tuple: The current position, as for `position`
+        """
+        words = text.split() if isinstance(text, str) else text
+        for word in words:
+            word = normalize_arabic_text(word)
+            if word:
+                self._history.append(self._advance(self._history[-1], word))
+                self._words.append(word)
+        return self.position
+
+    def sync(self, transcript):
+        """
+        Bring the tracker in line with a growing partial transcript.
+
+        Words the recognizer kept are not re-matched; when it revises a
+        word, the tracker rewinds to the last unchanged word and replays
+        only the tail.
+        """
+        words = [w for w in (normalize_arabic_text(word) for word in transcript.split()) if w]
+        common = 0
+        for old, new in zip(self._words, words):
+            if old != new:
+                break
+            common += 1
+        del self._words[common:]
+        del self._history[common + 1:]
+        return self.update(words[common:])
+
+    def _word_cost(self, position, word):
+        ref_word, variants = self._ref[position][2], self._ref[position][3]
+        if word in variants:
+            return 0.0
+        return 1.0 - similar(ref_word, word)
+
+    def _advance(self, beam, word):
+        size = len(self._ref)
+        extended = {}
+
+        def push(position, cost, last):
+            current = extended.get(position)
+            if current is None or cost < current[0]:
+                extended[position] = (cost, last)
+
+        for position, (cost, last) in beam.items():
+            # Extra word: stay in place
+            push(position, cost + TRACKER_INSERT_COST, last)
+            for skip in range(self.max_skip + 1):
+                target = position + skip
+                if target >= size:
+                    break
+                push(target + 1, cost + skip * TRACKER_SKIP_COST + self._word_cost(target, word), target)
+            # Two reference words run together by the recognizer
+            if position + 1 < size and self._ref[position][0] == self._ref[position + 1][0]:
+                merged = self._ref[position][2] + self._ref[position + 1][2]
+                push(position + 2, cost + 1.0 - similar(merged, word), position + 1)
+
+        # Restart at any exact occurrence of the word; free before the first word
+        best = min(cost for cost, _ in beam.values())
+        jump = best + TRACKER_JUMP_COST if self._words else best
+        for target in self._lexicon.get(word, ()):
+            push(target + 1, jump, target)
+
+        ranked = sorted(extended.items(), key=lambda item: item[1][0])
+        return dict(ranked[:self.beam_width])
@@ -0,0 +1,150 @@
+# transcription_cache.py
+"""
+Content-addressed cache of transcripts.
+
+Retries, re-submissions after network errors and the bundled reference
+clips send the same audio again and again. Transcripts are cached under a
+hash of the decoded samples plus the model (id, precision mode and
+decoding settings), so a repeat is answered before any feature
+extraction or inference.
+
+Two tiers:
+
+- memory: a bounded LRU (cache.ResultCache) per worker
+- disk (optional): one small file per transcript in a directory shared by
+  all workers, evicted oldest-used first once it exceeds its byte budget
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from .cache import ResultCache
+from .log_config import get_logger
+
+logger = get_logger('asr')
+
+# Bump when the cached transcripts stop matching what the model would produce
+CACHE_FORMAT = 1
+# Entries kept after an eviction pass, as a fraction of the disk budget
+DISK_LOW_WATER = 0.9
+
+def audio_key(clip, model_key):
+    """Hex key for a clip's transcript under a given model."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{CACHE_FORMAT}|{model_key}|{clip.sample_rate}|".encode('utf-8'))
+    digest.update(clip.samples.tobytes())
+    return digest.hexdigest()
+
+class TranscriptionCache:
+    """
+    Two-tier transcript cache keyed by audio content.
+
+    Args:
+        model_key (str): Identifies the model and decoding settings
+        maxsize (int): Transcripts kept in memory, 0 disables the memory tier
+        disk_dir (str or Path): Directory for the disk tier, None to disable it
+        disk_max_bytes (int): Disk budget; the least recently used files go first
+    """
+
+    def __init__(self, model_key, maxsize=1024, disk_dir=None, disk_max_bytes=256 * 1024 * 1024):
+        self.model_key = model_key
+        self.memory = ResultCache(maxsize=maxsize)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.disk_evictions = 0
+        self._disk_bytes = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._scan())
+
+    def key(self, clip):
+        return audio_key(clip, self.model_key)
+
+    def get(self, clip, key=None):
+        """Cached transcript of the clip, or None."""
+        key = key or self.key(clip)
+        text = self.memory.get(key)
+        if text is not None or self.disk_dir is None:
+            return text
+        path = self._path(key)
+        try:
+            text = path.read_text(encoding='utf-8')
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            with self._lock:
+                self.disk_misses += 1
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        self.memory.put(key, text)
+        return text
+
+    def put(self, clip, text, key=None):
+        """Store a clip's transcript in both tiers."""
+        key = key or self.key(clip)
+        self.memory.put(key, text)
+        if self.disk_dir is None:
+            return
+        path = self._path(key)
+        data = text.encode('utf-8')
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write transcript cache entry %s: %s", path, e)
+            return
+        with self._lock:
+            self._disk_bytes += len(data)
+            over_budget = self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self._evict()
+
+    def _path(self, key):
+        return self.disk_dir / f'{key}.txt'
+
+    def _scan(self):
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith('.txt'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        # Other workers share the directory, so work from what is actually on disk
+        with self._lock:
+            entries = sorted(self._scan())
+            total = sum(size for _, size, _ in entries)
+            target = self.disk_max_bytes * DISK_LOW_WATER
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.disk_evictions += 1
+            self._disk_bytes = total
+
+    def stats(self):
+        """Counters of both tiers, e.g. for a health endpoint."""
+        stats = {'memory': self.memory.stats()}
+        if self.disk_dir is not None:
+            with self._lock:
+                stats['disk'] = {
+                    'bytes': self._disk_bytes,
+                    'max_bytes': self.disk_max_bytes,
+                    'hits': self.disk_hits,
+                    'misses': self.disk_misses,
+                    'evictions': self.disk_evictions,
+                }
+        return stats
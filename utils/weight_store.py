@@ -0,0 +1,219 @@
+# weight_store.py
+"""
+Memory-mapped model weights shared by every worker process.
+
+Weights are written once in the safetensors layout (8-byte header length,
+JSON header, raw little-endian tensor bytes) and loaded by mapping the
+file copy-on-write: every parameter becomes a tensor that views the
+mapped pages directly. All workers that load the same file share one set
+of physical pages through the page cache, so N workers cost one model plus
+their own small overhead, and nothing has to be unpickled or copied.
+
+Tensors that share storage (tied embeddings) are written once and
+re-tied on load.
+"""
+import json
+import os
+import struct
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import torch
+
+FORMAT_NAME = 'tajweed-weights'
+FORMAT_VERSION = 1
+
+# safetensors dtype name -> (torch dtype, numpy dtype used to view the bytes)
+DTYPES = {
+    'F64': (torch.float64, np.float64),
+    'F32': (torch.float32, np.float32),
+    'F16': (torch.float16, np.float16),
+    'BF16': (torch.bfloat16, np.int16),
+    'I64': (torch.int64, np.int64),
+    'I32': (torch.int32, np.int32),
+    'I16': (torch.int16, np.int16),
+    'I8': (torch.int8, np.int8),
+    'U8': (torch.uint8, np.uint8),
+    'BOOL': (torch.bool, np.bool_),
+}
+_DTYPE_NAMES = {torch_dtype: name for name, (torch_dtype, _) in DTYPES.items()}
+
+def _unique_tensors(state_dict):
+    """Split a state dict into tensors to store and aliases of tensors already stored."""
+    stored = OrderedDict()
+    aliases = {}
+    seen = {}
+    for name, tensor in state_dict.items():
+        key = (tensor.data_ptr(), tensor.dtype, tuple(tensor.shape), tuple(tensor.stride()))
+        if tensor.numel() and key in seen:
+            aliases[name] = seen[key]
+        else:
+            seen[key] = name
+            stored[name] = tensor
+    return stored, aliases
+
+def save_weights(model, path, metadata=None):
+    """
+    Write a model's state dict to a safetensors file.
+
+    Args:
+        model (torch.nn.Module): Model to save
+        path (str or Path): Destination file
+        metadata (dict): Extra string metadata for the header
+    """
+    save_state_dict(model.state_dict(), path, metadata)
+
+def save_state_dict(state_dict, path, metadata=None):
+    """
+    Write plain tensors to a safetensors file.
+
+    Larger element types are written first so every tensor stays aligned
+    to its element size. The file is written under a temporary name and
+    renamed into place, so workers racing to create it never see a
+    partial file.
+
+    Args:
+        state_dict (dict): Name -> tensor
+        path (str or Path): Destination file
+        metadata (dict): Extra string metadata for the header
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    stored, aliases = _unique_tensors(state_dict)
+    order = sorted(stored, key=lambda name: -stored[name].element_size())
+
+    header = {}
+    offset = 0
+    for name in order:
+        tensor = stored[name]
+        if tensor.dtype not in _DTYPE_NAMES:
+            raise ValueError(f"Unsupported dtype {tensor.dtype} for {name}")
+        size = tensor.numel() * tensor.element_size()
+        header[name] = {
+            'dtype': _DTYPE_NAMES[tensor.dtype],
+            'shape': list(tensor.shape),
+            'data_offsets': [offset, offset + size],
+        }
+        offset += size
+    header['__metadata__'] = {
+        'format': FORMAT_NAME,
+        'format_version': str(FORMAT_VERSION),
+        'aliases': json.dumps(aliases),
+        **{key: str(value) for key, value in (metadata or {}).items()},
+    }
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-len(header_bytes) % 8)
+
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for name in order:
+            tensor = stored[name].detach().contiguous().cpu()
+            if tensor.dtype == torch.bfloat16:
+                tensor = tensor.view(torch.int16)
+            f.write(tensor.numpy().tobytes())
+    os.replace(tmp_path, path)
+
+def read_header(path):
+    """
+    Parse a safetensors header.
+
+    Returns:
+        tuple: (tensor entries, metadata dict, byte offset where tensor data starts)
+    """
+    with open(path, 'rb') as f:
+        (length,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(length))
+    metadata = header.pop('__metadata__', {})
+    return header, metadata, 8 + length
+
+def load_state_dict(path):
+    """
+    Map a safetensors file and return tensors that view its pages.
+
+    The mapping is copy-on-write: pages are shared with every other
+    process mapping the file until a process writes to them.
+
+    Returns:
+        OrderedDict: Parameter name -> tensor, including re-tied aliases
+    """
+    header, metadata, data_start = read_header(path)
+    mapped = np.memmap(path, dtype=np.uint8, mode='c')
+    state_dict = OrderedDict()
+    for name, entry in header.items():
+        torch_dtype, np_dtype = DTYPES[entry['dtype']]
+        begin, end = entry['data_offsets']
+        array = mapped[data_start + begin:data_start + end].view(np_dtype).reshape(entry['shape'])
+        tensor = torch.from_numpy(array)
+        if torch_dtype == torch.bfloat16:
+            tensor = tensor.view(torch.bfloat16)
+        state_dict[name] = tensor
+    for alias, target in json.loads(metadata.get('aliases', '{}')).items():
+        state_dict[alias] = state_dict[target]
+    return state_dict
+
+def load_weights(model, path):
+    """
+    Point a model's parameters and buffers at the mapped weights.
+
+    The model can be built on the meta device, so no memory is allocated
+    for weights that are about to be replaced.
+
+    Returns:
+        torch.nn.Module: The model, in eval mode
+
+    Raises:
+        ValueError: If the file lacks a parameter or buffer of the model,
+            has one the model lacks, or a shape does not match
+    """
+    return assign_weights(model, load_state_dict(path), source=path)
+
+def assign_weights(model, state_dict, source='state dict'):
+    """
+    Make a model's parameters and buffers the given tensors, without copying.
+
+    Args:
+        model (torch.nn.Module): Model, possibly on the meta device
+        state_dict (dict): Name -> tensor
+        source (str): Where the tensors came from, for error messages
+
+    Returns:
+        torch.nn.Module: The model, in eval mode
+    """
+    for name, tensor in state_dict.items():
+        module_name, _, attr = name.rpartition('.')
+        try:
+            module = model.get_submodule(module_name)
+        except AttributeError:
+            raise ValueError(f"{source} has weights for {name}, which the model does not have") from None
+        if attr in module._parameters:
+            current = module._parameters[attr]
+            if current is not None and current.shape != tensor.shape:
+                raise ValueError(f"Shape mismatch for {name}: {tuple(current.shape)} vs {tuple(tensor.shape)}")
+            module._parameters[attr] = torch.nn.Parameter(tensor, requires_grad=False)
+        elif attr in module._buffers:
+            module._buffers[attr] = tensor
+        else:
+            raise ValueError(f"{source} has weights for {name}, which the model does not have")
+
+    missing = [
+        name for name, tensor in list(model.named_parameters()) + list(model.named_buffers())
+        if tensor.is_meta
+    ]
+    if missing:
+        raise ValueError(f"Weights missing from {source}: {', '.join(missing[:5])}")
+    return model.eval()
+
+def load_model(build, path):
+    """
+    Build a model skeleton on the meta device and load mapped weights into it.
+
+    Args:
+        build (callable): Constructs the model, e.g. lambda: Model(config)
+        path (str or Path): safetensors file written by save_weights
+    """
+    with torch.device('meta'):
+        model = build()
+    return load_weights(model, path)